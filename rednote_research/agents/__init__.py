@@ -4,6 +4,7 @@ from .base import BaseAgent
 from .planner import PlannerAgent
 from .searcher import SearcherAgent
 from .analyzer import AnalyzerAgent
+from .summarizer import SummarizerAgent
 from .orchestrator import ResearchOrchestrator
 
 __all__ = [
@@ -11,5 +12,6 @@ __all__ = [
     "PlannerAgent", 
     "SearcherAgent",
     "AnalyzerAgent",
+    "SummarizerAgent",
     "ResearchOrchestrator"
 ]
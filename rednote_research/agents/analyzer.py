@@ -4,8 +4,12 @@ import json
 from typing import Callable, Optional
 from openai import AsyncOpenAI
 from .base import BaseAgent
-from ..state import ResearchState
-from ..prompts.analyzer import ANALYZER_PROMPT
+from .summarizer import SummarizerAgent
+from ..state import NoteData, ResearchState
+from ..services.note_summary import OUTLINE_NOTE_COUNT, notes_to_summarize, select_note_texts
+from ..services.note_format import format_notes_compact
+from ..services.settings import get_settings_service
+from ..prompts.analyzer import ANALYZER_PROMPT, ANALYZER_INCREMENTAL_TEMPLATE
 
 
 class AnalyzerAgent(BaseAgent):
@@ -26,6 +30,7 @@ class AnalyzerAgent(BaseAgent):
             system_prompt=ANALYZER_PROMPT,
             model=model
         )
+        self.summarizer = SummarizerAgent(llm_client, model=model)
     
     async def run(
         self, 
@@ -72,14 +77,41 @@ class AnalyzerAgent(BaseAgent):
         state: ResearchState,
         on_log: Optional[Callable[[str], None]] = None
     ) -> dict:
-        """分析文档并提取洞察"""
+        """分析文档并提取洞察（反思轮次中新增笔记较少时增量分析）"""
+        prompt_settings = get_settings_service().load().prompt
+        current_ids = [note.preview.id for note in state.documents]
         
-        # 准备数据摘要
-        data_summary = self._prepare_data_summary(state)
+        new_indices = []
+        if prompt_settings.incremental_analysis and state.insights and state.analyzed_note_ids:
+            analyzed = set(state.analyzed_note_ids)
+            new_indices = [i for i, note_id in enumerate(current_ids) if note_id not in analyzed]
+            if not new_indices:
+                # 补充搜索没有带来新笔记，再分析一遍也不会有新结论
+                self._log(state, "补充搜索无新增笔记，沿用上一轮分析结果", on_log)
+                insights = self._remap_source_ids(state.insights, state.analyzed_note_ids, current_ids)
+                state.analyzed_note_ids = current_ids
+                return {**insights, "needs_more_data": False}
         
-        messages = [
-            {"role": "system", "content": self.system_prompt},
-            {"role": "user", "content": f"""
+        incremental = bool(new_indices) and len(new_indices) / len(current_ids) <= prompt_settings.incremental_max_delta
+        
+        # 笔记全文超出任一阶段的预算时，只为将被替换为摘要的长笔记生成摘要（缓存复用）
+        if prompt_settings.summarize_notes:
+            prompt_notes = [state.documents[i] for i in new_indices] if incremental else state.documents
+            await self._summarize_for_budget(state, prompt_notes, on_log)
+        
+        if incremental:
+            previous = self._remap_source_ids(state.insights, state.analyzed_note_ids, current_ids)
+            user_content = ANALYZER_INCREMENTAL_TEMPLATE.format(
+                task=state.task,
+                plan=state.plan.model_dump_json() if state.plan else "无",
+                previous_count=len(current_ids) - len(new_indices),
+                previous_insights=json.dumps(previous, ensure_ascii=False, indent=2),
+                new_count=len(new_indices),
+                data_summary=self._prepare_data_summary(state, new_indices)
+            )
+            self._log(state, f"增量分析: 基于上一轮洞察分析新增 {len(new_indices)}/{len(current_ids)} 篇笔记", on_log)
+        else:
+            user_content = f"""
 ## 研究主题
 {state.task}
 
@@ -87,10 +119,14 @@ class AnalyzerAgent(BaseAgent):
 {state.plan.model_dump_json() if state.plan else "无"}
 
 ## 收集到的数据
-{data_summary}
+{self._prepare_data_summary(state)}
 
 请分析以上数据并给出洞察。
-"""}
+"""
+        
+        messages = [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": user_content}
         ]
         
         self._log(state, "正在分析数据...", on_log)
@@ -101,21 +137,102 @@ class AnalyzerAgent(BaseAgent):
             json_start = response.find("{")
             json_end = response.rfind("}") + 1
             if json_start >= 0 and json_end > json_start:
-                return json.loads(response[json_start:json_end])
+                insights = json.loads(response[json_start:json_end])
+                state.analyzed_note_ids = current_ids
+                return insights
         except json.JSONDecodeError:
             pass
         
+        if incremental:
+            # 增量更新解析失败时保留上一轮结果（编号已对齐当前笔记顺序），而不是丢弃已有洞察
+            state.analyzed_note_ids = current_ids
+            return {**previous, "needs_more_data": False}
+        
         return {
             "key_findings": ["分析结果解析失败"],
             "needs_more_data": False,
             "confidence": 0.5
         }
     
-    def _prepare_data_summary(self, state: ResearchState) -> str:
-        """准备数据摘要供LLM分析"""
+    async def _summarize_for_budget(
+        self,
+        state: ResearchState,
+        notes: list[NoteData],
+        on_log: Optional[Callable[[str], None]] = None
+    ) -> None:
+        """
+        为各阶段 prompt 超出预算时会被替换为摘要的笔记一次性生成摘要；全文都放得下时不调用 LLM
+        
+        大纲（outline_note_budget）和章节（section_note_budget）的预算远小于分析阶段，
+        只按分析预算判断时它们会截断原文而不是使用摘要。章节引用哪些笔记在大纲生成后
+        才确定，这里按全部笔记估计。
+        """
+        prompt_settings = get_settings_service().load().prompt
+        min_chars = prompt_settings.summary_min_chars
+        # 缓存中已有的摘要不需要调用 LLM，先全部载入（大纲、章节阶段也能使用）
+        self.summarizer.load_cached(state, min_chars=min_chars)
+        consumers = [
+            (notes, prompt_settings.analyzer_note_budget),
+            (state.documents[:OUTLINE_NOTE_COUNT], prompt_settings.outline_note_budget),
+            (state.documents, prompt_settings.section_note_budget),
+        ]
+        needed: dict[str, NoteData] = {}
+        for consumer_notes, budget in consumers:
+            for note in notes_to_summarize(consumer_notes, state.note_summaries, budget, min_chars):
+                needed.setdefault(note.preview.id, note)
+        pending = list(needed.values())
+        if not pending:
+            return
+        try:
+            await self.summarizer.run(state, on_log, min_chars=min_chars, notes=pending)
+        except Exception as e:
+            self._log(state, f"⚠ 笔记摘要失败，使用原文: {str(e)[:50]}", on_log)
+    
+    @staticmethod
+    def _remap_source_ids(insights: dict, old_ids: list[str], new_ids: list[str]) -> dict:
+        """
+        将洞察中的 source_ids 从旧编号映射到当前笔记编号
+        
+        搜索后的去重和相关性排序会改变笔记顺序，增量分析前需要对齐编号；
+        已不在当前笔记中的来源会被移除。
+        """
+        position = {note_id: i + 1 for i, note_id in enumerate(new_ids)}
+        
+        def remap(item):
+            if not isinstance(item, dict) or "source_ids" not in item:
+                return item
+            mapped = []
+            for source_id in item.get("source_ids") or []:
+                if isinstance(source_id, int) and 1 <= source_id <= len(old_ids):
+                    new_position = position.get(old_ids[source_id - 1])
+                    if new_position:
+                        mapped.append(new_position)
+            return {**item, "source_ids": mapped}
+        
+        return {
+            key: [remap(item) for item in value] if isinstance(value, list) else value
+            for key, value in insights.items()
+        }
+    
+    def _prepare_data_summary(self, state: ResearchState, indices: Optional[list[int]] = None) -> str:
+        """
+        准备数据摘要供LLM分析
+        
+        Args:
+            state: 共享状态
+            indices: 只包含这些下标的笔记（序号仍按全部笔记编号），None 表示全部
+        """
         summaries = []
+        if indices is None:
+            indices = list(range(len(state.documents)))
+        notes = [state.documents[i] for i in indices]
+        prompt_settings = get_settings_service().load().prompt
+        contents = select_note_texts(notes, state.note_summaries, prompt_settings.analyzer_note_budget)
+        
+        if prompt_settings.note_format == "compact":
+            return format_notes_compact(notes, contents, numbers=[i + 1 for i in indices])
         
-        for i, note in enumerate(state.documents):  # 全量处理
+        for i, note, content in zip(indices, notes, contents):  # 全量处理
             detail = note.detail
             preview = note.preview
             
@@ -123,7 +240,7 @@ class AnalyzerAgent(BaseAgent):
 ### 笔记 {i+1}: {detail.title or preview.title}
 - 作者: {detail.author or preview.author}
 - 点赞: {detail.likes or preview.likes}
-- 内容: {detail.content or preview.content_preview}
+- 内容: {content}
 - 标签: {', '.join(detail.tags) if detail.tags else '无'}
 - 图片数量: {len(detail.images)}
 """
@@ -2,15 +2,64 @@
 VLM 图片验证模块
 
 使用视觉语言模型（如 Qwen-VL）验证图片与内容的相关性
+
+- 多图批量：一次请求携带多张图片，VLM 按图片编号逐张给出判断
+- 并发：多个批次并行请求（信号量限制并发数，与图片分析共享限速器）
+- 复用连接：全局单例持有长连接 HTTP 客户端，应用退出时关闭；VLM 配置每次调用时读取，设置页修改立即生效
+- 缓存：按图片内容哈希 + 上下文哈希缓存验证结果
 """
 
+import asyncio
 import base64
+import hashlib
+import json
+import logging
 import httpx
 from pathlib import Path
 from typing import Optional, Union
 from pydantic import BaseModel
 
-from ..services.settings import get_settings_service
+from ..services.settings import VLMSettings, get_settings_service
+from ..services.image_downloader import get_image_downloader
+from ..services.image_preprocess import get_image_preprocessor
+from ..services.image_analysis_cache import analysis_version
+from ..services.image_validation_cache import ImageValidationCache, context_hash, get_image_validation_cache
+from ..services.rate_limit import TokenBucket, get_vlm_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+
+ImageSource = Union[str, bytes, Path]
+
+# 单张图片判断的输出 token 估计（用于设置 max_tokens）
+TOKENS_PER_VERDICT = 150
+
+VALIDATION_PROMPT = """请分析以下 {count} 张图片与内容的相关性（图片按顺序编号 0 到 {last}）。
+
+{topic_part}内容：{context}
+
+请对每张图片从以下几个方面评估：
+1. 图片主题与内容是否相关
+2. 图片是否能支持或说明文字内容
+3. 图片质量是否适合用于research报告
+
+请用JSON格式回复，results 中每张图片一项：
+{{
+  "results": [
+    {{
+      "image_index": 0,
+      "is_relevant": true/false,
+      "confidence": 0.0-1.0,
+      "reason": "判断理由",
+      "suggested_action": "keep/replace/remove"
+    }}
+  ]
+}}
+
+规则：
+- confidence >= 0.6 且 is_relevant=true 时建议 keep
+- confidence < 0.4 或 is_relevant=false 时建议 replace
+- 图片严重不相关或质量差时建议 remove"""
 
 
 class ImageValidationResult(BaseModel):
@@ -21,175 +70,234 @@ class ImageValidationResult(BaseModel):
     suggested_action: str  # 建议操作: keep, replace, remove
 
 
+def _default_result(confidence: float, reason: str) -> ImageValidationResult:
+    """无法验证时的默认结果（保留图片）"""
+    return ImageValidationResult(is_relevant=True, confidence=confidence, reason=reason, suggested_action="keep")
+
+
 class ImageValidator:
     """
     图片验证器
-    
-    使用 VLM 模型分析图片与文本内容的相关性
+
+    使用 VLM 模型分析图片与文本内容的相关性。实例只持有 HTTP 客户端和注入的依赖，
+    VLM 配置（开关、API Key、地址、模型、批次参数）、缓存版本和限速器每次调用时获取。
+
+    使用方法:
+        validator = get_image_validator()
+        results = await validator.validate_many(urls, context, topic)
     """
-    
-    def __init__(self):
-        self.settings = get_settings_service().load()
+
+    def __init__(
+        self,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        cache: Optional[ImageValidationCache] = None
+    ):
+        """
+        Args:
+            transport: httpx 传输层（测试时注入 MockTransport）
+            cache: 验证结果缓存（None 时按 vlm.analysis_cache 使用全局缓存）
+        """
+        self.transport = transport
         self.client: Optional[httpx.AsyncClient] = None
-        
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.cache = cache
+        # 注入的限速器（None 时每次请求取全局 VLM 限速器，随限速配置变化）
+        self.rate_limiter: Optional[TokenBucket] = None
+        self.cache_hits = 0
+
     async def _get_client(self) -> httpx.AsyncClient:
-        """获取 HTTP 客户端"""
-        if self.client is None:
-            self.client = httpx.AsyncClient(timeout=60.0)
+        """获取 HTTP 客户端（长连接复用；换事件循环时重建并关闭旧客户端）"""
+        loop = asyncio.get_running_loop()
+        if self.client is None or self._client_loop is not loop:
+            # 先切换再等待关闭旧客户端，同一新循环上的并发调用不会重复重建
+            stale = self.client
+            self.client = httpx.AsyncClient(timeout=60.0, transport=self.transport)
+            self._client_loop = loop
+            await self._discard_client(stale)
         return self.client
-    
+
+    @staticmethod
+    async def _discard_client(client: Optional[httpx.AsyncClient]) -> None:
+        """关闭绑定在旧事件循环上的客户端（旧循环已关闭时无法正常关闭连接，忽略错误）"""
+        if client is None or client.is_closed:
+            return
+        try:
+            await client.aclose()
+        except Exception as e:
+            logger.debug(f"[ImageValidator] 关闭旧客户端失败: {e}")
+
     async def close(self):
         """关闭客户端"""
         if self.client:
             await self.client.aclose()
             self.client = None
-    
-    def _encode_image(self, image_source: Union[str, bytes, Path]) -> str:
+            self._client_loop = None
+
+    async def _resolve(self, image_source: ImageSource) -> tuple[str, str]:
         """
-        将图片编码为 base64
-        
-        支持：URL、本地路径、字节数据
+        准备送入 VLM 的图片
+
+        Returns:
+            (图片链接或 data URI, 图片内容哈希)
         """
+        if isinstance(image_source, str) and image_source.startswith('http'):
+            # 经图片缓存读取，失败时仍交给 VLM 直接访问链接（按链接哈希缓存）
+            image = await get_image_downloader().fetch(image_source)
+            if image is None:
+                return image_source, "url-" + hashlib.sha256(image_source.encode("utf-8")).hexdigest()
+            image_hash = hashlib.sha256(image.data).hexdigest()
+            image = await get_image_preprocessor().process(image)
+            return image.to_data_uri(), image_hash
+
         if isinstance(image_source, bytes):
-            return base64.b64encode(image_source).decode('utf-8')
-        
-        if isinstance(image_source, Path) or (isinstance(image_source, str) and not image_source.startswith('http')):
+            data = image_source
+        else:
             path = Path(image_source)
-            if path.exists():
-                return base64.b64encode(path.read_bytes()).decode('utf-8')
-            raise FileNotFoundError(f"图片文件不存在: {path}")
-        
-        # URL 类型直接返回
-        return image_source
-    
+            if not path.exists():
+                raise FileNotFoundError(f"图片文件不存在: {path}")
+            data = path.read_bytes()
+        return f"data:image/jpeg;base64,{base64.b64encode(data).decode('utf-8')}", hashlib.sha256(data).hexdigest()
+
     async def validate(
-        self, 
-        image_source: Union[str, bytes, Path],
+        self,
+        image_source: ImageSource,
         context: str,
         topic: str = ""
     ) -> ImageValidationResult:
         """
         验证图片与内容的相关性
-        
+
         Args:
             image_source: 图片来源（URL、路径或字节）
             context: 相关文本内容/分论点
             topic: 研究主题（可选）
-            
+
         Returns:
             ImageValidationResult: 验证结果
         """
-        vlm_settings = self.settings.vlm
-        
+        return (await self.validate_many([image_source], context, topic))[0]
+
+    async def validate_many(
+        self,
+        image_sources: list[ImageSource],
+        context: str,
+        topic: str = ""
+    ) -> list[ImageValidationResult]:
+        """
+        批量验证图片（多图一次请求，多个请求并发）
+
+        Args:
+            image_sources: 图片来源列表（URL、路径或字节）
+            context: 相关文本内容/分论点
+            topic: 研究主题（可选）
+
+        Returns:
+            与 image_sources 一一对应的验证结果
+        """
+        vlm_settings = get_settings_service().load().vlm
+
         if not vlm_settings.enabled:
             # VLM 未启用，默认通过
-            return ImageValidationResult(
-                is_relevant=True,
-                confidence=1.0,
-                reason="VLM 验证未启用",
-                suggested_action="keep"
-            )
-        
+            return [_default_result(1.0, "VLM 验证未启用") for _ in image_sources]
+
         if not vlm_settings.api_key:
-            return ImageValidationResult(
-                is_relevant=True,
-                confidence=0.5,
-                reason="VLM API Key 未配置",
-                suggested_action="keep"
-            )
-        
-        try:
-            # 构建消息
-            prompt = self._build_prompt(context, topic)
-            
-            # 处理图片
-            is_url = isinstance(image_source, str) and image_source.startswith('http')
-            
-            if is_url:
-                image_content = {
-                    "type": "image_url",
-                    "image_url": {"url": image_source}
-                }
+            return [_default_result(0.5, "VLM API Key 未配置") for _ in image_sources]
+
+        cache = self.cache
+        if cache is None and vlm_settings.analysis_cache:
+            cache = get_image_validation_cache()
+        version = analysis_version(
+            VALIDATION_PROMPT, vlm_settings.model, variant=f"max_side={get_image_preprocessor().max_side}"
+        )
+        results: list[Optional[ImageValidationResult]] = [None] * len(image_sources)
+        ctx_hash = context_hash(context, topic)
+        # 图片内容哈希 -> (图片链接或 data URI, 结果下标)；同一张图只验证一次
+        pending: dict[str, tuple[str, list[int]]] = {}
+
+        resolved = await asyncio.gather(*[self._resolve(s) for s in image_sources], return_exceptions=True)
+        for i, item in enumerate(resolved):
+            if isinstance(item, BaseException):
+                results[i] = _default_result(0.3, f"验证出错: {str(item)[:100]}")
+                continue
+            image_url, image_hash = item
+            cached = cache.get(image_hash, ctx_hash, version) if cache is not None else None
+            if cached is not None:
+                self.cache_hits += 1
+                results[i] = ImageValidationResult(**cached)
+            elif image_hash in pending:
+                pending[image_hash][1].append(i)
             else:
-                base64_image = self._encode_image(image_source)
-                image_content = {
-                    "type": "image_url",
-                    "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"}
-                }
-            
-            messages = [
-                {
-                    "role": "user",
-                    "content": [
-                        image_content,
-                        {"type": "text", "text": prompt}
-                    ]
-                }
-            ]
-            
-            # 调用 VLM API
-            client = await self._get_client()
-            response = await client.post(
-                f"{vlm_settings.base_url}/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {vlm_settings.api_key}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": vlm_settings.model,
-                    "messages": messages,
-                    "max_tokens": 500
-                }
-            )
-            
-            response.raise_for_status()
-            result = response.json()
-            
-            # 解析响应
-            return self._parse_response(result)
-            
-        except Exception as e:
-            # 出错时默认保留
-            return ImageValidationResult(
-                is_relevant=True,
-                confidence=0.3,
-                reason=f"验证出错: {str(e)[:100]}",
-                suggested_action="keep"
-            )
-    
-    def _build_prompt(self, context: str, topic: str) -> str:
-        """构建验证提示词"""
-        topic_part = f"研究主题：{topic}\n" if topic else ""
-        
-        return f"""请分析这张图片与以下内容的相关性。
+                pending[image_hash] = (image_url, [i])
 
-{topic_part}内容：{context}
+        hashes = list(pending)
+        size = max(1, vlm_settings.validate_batch_size)
+        slots = asyncio.Semaphore(max(1, vlm_settings.validate_concurrency))
 
-请从以下几个方面评估：
-1. 图片主题与内容是否相关
-2. 图片是否能支持或说明文字内容
-3. 图片质量是否适合用于research报告
+        async def run(group: list[str]) -> None:
+            async with slots:
+                try:
+                    verdicts = await self._validate_group(
+                        vlm_settings, [pending[h][0] for h in group], context, topic
+                    )
+                except Exception as e:
+                    # 出错时默认保留
+                    logger.warning(f"[ImageValidator] {len(group)} 张图片验证失败: {e}")
+                    verdicts = [None] * len(group)
+                    error = _default_result(0.3, f"验证出错: {str(e)[:100]}")
+                else:
+                    error = _default_result(0.5, "无法解析 VLM 响应")
+            for image_hash, verdict in zip(group, verdicts):
+                if verdict is not None and cache is not None:
+                    cache.put(image_hash, ctx_hash, version, verdict.model_dump())
+                for i in pending[image_hash][1]:
+                    results[i] = verdict or error
 
-请用JSON格式回复：
-{{
-  "is_relevant": true/false,
-  "confidence": 0.0-1.0,
-  "reason": "判断理由",
-  "suggested_action": "keep/replace/remove"
-}}
+        await asyncio.gather(*[run(hashes[start:start + size]) for start in range(0, len(hashes), size)])
+        if pending and cache is not None:
+            cache.save()
+        return results
 
-规则：
-- confidence >= 0.6 且 is_relevant=true 时建议 keep
-- confidence < 0.4 或 is_relevant=false 时建议 replace
-- 图片严重不相关或质量差时建议 remove"""
+    async def _validate_group(
+        self,
+        vlm_settings: VLMSettings,
+        image_urls: list[str],
+        context: str,
+        topic: str
+    ) -> list[Optional[ImageValidationResult]]:
+        """一次 VLM 请求验证多张图片，返回与 image_urls 对应的结果（缺失的为 None）"""
+        content: list[dict] = [{"type": "text", "text": self._build_prompt(context, topic, len(image_urls))}]
+        for i, url in enumerate(image_urls):
+            content.append({"type": "text", "text": f"图片 {i}:"})
+            content.append({"type": "image_url", "image_url": {"url": url}})
+
+        # 调用 VLM API（与图片分析共享限速器）
+        await (self.rate_limiter or get_vlm_rate_limiter()).acquire()
+        client = await self._get_client()
+        response = await client.post(
+            f"{vlm_settings.base_url}/chat/completions",
+            headers={
+                "Authorization": f"Bearer {vlm_settings.api_key}",
+                "Content-Type": "application/json"
+            },
+            json={
+                "model": vlm_settings.model,
+                "messages": [{"role": "user", "content": content}],
+                "max_tokens": min(vlm_settings.max_tokens, 200 + TOKENS_PER_VERDICT * len(image_urls))
+            }
+        )
+        response.raise_for_status()
+        return self._parse_response(response.json(), len(image_urls))
+
+    def _build_prompt(self, context: str, topic: str, count: int = 1) -> str:
+        """构建验证提示词"""
+        topic_part = f"研究主题：{topic}\n" if topic else ""
+        return VALIDATION_PROMPT.format(count=count, last=count - 1, topic_part=topic_part, context=context)
 
-    def _parse_response(self, result: dict) -> ImageValidationResult:
-        """解析 VLM 响应"""
-        import json
-        
+    def _parse_response(self, result: dict, count: int = 1) -> list[Optional[ImageValidationResult]]:
+        """解析 VLM 响应，按 image_index 对应到各张图片"""
         try:
             content = result["choices"][0]["message"]["content"]
-            
+
             # 尝试提取 JSON
             if "```json" in content:
                 json_str = content.split("```json")[1].split("```")[0].strip()
@@ -200,29 +308,55 @@ class ImageValidator:
                 end = content.rindex("}") + 1
                 json_str = content[start:end]
             else:
-                # 无法解析，默认保留
-                return ImageValidationResult(
-                    is_relevant=True,
-                    confidence=0.5,
-                    reason="无法解析 VLM 响应",
-                    suggested_action="keep"
-                )
-            
+                logger.warning("[ImageValidator] 无法解析 VLM 响应")
+                return [None] * count
+
             data = json.loads(json_str)
-            return ImageValidationResult(
-                is_relevant=data.get("is_relevant", True),
-                confidence=float(data.get("confidence", 0.5)),
-                reason=data.get("reason", ""),
-                suggested_action=data.get("suggested_action", "keep")
-            )
-            
         except Exception as e:
-            return ImageValidationResult(
-                is_relevant=True,
-                confidence=0.5,
-                reason=f"解析响应出错: {str(e)[:50]}",
-                suggested_action="keep"
-            )
+            logger.warning(f"[ImageValidator] 解析响应出错: {str(e)[:50]}")
+            return [None] * count
+
+        if isinstance(data, dict):
+            # 单图时模型可能直接返回一个判断对象
+            items = data.get("results", [data] if count == 1 and "is_relevant" in data else [])
+        else:
+            items = data if isinstance(data, list) else []
+
+        verdicts: list[Optional[ImageValidationResult]] = [None] * count
+        for position, item in enumerate(items):
+            if not isinstance(item, dict):
+                continue
+            index = item.get("image_index", position)
+            if not isinstance(index, int) or not 0 <= index < count:
+                continue
+            try:
+                verdicts[index] = ImageValidationResult(
+                    is_relevant=item.get("is_relevant", True),
+                    confidence=float(item.get("confidence", 0.5)),
+                    reason=item.get("reason", ""),
+                    suggested_action=item.get("suggested_action", "keep")
+                )
+            except Exception:
+                continue
+        return verdicts
+
+
+# 全局单例
+_validator: Optional[ImageValidator] = None
+
+
+def get_image_validator() -> ImageValidator:
+    """获取图片验证器单例（长连接 HTTP 客户端跨请求复用，VLM 配置每次调用时读取）"""
+    global _validator
+    if _validator is None:
+        _validator = ImageValidator()
+    return _validator
+
+
+async def close_image_validator() -> None:
+    """关闭验证器连接（应用退出时调用）"""
+    if _validator is not None:
+        await _validator.close()
 
 
 async def validate_images_batch(
@@ -232,30 +366,18 @@ async def validate_images_batch(
 ) -> list[dict]:
     """
     批量验证图片
-    
+
     Args:
         images: 图片列表，每项包含 url 和可选的 caption
         context: 相关文本内容
         topic: 研究主题
-        
+
     Returns:
         带验证结果的图片列表
     """
-    validator = ImageValidator()
-    results = []
-    
-    try:
-        for img in images:
-            url = img.get("url", "")
-            if not url:
-                continue
-                
-            result = await validator.validate(url, context, topic)
-            results.append({
-                **img,
-                "validation": result.model_dump()
-            })
-    finally:
-        await validator.close()
-    
-    return results
+    images = [img for img in images if img.get("url", "")]
+    results = await get_image_validator().validate_many([img["url"] for img in images], context, topic)
+    return [
+        {**img, "validation": result.model_dump()}
+        for img, result in zip(images, results)
+    ]
@@ -1,12 +1,16 @@
 """搜索智能体 - 执行MCP工具调用，收集数据"""
 
 import asyncio
-from typing import Callable, Optional
+from typing import AsyncIterator, Callable, Optional
 from openai import AsyncOpenAI
 from .base import BaseAgent
-from ..state import ResearchState, NoteData
+from ..state import ResearchState, NoteData, NotePreview
 from ..mcp import XiaohongshuHTTPClient
 from ..services.settings import get_settings_service
+from ..services.search_budget import AdaptiveBudgetAllocator, rank_previews_globally
+from ..services.dedup import DedupResult, NoteDeduper, dedup_notes
+from ..services.image_downloader import get_image_downloader
+from ..services.relevance import rank_notes, split_by_relevance
 from ..prompts.searcher import SEARCHER_PROMPT
 
 
@@ -37,6 +41,8 @@ class SearcherAgent(BaseAgent):
             model=model
         )
         self.mcp = mcp_client
+        # stream 模式下后台进行中的图片预取任务
+        self._prefetches: set[asyncio.Task] = set()
     
     async def _search_with_retry(
         self, 
@@ -186,13 +192,69 @@ class SearcherAgent(BaseAgent):
         settings = get_settings_service().load()
         notes_per_keyword = settings.search.notes_per_keyword
         
-        # 从配置读取并发数
-        concurrency = settings.search.concurrency
+        # 从配置读取并发数（单账号并发；多账号服务池按可用账号数放大）
+        concurrency = settings.search.concurrency * max(1, getattr(self.mcp, "healthy_count", 1))
         self.MAX_CONCURRENT_SEARCHES = concurrency  # 更新实例变量以便记录
         
         # 使用 Semaphore 控制并发数
         semaphore = asyncio.Semaphore(concurrency)
         
+        # 运行级详情预算（adaptive / global_topk 模式）
+        detail_budget = settings.search.detail_budget or notes_per_keyword * len(keywords_to_search)
+        
+        if settings.search.mode in ("adaptive", "global_topk", "stream"):
+            deduper: Optional[NoteDeduper] = None
+            if settings.search.mode == "stream":
+                if settings.search.dedup:
+                    deduper = NoteDeduper()
+                    for note in state.documents:
+                        deduper.add(note)
+                all_notes = await self._run_stream(
+                    keywords_to_search,
+                    limit=notes_per_keyword,
+                    state=state,
+                    semaphore=semaphore,
+                    deduper=deduper,
+                    prefetch_images=settings.vlm.enabled,
+                    on_log=on_log
+                )
+            elif settings.search.mode == "adaptive":
+                all_notes = await self._run_adaptive(
+                    keywords_to_search,
+                    total_budget=detail_budget,
+                    tranche=settings.search.adaptive_tranche,
+                    round_size=concurrency,
+                    state=state,
+                    semaphore=semaphore,
+                    on_log=on_log
+                )
+            else:
+                all_notes = await self._run_global_topk(
+                    keywords_to_search,
+                    top_k=detail_budget,
+                    state=state,
+                    semaphore=semaphore,
+                    on_log=on_log
+                )
+            state.documents.extend(all_notes)
+            self._log(
+                state, 
+                f"搜索完成，共收集 {len(all_notes)} 篇笔记，总计 {len(state.documents)} 篇", 
+                on_log
+            )
+            if settings.search.dedup:
+                self._dedup_documents(state, on_log, result=deduper.result() if deduper else None)
+            if settings.search.relevance_filter:
+                state.documents = await self.filter_relevant(
+                    state,
+                    state.documents,
+                    use_llm=settings.search.relevance_llm,
+                    max_notes=settings.search.max_notes,
+                    on_log=on_log
+                )
+            self._log_mcp_metrics(state, on_log)
+            return state
+        
         # 并行执行所有搜索任务
         tasks = [
             self._search_single_keyword(
@@ -226,31 +288,383 @@ class SearcherAgent(BaseAgent):
             f"搜索完成，共收集 {len(all_notes)} 篇笔记，总计 {len(state.documents)} 篇", 
             on_log
         )
+        if settings.search.dedup:
+            self._dedup_documents(state, on_log)
+        if settings.search.relevance_filter:
+            state.documents = await self.filter_relevant(
+                state,
+                state.documents,
+                use_llm=settings.search.relevance_llm,
+                max_notes=settings.search.max_notes,
+                on_log=on_log
+            )
+        self._log_mcp_metrics(state, on_log)
         
         return state
     
+    def _dedup_documents(
+        self,
+        state: ResearchState,
+        on_log: Optional[Callable[[str], None]] = None,
+        result: Optional[DedupResult] = None
+    ):
+        """
+        合并近似重复的笔记（SimHash），保留点赞最高的一篇并累加点赞
+        
+        Args:
+            result: 流式模式下 NoteDeduper 已增量算好的结果（覆盖全部笔记），为空时对 state.documents 去重
+        """
+        if result is None:
+            result = dedup_notes(state.documents)
+        state.documents = result.notes
+        if not result.removed:
+            return
+        self._log(
+            state,
+            f"近似重复笔记: 合并 {result.removed} 篇（{len(result.clusters)} 组），"
+            f"剩余 {len(state.documents)} 篇，节省约 {result.tokens_saved} tokens",
+            on_log
+        )
+    
+    def _log_mcp_metrics(self, state: ResearchState, on_log: Optional[Callable[[str], None]] = None):
+        """输出MCP请求合并统计（客户端累计值）"""
+        get_metrics = getattr(self.mcp, "get_metrics", None)
+        if get_metrics is None:
+            return
+        metrics = get_metrics()
+        search = metrics.get("search", {})
+        detail = metrics.get("detail", {})
+        if search.get("coalesced") or detail.get("coalesced"):
+            self._log(
+                state,
+                f"MCP请求合并(累计): 搜索 {search.get('coalesced', 0)}/{search.get('calls', 0)} 次, "
+                f"详情 {detail.get('coalesced', 0)}/{detail.get('calls', 0)} 次",
+                on_log
+            )
+    
+    # 自适应模式下每个关键词保留的预览数量上限（预览来自同一次搜索响应，不额外消耗请求）
+    ADAPTIVE_PREVIEW_LIMIT = 50
+    
+    async def _search_previews_all(
+        self,
+        keywords: list[str],
+        state: ResearchState,
+        semaphore: asyncio.Semaphore,
+        on_log: Optional[Callable[[str], None]] = None
+    ) -> dict[str, list[NotePreview]]:
+        """并行搜索所有关键词，只获取预览（不获取详情）"""
+        async def search_previews(keyword: str) -> list[NotePreview]:
+            async with semaphore:
+                self._log(state, f"搜索关键词: {keyword}", on_log)
+                return await self._search_with_retry(keyword, self.ADAPTIVE_PREVIEW_LIMIT, state, on_log)
+        
+        results = await asyncio.gather(
+            *[search_previews(kw) for kw in keywords],
+            return_exceptions=True
+        )
+        
+        preview_lists: dict[str, list[NotePreview]] = {}
+        for keyword, previews in zip(keywords, results):
+            if isinstance(previews, Exception):
+                self._log(state, f"⚠ 搜索任务异常: {str(previews)[:50]}", on_log)
+                previews = []
+            preview_lists[keyword] = previews
+        return preview_lists
+    
+    async def iter_previews(
+        self,
+        keywords: list[str],
+        limit: int,
+        state: ResearchState,
+        semaphore: asyncio.Semaphore,
+        on_log: Optional[Callable[[str], None]] = None
+    ) -> AsyncIterator[tuple[str, list[NotePreview]]]:
+        """
+        并行搜索所有关键词，按完成顺序逐个产出结果
+        
+        与 _search_previews_all 不同，不等待全部关键词完成：先返回的关键词
+        可以立即开始获取详情。提前退出迭代时会取消尚未完成的搜索。
+        
+        Yields:
+            (关键词, 预览列表)，搜索失败的关键词产出空列表
+        """
+        async def search(keyword: str) -> tuple[str, list[NotePreview]]:
+            async with semaphore:
+                self._log(state, f"搜索关键词: {keyword}", on_log)
+                try:
+                    return keyword, await self._search_with_retry(keyword, limit, state, on_log)
+                except Exception as e:
+                    self._log(state, f"⚠ 搜索任务异常: {str(e)[:50]}", on_log)
+                    return keyword, []
+        
+        tasks = [asyncio.ensure_future(search(kw)) for kw in keywords]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    # stream 模式下每个关键词多取的预览倍数（跨关键词去重后仍能凑满 notes_per_keyword）
+    STREAM_PREVIEW_FACTOR = 3
+    
+    async def _run_stream(
+        self,
+        keywords: list[str],
+        limit: int,
+        state: ResearchState,
+        semaphore: asyncio.Semaphore,
+        deduper: Optional[NoteDeduper] = None,
+        prefetch_images: bool = False,
+        on_log: Optional[Callable[[str], None]] = None
+    ) -> list[NoteData]:
+        """
+        流式模式：关键词搜索一完成就去重并开始获取详情
+        
+        每个关键词取 limit 篇未见过的笔记（按点赞降序），详情获取与其余关键词
+        的搜索重叠执行。每篇详情就绪时立即加入 deduper 判断近似重复；
+        非重复笔记的图片交给共享下载器在后台下载进图片缓存（prefetch_images），
+        图片分析阶段直接读缓存。
+        
+        Args:
+            deduper: 增量去重器（已加入 state.documents），为空时不在流中去重
+            prefetch_images: 是否后台预取图片（VLM 启用时才有意义）
+        """
+        seen = {note.preview.id for note in state.documents if note.preview.id}
+        detail_tasks: list[asyncio.Task] = []
+        prefetched = 0
+        
+        async def fetch(keyword: str, preview: NotePreview) -> NoteData:
+            nonlocal prefetched
+            note = await self._fetch_detail(keyword, preview, state, semaphore, on_log)
+            duplicate = deduper.add(note) if deduper is not None else False
+            if duplicate:
+                self._log(state, f"  [{keyword}] 近似重复笔记: {preview.title[:30]}", on_log)
+            elif prefetch_images and note.detail.images:
+                self._prefetch_images(note.detail.images)
+                prefetched += len(note.detail.images)
+            return note
+        
+        async for keyword, previews in self.iter_previews(
+            keywords, limit * self.STREAM_PREVIEW_FACTOR, state, semaphore, on_log
+        ):
+            ranked = sorted(previews, key=lambda p: p.likes, reverse=True)
+            picked = [p for p in ranked if p.id not in seen][:limit]
+            self._log(state, f"  [{keyword}] 找到 {len(previews)} 篇，新增 {len(picked)} 篇", on_log)
+            for preview in picked:
+                seen.add(preview.id)
+                detail_tasks.append(asyncio.create_task(fetch(keyword, preview)))
+        
+        notes = list(await asyncio.gather(*detail_tasks))
+        if prefetched:
+            self._log(state, f"  后台预取图片 {prefetched} 张", on_log)
+        return notes
+    
+    def _prefetch_images(self, urls: list[str]) -> None:
+        """后台下载图片进图片缓存（不等待；失败由图片分析阶段重新下载）"""
+        async def prefetch() -> None:
+            try:
+                await get_image_downloader().fetch_many(urls)
+            except Exception:
+                pass
+        
+        task = asyncio.create_task(prefetch())
+        self._prefetches.add(task)
+        task.add_done_callback(self._prefetches.discard)
+    
+    async def _fetch_detail(
+        self,
+        keyword: str,
+        preview: NotePreview,
+        state: ResearchState,
+        semaphore: asyncio.Semaphore,
+        on_log: Optional[Callable[[str], None]] = None
+    ) -> NoteData:
+        """获取单篇笔记详情（失败时返回仅含预览的数据）"""
+        async with semaphore:
+            self._log(state, f"  获取详情 [{keyword}]: {preview.title[:30]}...", on_log)
+            try:
+                return await self.mcp.get_note_with_detail(preview, delay=1.0)
+            except Exception as e:
+                self._log(state, f"  ⚠ 获取详情失败: {str(e)}", on_log)
+                return NoteData(preview=preview)
+    
+    async def _run_adaptive(
+        self,
+        keywords: list[str],
+        total_budget: int,
+        tranche: int,
+        round_size: int,
+        state: ResearchState,
+        semaphore: asyncio.Semaphore,
+        on_log: Optional[Callable[[str], None]] = None
+    ) -> list[NoteData]:
+        """
+        自适应预算搜索
+        
+        先并行获取所有关键词的预览和首批详情，再按新颖度把剩余详情预算
+        分配给边际收益最高的关键词。总详情数与固定模式一致。
+        
+        Args:
+            keywords: 关键词列表
+            total_budget: 详情获取总预算
+            tranche: 每个关键词首批获取的详情数
+            round_size: 每轮分配的详情数（通常等于并发数）
+            state: 研究状态
+            semaphore: 并发控制信号量
+            on_log: 日志回调
+            
+        Returns:
+            新收集的笔记列表（已按笔记ID去重）
+        """
+        self._log(state, f"自适应预算模式：详情总预算 {total_budget} 篇，首批每词 {tranche} 篇", on_log)
+        
+        preview_lists = await self._search_previews_all(keywords, state, semaphore, on_log)
+        
+        allocator = AdaptiveBudgetAllocator(total_budget, tranche=tranche, known_notes=state.documents)
+        for keyword, previews in preview_lists.items():
+            allocator.add_keyword(keyword, previews)
+        
+        notes: list[NoteData] = []
+        
+        async def fetch_round(allocations: list[tuple[str, NotePreview]]) -> None:
+            results = await asyncio.gather(*[
+                self._fetch_detail(kw, preview, state, semaphore, on_log)
+                for kw, preview in allocations
+            ])
+            for (kw, _), note in zip(allocations, results):
+                allocator.record(kw, note)
+                notes.append(note)
+        
+        # 首批
+        await fetch_round(allocator.first_tranche())
+        
+        # 按边际收益分配剩余预算
+        while allocations := allocator.next_round(max(1, round_size)):
+            await fetch_round(allocations)
+        
+        for kw, info in allocator.summary().items():
+            self._log(
+                state,
+                f"  [{kw}] 获取 {info['fetched']}/{info['previews']} 篇 | 内容新颖度 {info['content_novelty']}",
+                on_log
+            )
+        
+        return notes
+    
+    async def _run_global_topk(
+        self,
+        keywords: list[str],
+        top_k: int,
+        state: ResearchState,
+        semaphore: asyncio.Semaphore,
+        on_log: Optional[Callable[[str], None]] = None
+    ) -> list[NoteData]:
+        """
+        两阶段全局 Top-K 搜索
+        
+        阶段一并行搜索所有关键词（仅预览）；阶段二对预览全局去重排序
+        （点赞、关键词覆盖度、搜索排名），只为得分最高的 K 篇获取详情。
+        详情获取是主要开销，总量由运行级预算而非 关键词数×数量 决定。
+        
+        Args:
+            keywords: 关键词列表
+            top_k: 详情获取总数
+            state: 研究状态
+            semaphore: 并发控制信号量
+            on_log: 日志回调
+            
+        Returns:
+            新收集的笔记列表
+        """
+        self._log(state, f"全局Top-K模式：阶段一搜索 {len(keywords)} 个关键词", on_log)
+        preview_lists = await self._search_previews_all(keywords, state, semaphore, on_log)
+        
+        known_ids = {note.preview.id for note in state.documents if note.preview.id}
+        ranked = rank_previews_globally(preview_lists, known_ids=known_ids)
+        selected = ranked[:top_k]
+        
+        total_previews = sum(len(p) for p in preview_lists.values())
+        self._log(
+            state,
+            f"阶段二：{total_previews} 条预览去重后 {len(ranked)} 篇，获取得分最高的 {len(selected)} 篇详情",
+            on_log
+        )
+        
+        return list(await asyncio.gather(*[
+            self._fetch_detail("/".join(item.keywords), item.preview, state, semaphore, on_log)
+            for item in selected
+        ]))
+    
     async def filter_relevant(
         self, 
         state: ResearchState,
-        notes: list[NoteData]
+        notes: list[NoteData],
+        use_llm: bool = False,
+        max_notes: int = 0,
+        on_log: Optional[Callable[[str], None]] = None
     ) -> list[NoteData]:
         """
-        使用LLM筛选相关笔记（可选功能）
+        筛选相关笔记：本地 BM25 排序过滤，可选 LLM 复核边界笔记
         
         Args:
             state: 共享状态
             notes: 待筛选笔记
+            use_llm: 是否用 LLM 复核边界笔记（只发送边界笔记的标题）
+            max_notes: 保留数量上限（0=不限）
+            on_log: 日志回调
             
         Returns:
-            相关笔记列表
+            按相关性降序的笔记列表
         """
         if not notes:
             return []
         
-        # 构建筛选请求
+        queries = [state.task]
+        if state.plan:
+            queries.extend(state.plan.dimensions)
+        ranked = rank_notes(notes, queries)
+        relevant, borderline, irrelevant = split_by_relevance(ranked)
+        
+        if use_llm and borderline:
+            confirmed = await self._llm_filter_relevant(state, [item.note for item in borderline])
+            confirmed_ids = {id(note) for note in confirmed}
+            rejected = [item for item in borderline if id(item.note) not in confirmed_ids]
+            borderline = [item for item in borderline if id(item.note) in confirmed_ids]
+            irrelevant.extend(rejected)
+        
+        kept = [item.note for item in relevant + borderline]
+        truncated = 0
+        if max_notes > 0 and len(kept) > max_notes:
+            truncated = len(kept) - max_notes
+            kept = kept[:max_notes]
+        
+        self._log(
+            state,
+            f"相关性筛选: 保留 {len(kept)}/{len(notes)} 篇，丢弃 {len(notes) - len(kept)} 篇"
+            f"（无关 {len(irrelevant)} 篇，超出上限 {truncated} 篇）",
+            on_log
+        )
+        return kept
+    
+    async def _llm_filter_relevant(
+        self, 
+        state: ResearchState,
+        notes: list[NoteData]
+    ) -> list[NoteData]:
+        """
+        使用LLM筛选相关笔记
+        
+        Args:
+            state: 共享状态
+            notes: 待筛选笔记
+            
+        Returns:
+            相关笔记列表
+        """
         notes_summary = "\n".join([
-            f"- {n.preview.title} (点赞: {n.preview.likes})"
-            for n in notes  # 全量筛选、不截断
+            f"{i + 1}. {n.preview.title} (点赞: {n.preview.likes})"
+            for i, n in enumerate(notes)
         ])
         
         messages = [
@@ -264,11 +678,9 @@ class SearcherAgent(BaseAgent):
 """}
         ]
         
-        response = await self._invoke_llm(messages, temperature=0.3)
-        
-        # 解析选中的序号
         try:
+            response = await self._invoke_llm(messages, temperature=0.3)
             indices = [int(x.strip()) - 1 for x in response.split(",")]
             return [notes[i] for i in indices if 0 <= i < len(notes)]
-        except:
-            return notes  # 解析失败时返回全部
+        except Exception:
+            return notes  # 调用或解析失败时视为全部相关
@@ -0,0 +1,155 @@
+"""摘要智能体 - 批量生成笔记摘要，供各阶段 prompt 在预算不足时替代全文"""
+
+import asyncio
+import json
+from typing import Callable, Optional
+from openai import AsyncOpenAI
+from .base import BaseAgent
+from ..state import ResearchState, NoteData
+from ..services.note_summary import NoteSummaryCache, get_note_summary_cache, note_content
+from ..prompts.note_summary import NOTE_SUMMARY_PROMPT
+
+
+class SummarizerAgent(BaseAgent):
+    """
+    摘要智能体
+
+    职责：为长笔记生成摘要，写入 state.note_summaries
+
+    - 摘要按笔记ID+内容哈希缓存，跨研究复用
+    - 未命中缓存的笔记分批并发请求 LLM
+    """
+
+    BATCH_SIZE = 8  # 每次 LLM 请求包含的笔记数
+    MAX_CONCURRENT_BATCHES = 3
+    MAX_INPUT_CHARS = 2000  # 单篇笔记送入摘要请求的最大字数
+
+    def __init__(
+        self,
+        llm_client: AsyncOpenAI,
+        model: str,
+        cache: Optional[NoteSummaryCache] = None
+    ):
+        super().__init__(
+            name="Summarizer",
+            llm_client=llm_client,
+            system_prompt=NOTE_SUMMARY_PROMPT,
+            model=model
+        )
+        self._cache = cache
+
+    @property
+    def cache(self) -> NoteSummaryCache:
+        if self._cache is None:
+            self._cache = get_note_summary_cache()
+        return self._cache
+
+    async def run(
+        self,
+        state: ResearchState,
+        on_log: Optional[Callable[[str], None]] = None,
+        min_chars: int = 300,
+        notes: Optional[list[NoteData]] = None
+    ) -> ResearchState:
+        """
+        为正文不短于 min_chars 的笔记生成摘要（已有摘要的笔记跳过）
+
+        Args:
+            state: 共享状态
+            on_log: 日志回调
+            min_chars: 需要摘要的最短正文长度
+            notes: 只摘要这些笔记（None 表示 state.documents 全部）
+
+        Returns:
+            更新后的状态（note_summaries）
+        """
+        pending: list[NoteData] = []
+        reused = 0
+        for note in state.documents if notes is None else notes:
+            note_id = note.preview.id
+            if not note_id or note_id in state.note_summaries:
+                continue
+            if len(note_content(note)) < min_chars:
+                continue
+            cached = self.cache.get(note)
+            if cached:
+                state.note_summaries[note_id] = cached
+                reused += 1
+            else:
+                pending.append(note)
+
+        if not pending:
+            if reused:
+                self._log(state, f"笔记摘要: 复用缓存 {reused} 篇", on_log)
+            return state
+
+        semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_BATCHES)
+        batches = [pending[i:i + self.BATCH_SIZE] for i in range(0, len(pending), self.BATCH_SIZE)]
+
+        async def summarize(batch: list[NoteData]) -> list[Optional[str]]:
+            async with semaphore:
+                return await self._summarize_batch(batch, on_log)
+
+        results = await asyncio.gather(*[summarize(batch) for batch in batches], return_exceptions=True)
+
+        generated = 0
+        for batch, summaries in zip(batches, results):
+            if isinstance(summaries, Exception):
+                self._log(state, f"⚠ 摘要生成失败: {str(summaries)[:50]}", on_log)
+                continue
+            for note, summary in zip(batch, summaries):
+                if summary:
+                    state.note_summaries[note.preview.id] = summary
+                    self.cache.put(note, summary)
+                    generated += 1
+        self.cache.save()
+
+        self._log(state, f"笔记摘要: 复用缓存 {reused} 篇，新生成 {generated}/{len(pending)} 篇", on_log)
+        return state
+
+    def load_cached(self, state: ResearchState, min_chars: int = 300) -> int:
+        """
+        把缓存中已有的摘要载入 state.note_summaries（不调用 LLM）
+
+        Returns:
+            载入的摘要数
+        """
+        loaded = 0
+        for note in state.documents:
+            note_id = note.preview.id
+            if not note_id or note_id in state.note_summaries or len(note_content(note)) < min_chars:
+                continue
+            cached = self.cache.get(note)
+            if cached:
+                state.note_summaries[note_id] = cached
+                loaded += 1
+        return loaded
+
+    async def _summarize_batch(
+        self,
+        batch: list[NoteData],
+        on_log: Optional[Callable[[str], None]] = None
+    ) -> list[Optional[str]]:
+        """一次请求摘要一批笔记，返回与 batch 对应的摘要（缺失为 None）"""
+        notes_text = "\n\n".join(
+            f"### 笔记 {i + 1}: {note.detail.title or note.preview.title}\n"
+            f"{note_content(note)[:self.MAX_INPUT_CHARS]}"
+            for i, note in enumerate(batch)
+        )
+        messages = [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": notes_text}
+        ]
+        response = await self._invoke_llm(messages, temperature=0.3, max_tokens=300 * len(batch), on_log=on_log)
+
+        try:
+            json_start = response.find("{")
+            json_end = response.rfind("}") + 1
+            data = json.loads(response[json_start:json_end]) if json_start >= 0 else {}
+        except json.JSONDecodeError:
+            data = {}
+
+        return [
+            str(data[str(i + 1)]).strip() if data.get(str(i + 1)) else None
+            for i in range(len(batch))
+        ]
@@ -0,0 +1,493 @@
+"""xiaohongshu-mcp 本地替身服务 - 用于压测、基准测试和重试逻辑验证
+
+实现 XiaohongshuHTTPClient 用到的全部接口：
+- GET  /api/v1/login/status
+- GET  /api/v1/login/qrcode
+- POST /api/v1/feeds/search
+- POST /api/v1/feeds/detail
+- POST /api/v1/publish
+
+支持合成数据或回放录制数据（history.json 或 {"searches":…, "details":…} 格式），
+并可注入延迟分布、随机错误、5xx 突发和限流，便于在本机可复现地测量吞吐与重试。
+
+使用方式：
+    python -m rednote_research.mcp.fake_server --port 18061 \\
+        --search-latency lognormal:0.4:0.5 --error-rate 0.05 --rate-limit-qps 5
+
+    XIAOHONGSHU_MCP_URL=http://localhost:18061 python -m rednote_research.web.app
+"""
+
+import asyncio
+import hashlib
+import json
+import math
+import random
+import struct
+import time
+import zlib
+from pathlib import Path
+from typing import Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+
+
+class LatencyModel:
+    """
+    延迟分布
+
+    规格字符串格式（单位：秒）：
+    - fixed:0.2
+    - uniform:0.1:0.5
+    - normal:0.3:0.1        (均值, 标准差)
+    - lognormal:0.3:0.5     (中位数, sigma)
+    """
+
+    KINDS = ("fixed", "uniform", "normal", "lognormal")
+
+    def __init__(self, kind: str = "fixed", a: float = 0.0, b: float = 0.0):
+        if kind not in self.KINDS:
+            raise ValueError(f"未知的延迟分布: {kind}")
+        self.kind = kind
+        self.a = a
+        self.b = b
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyModel":
+        """从规格字符串解析"""
+        parts = spec.strip().split(":")
+        kind = parts[0] or "fixed"
+        values = [float(p) for p in parts[1:]]
+        a = values[0] if values else 0.0
+        b = values[1] if len(values) > 1 else 0.0
+        return cls(kind, a, b)
+
+    def sample(self, rng: random.Random) -> float:
+        """采样一次延迟（秒，非负）"""
+        if self.kind == "fixed":
+            value = self.a
+        elif self.kind == "uniform":
+            value = rng.uniform(self.a, self.b)
+        elif self.kind == "normal":
+            value = rng.gauss(self.a, self.b)
+        else:
+            value = self.a * math.exp(rng.gauss(0.0, self.b)) if self.a > 0 else 0.0
+        return max(0.0, value)
+
+
+class FakeServerConfig(BaseModel):
+    """替身服务配置"""
+    # 延迟分布
+    search_latency: str = "lognormal:0.4:0.3"
+    detail_latency: str = "lognormal:0.25:0.3"
+    publish_latency: str = "fixed:1.0"
+    login_latency: str = "fixed:0.02"
+    # 故障注入
+    error_rate: float = 0.0  # 单次请求返回 5xx 的概率
+    burst_rate: float = 0.0  # 单次请求触发 5xx 突发的概率
+    burst_length: int = 5  # 突发期间连续失败的请求数
+    rate_limit_qps: float = 0.0  # 令牌桶速率（0=不限流）
+    rate_limit_burst: int = 5  # 令牌桶容量
+    rate_limit_mode: str = "http429"  # http429=返回429, soft=返回200但 success=false（模拟风控）
+    # 数据
+    feeds_per_search: int = 20
+    images_per_note: int = 4
+    overlap_rate: float = 0.2  # 从跨关键词共享池中抽取的比例（模拟不同关键词搜到同一笔记）
+    duplicate_rate: float = 0.1  # 模板化/搬运笔记比例（不同ID，几乎相同的正文）
+    recorded_path: Optional[str] = None  # 录制数据文件
+    serve_images: bool = False  # True 时图片URL指向本服务生成的PNG
+    image_base_url: str = "http://localhost:18061"
+    # 登录
+    logged_in: bool = True
+    username: str = "fake-user"
+    seed: int = 42
+
+
+class FaultInjector:
+    """故障注入器：令牌桶限流 + 随机 5xx + 5xx 突发"""
+
+    def __init__(self, config: FakeServerConfig, rng: random.Random):
+        self.config = config
+        self.rng = rng
+        self._tokens = float(config.rate_limit_burst)
+        self._last_refill = time.monotonic()
+        self._burst_remaining = 0
+
+    def _take_token(self) -> bool:
+        qps = self.config.rate_limit_qps
+        if qps <= 0:
+            return True
+        now = time.monotonic()
+        self._tokens = min(
+            float(self.config.rate_limit_burst),
+            self._tokens + (now - self._last_refill) * qps
+        )
+        self._last_refill = now
+        if self._tokens >= 1.0:
+            self._tokens -= 1.0
+            return True
+        return False
+
+    def decide(self) -> Optional[str]:
+        """
+        决定本次请求的故障类型
+
+        Returns:
+            None（正常）/ "rate_limited" / "burst" / "error"
+        """
+        if not self._take_token():
+            return "rate_limited"
+        if self._burst_remaining > 0:
+            self._burst_remaining -= 1
+            return "burst"
+        if self.config.burst_rate > 0 and self.rng.random() < self.config.burst_rate:
+            self._burst_remaining = max(0, self.config.burst_length - 1)
+            return "burst"
+        if self.config.error_rate > 0 and self.rng.random() < self.config.error_rate:
+            return "error"
+        return None
+
+
+# 合成数据素材
+_SENTENCES = [
+    "先说结论：{kw}真的要提前做功课，不然很容易踩坑。",
+    "整理了一份{kw}清单，按优先级排好了，照着做就行。",
+    "预算有限的话，{kw}可以先从最基础的部分开始。",
+    "很多人问我{kw}怎么选，其实关键就三点：价格、口碑、售后。",
+    "亲测{kw}这几个方法有效，第二个最省钱。",
+    "{kw}避雷指南：这几家千万别去，服务态度差还乱收费。",
+    "第一次尝试{kw}，过程比想象中顺利，分享一下流程。",
+    "做{kw}一定要看清合同条款，尤其是隐藏费用。",
+    "对比了五家，{kw}性价比最高的是最后一家。",
+    "{kw}的时间安排很重要，建议预留至少两周。",
+]
+_TAGS = ["干货分享", "避雷", "攻略", "经验", "新手必看", "好物推荐", "日常"]
+_AUTHORS = ["小鹿", "阿橙", "团子", "木木", "一只猫", "柚子", "大白", "七七"]
+
+
+class FeedStore:
+    """笔记数据源：合成数据 + 可选的录制数据"""
+
+    def __init__(self, config: FakeServerConfig):
+        self.config = config
+        self.details: dict[str, dict] = {}
+        self.tokens: dict[str, str] = {}
+        self._recorded_searches: dict[str, list[str]] = {}
+        self._recorded_pool: list[str] = []
+        self._shared_pool: list[str] = []
+        if config.recorded_path:
+            self._load_recorded(Path(config.recorded_path))
+
+    # ==== 录制数据 ====
+
+    def _load_recorded(self, path: Path) -> None:
+        """加载录制数据，兼容 history.json 和 {"searches", "details"} 两种格式"""
+        data = json.loads(path.read_text(encoding="utf-8"))
+
+        if isinstance(data, dict) and "details" in data:
+            for feed_id, note in data["details"].items():
+                self._register(feed_id, note)
+            for keyword, feed_ids in data.get("searches", {}).items():
+                self._recorded_searches[keyword] = [fid for fid in feed_ids if fid in self.details]
+            self._recorded_pool = list(self.details.keys())
+            return
+
+        records = data if isinstance(data, list) else []
+        for record in records:
+            for note in record.get("notes") or []:
+                feed_id = note.get("id")
+                if not feed_id:
+                    continue
+                self._register(feed_id, {
+                    "title": note.get("title", ""),
+                    "desc": note.get("content", ""),
+                    "user": {"nickname": note.get("author", "")},
+                    "imageList": [{"urlDefault": url} for url in note.get("images", [])],
+                    "tagList": [],
+                    "interactInfo": {"likedCount": str(note.get("likes", 0)), "commentCount": "0"},
+                })
+                self._recorded_pool.append(feed_id)
+
+    def _register(self, feed_id: str, note: dict) -> None:
+        self.details[feed_id] = note
+        self.tokens[feed_id] = hashlib.md5(f"token:{feed_id}".encode()).hexdigest()
+
+    # ==== 合成数据 ====
+
+    def _feed_id(self, seed: str) -> str:
+        return hashlib.sha1(seed.encode()).hexdigest()[:24]
+
+    def _image_url(self, feed_id: str, index: int) -> str:
+        if self.config.serve_images:
+            return f"{self.config.image_base_url.rstrip('/')}/_fake/images/{feed_id}_{index}.png"
+        return (
+            f"http://sns-webpic-qc.xhscdn.com/202501010000/{feed_id[:16]}/"
+            f"fake/{feed_id}{index:02d}!nd_dft_wlteh_webp_3"
+        )
+
+    def _synthesize(self, feed_id: str, keyword: str, rng: random.Random) -> dict:
+        if feed_id in self.details:
+            return self.details[feed_id]
+
+        if self.details and rng.random() < self.config.duplicate_rate:
+            # 模板化/搬运笔记：复用已有正文，仅修改少量字符
+            source = self.details[rng.choice(list(self.details.keys()))]
+            desc = source["desc"] + rng.choice(["", "！", "～", " #转发"])
+            title = source["title"]
+        else:
+            sentences = rng.sample(_SENTENCES, k=min(4, len(_SENTENCES)))
+            desc = "".join(s.format(kw=keyword) for s in sentences)
+            title = f"{keyword}｜{rng.choice(['真实经验', '保姆级攻略', '避坑总结', '一文说清'])}"
+
+        tags = rng.sample(_TAGS, k=3)
+        note = {
+            "title": title,
+            "desc": desc + " " + " ".join(f"#{t}[话题]#" for t in tags),
+            "user": {"nickname": rng.choice(_AUTHORS)},
+            "imageList": [
+                {"urlDefault": self._image_url(feed_id, j)}
+                for j in range(rng.randint(1, max(1, self.config.images_per_note)))
+            ],
+            "tagList": [{"name": t} for t in tags],
+            "interactInfo": {
+                "likedCount": self._format_count(int(rng.paretovariate(1.2) * 50)),
+                "commentCount": str(rng.randint(0, 300)),
+            },
+        }
+        self._register(feed_id, note)
+        return note
+
+    @staticmethod
+    def _format_count(value: int) -> str:
+        if value >= 10000:
+            return f"{value / 10000:.1f}万"
+        return str(value)
+
+    def search(self, keyword: str) -> list[dict]:
+        """返回搜索结果 feeds 列表（同一关键词结果稳定）"""
+        rng = random.Random(f"{self.config.seed}:{keyword}")
+
+        if keyword in self._recorded_searches:
+            feed_ids = self._recorded_searches[keyword]
+        else:
+            feed_ids = []
+            if self._recorded_pool:
+                ranked = sorted(
+                    self._recorded_pool,
+                    key=lambda fid: -len(set(keyword) & set(self.details[fid].get("title", "")))
+                )
+                feed_ids.extend(ranked[: self.config.feeds_per_search // 2])
+
+            while len(feed_ids) < self.config.feeds_per_search:
+                if rng.random() < self.config.overlap_rate:
+                    # 跨关键词共享池
+                    if len(self._shared_pool) < self.config.feeds_per_search * 2:
+                        self._shared_pool.append(self._feed_id(f"shared:{len(self._shared_pool)}"))
+                    feed_id = rng.choice(self._shared_pool)
+                else:
+                    feed_id = self._feed_id(f"{keyword}:{len(feed_ids)}")
+                if feed_id not in feed_ids:
+                    feed_ids.append(feed_id)
+
+        feeds = []
+        for feed_id in feed_ids:
+            note = self._synthesize(feed_id, keyword, rng)
+            feeds.append({
+                "id": feed_id,
+                "xsecToken": self.tokens[feed_id],
+                "modelType": "note",
+                "noteCard": {
+                    "displayTitle": note.get("title", ""),
+                    "user": note.get("user", {}),
+                    "interactInfo": {"likedCount": note.get("interactInfo", {}).get("likedCount", "0")},
+                },
+            })
+        return feeds
+
+    def detail(self, feed_id: str, xsec_token: str) -> Optional[dict]:
+        """返回笔记详情，token 不匹配时返回 None"""
+        if feed_id not in self.details or self.tokens.get(feed_id) != xsec_token:
+            return None
+        return self.details[feed_id]
+
+
+def _render_png(seed: str, size: int = 256) -> bytes:
+    """生成一张确定性的渐变 PNG（无第三方依赖）"""
+    digest = hashlib.md5(seed.encode()).digest()
+    r0, g0, b0 = digest[0], digest[1], digest[2]
+    rows = []
+    for y in range(size):
+        row = bytearray([0])  # filter type: None
+        for x in range(size):
+            row += bytes(((r0 + x) & 0xFF, (g0 + y) & 0xFF, (b0 + x + y) & 0xFF))
+        rows.append(bytes(row))
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    header = struct.pack(">IIBBBBB", size, size, 8, 2, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", header)
+        + chunk(b"IDAT", zlib.compress(b"".join(rows), 6))
+        + chunk(b"IEND", b"")
+    )
+
+
+def create_fake_app(config: Optional[FakeServerConfig] = None) -> FastAPI:
+    """创建替身服务 FastAPI 应用"""
+    config = config or FakeServerConfig()
+    rng = random.Random(config.seed)
+    store = FeedStore(config)
+    faults = FaultInjector(config, rng)
+    latencies = {
+        "login": LatencyModel.parse(config.login_latency),
+        "search": LatencyModel.parse(config.search_latency),
+        "detail": LatencyModel.parse(config.detail_latency),
+        "publish": LatencyModel.parse(config.publish_latency),
+    }
+    stats: dict[str, dict[str, int]] = {}
+
+    app = FastAPI(title="Fake xiaohongshu-mcp", version="0.1.0")
+    app.state.config = config
+    app.state.store = store
+    app.state.stats = stats
+
+    def count(endpoint: str, outcome: str) -> None:
+        bucket = stats.setdefault(endpoint, {})
+        bucket[outcome] = bucket.get(outcome, 0) + 1
+
+    async def simulate(endpoint: str) -> Optional[JSONResponse]:
+        """模拟延迟和故障，返回非 None 时直接作为响应"""
+        count(endpoint, "requests")
+        await asyncio.sleep(latencies[endpoint].sample(rng))
+
+        fault = faults.decide()
+        if fault is None:
+            count(endpoint, "ok")
+            return None
+
+        count(endpoint, fault)
+        if fault == "rate_limited":
+            body = {"success": False, "message": "请求过于频繁，请稍后再试"}
+            if config.rate_limit_mode == "soft":
+                return JSONResponse(body, status_code=200)
+            return JSONResponse(body, status_code=429)
+        return JSONResponse(
+            {"success": False, "error": "internal error", "message": f"injected {fault}"},
+            status_code=503 if fault == "burst" else 500
+        )
+
+    @app.get("/api/v1/login/status")
+    async def login_status():
+        if (failed := await simulate("login")) is not None:
+            return failed
+        return {
+            "success": True,
+            "data": {"is_logged_in": config.logged_in, "username": config.username if config.logged_in else ""},
+        }
+
+    @app.get("/api/v1/login/qrcode")
+    async def login_qrcode():
+        return {"success": True, "data": {"img": "", "timeout": "0s", "is_logged_in": config.logged_in}}
+
+    @app.post("/api/v1/feeds/search")
+    async def feeds_search(request: Request):
+        if (failed := await simulate("search")) is not None:
+            return failed
+        payload = await request.json()
+        keyword = payload.get("keyword", "")
+        if not keyword:
+            return JSONResponse({"success": False, "message": "keyword 不能为空"}, status_code=400)
+        feeds = store.search(keyword)
+        return {"success": True, "data": {"feeds": feeds, "count": len(feeds)}}
+
+    @app.post("/api/v1/feeds/detail")
+    async def feeds_detail(request: Request):
+        if (failed := await simulate("detail")) is not None:
+            return failed
+        payload = await request.json()
+        feed_id = payload.get("feed_id", "")
+        note = store.detail(feed_id, payload.get("xsec_token", ""))
+        if note is None:
+            return {"success": False, "message": "笔记不存在或 xsec_token 无效"}
+        return {"success": True, "data": {"feed_id": feed_id, "data": {"note": note}}}
+
+    @app.post("/api/v1/publish")
+    async def publish(request: Request):
+        if (failed := await simulate("publish")) is not None:
+            return failed
+        payload = await request.json()
+        if not payload.get("title") or not payload.get("images"):
+            return {"success": False, "message": "标题和图片不能为空"}
+        note_id = hashlib.sha1(json.dumps(payload, sort_keys=True).encode()).hexdigest()[:24]
+        return {"success": True, "data": {"note_id": note_id}}
+
+    @app.get("/_fake/images/{name}")
+    async def fake_image(name: str):
+        return Response(content=_render_png(name), media_type="image/png")
+
+    @app.get("/_fake/stats")
+    async def fake_stats():
+        return stats
+
+    @app.post("/_fake/reset")
+    async def fake_reset():
+        stats.clear()
+        return {"success": True}
+
+    return app
+
+
+def main() -> None:
+    """命令行入口"""
+    import argparse
+    import uvicorn
+
+    defaults = FakeServerConfig()
+    parser = argparse.ArgumentParser(description="xiaohongshu-mcp 本地替身服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=18061)
+    parser.add_argument("--search-latency", default=defaults.search_latency)
+    parser.add_argument("--detail-latency", default=defaults.detail_latency)
+    parser.add_argument("--publish-latency", default=defaults.publish_latency)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate)
+    parser.add_argument("--burst-rate", type=float, default=defaults.burst_rate)
+    parser.add_argument("--burst-length", type=int, default=defaults.burst_length)
+    parser.add_argument("--rate-limit-qps", type=float, default=defaults.rate_limit_qps)
+    parser.add_argument("--rate-limit-burst", type=int, default=defaults.rate_limit_burst)
+    parser.add_argument("--rate-limit-mode", choices=["http429", "soft"], default=defaults.rate_limit_mode)
+    parser.add_argument("--feeds-per-search", type=int, default=defaults.feeds_per_search)
+    parser.add_argument("--overlap-rate", type=float, default=defaults.overlap_rate)
+    parser.add_argument("--duplicate-rate", type=float, default=defaults.duplicate_rate)
+    parser.add_argument("--recorded", dest="recorded_path", default=None, help="录制数据文件路径")
+    parser.add_argument("--serve-images", action="store_true", help="图片URL指向本服务生成的PNG")
+    parser.add_argument("--logged-out", action="store_true", help="模拟未登录状态")
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    args = parser.parse_args()
+
+    config = FakeServerConfig(
+        search_latency=args.search_latency,
+        detail_latency=args.detail_latency,
+        publish_latency=args.publish_latency,
+        error_rate=args.error_rate,
+        burst_rate=args.burst_rate,
+        burst_length=args.burst_length,
+        rate_limit_qps=args.rate_limit_qps,
+        rate_limit_burst=args.rate_limit_burst,
+        rate_limit_mode=args.rate_limit_mode,
+        feeds_per_search=args.feeds_per_search,
+        overlap_rate=args.overlap_rate,
+        duplicate_rate=args.duplicate_rate,
+        recorded_path=args.recorded_path,
+        serve_images=args.serve_images,
+        image_base_url=f"http://{args.host}:{args.port}",
+        logged_in=not args.logged_out,
+        seed=args.seed,
+    )
+    uvicorn.run(create_fake_app(config), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
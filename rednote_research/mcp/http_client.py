@@ -9,6 +9,7 @@ import os
 import httpx
 from typing import Optional, Any
 from ..state import NotePreview, NoteDetail, NoteData
+from .singleflight import SingleFlight
 
 
 # 默认 MCP 服务地址（Docker 内部网络 或 本地）
@@ -22,25 +23,34 @@ class XiaohongshuHTTPClient:
     通过 HTTP REST API 与 xiaohongshu-mcp 服务通信
     """
     
-    def __init__(self, base_url: str = None, timeout: float = 120.0):
+    def __init__(
+        self,
+        base_url: str = None,
+        timeout: float = 120.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
         """
         初始化客户端
         
         Args:
             base_url: xiaohongshu-mcp 服务地址
             timeout: 请求超时时间（秒）
+            transport: 可选的 httpx 传输层（测试/基准测试时可直连 ASGI 应用）
         """
         self.base_url = (base_url or DEFAULT_MCP_URL).rstrip("/")
         self.timeout = timeout
+        self.transport = transport
         self._client: Optional[httpx.AsyncClient] = None
         self._last_search_tokens: dict[str, str] = {}  # xsec_token 缓存
+        self._flight = SingleFlight()  # 并发相同请求合并
     
     async def connect(self) -> None:
         """建立连接"""
         if self._client is None:
             self._client = httpx.AsyncClient(
                 base_url=self.base_url,
-                timeout=self.timeout
+                timeout=self.timeout,
+                transport=self.transport
             )
     
     async def disconnect(self) -> None:
@@ -102,11 +112,26 @@ class XiaohongshuHTTPClient:
         max_retries: int = 3
     ) -> tuple[list[NotePreview], dict[str, str]]:
         """
-        搜索笔记（带重试）
+        搜索笔记（带重试，并发的相同搜索会被合并为一次请求）
         
         Returns:
             (笔记预览列表, xsec_token字典)
         """
+        notes, tokens = await self._flight.do(
+            ("search", keyword, sort_by, note_type),
+            lambda: self._search_feeds(keyword, sort_by, note_type, max_retries)
+        )
+        # 返回副本，避免共享结果的调用方互相影响
+        return [note.model_copy() for note in notes], dict(tokens)
+    
+    async def _search_feeds(
+        self, 
+        keyword: str,
+        sort_by: str,
+        note_type: str,
+        max_retries: int
+    ) -> tuple[list[NotePreview], dict[str, str]]:
+        """搜索笔记（实际请求）"""
         import asyncio
         
         await self._ensure_connected()
@@ -176,8 +201,20 @@ class XiaohongshuHTTPClient:
         xsec_token: str
     ) -> NoteDetail:
         """
-        获取笔记详情
+        获取笔记详情（并发的相同笔记请求会被合并为一次请求）
         """
+        detail = await self._flight.do(
+            ("detail", feed_id),
+            lambda: self._get_feed_detail(feed_id, xsec_token)
+        )
+        return detail.model_copy(deep=True)
+    
+    async def _get_feed_detail(
+        self, 
+        feed_id: str, 
+        xsec_token: str
+    ) -> NoteDetail:
+        """获取笔记详情（实际请求）"""
         await self._ensure_connected()
         response = await self._client.post("/api/v1/feeds/detail", json={
             "feed_id": feed_id,
@@ -262,6 +299,22 @@ class XiaohongshuHTTPClient:
         except Exception:
             return NoteData(preview=preview)
     
+    # ==== 指标 ====
+    
+    def get_metrics(self) -> dict:
+        """
+        请求合并统计
+        
+        Returns:
+            {"search": {"calls", "executed", "coalesced"}, "detail": {...}, "inflight": int}
+        """
+        metrics = {
+            group: dict(counter)
+            for group, counter in self._flight.stats.items()
+        }
+        metrics["inflight"] = self._flight.inflight
+        return metrics
+    
     # ==== 工具方法 ====
     
     async def _ensure_connected(self):
@@ -0,0 +1,330 @@
+"""多账号 MCP 服务池 - 在多个 xiaohongshu-mcp 实例（每个实例一个登录账号）之间分发请求
+
+单个账号的搜索吞吐受风控限制（并发 3-5 以上容易触发），增加账号是提升总吞吐的
+唯一途径。服务池提供与 XiaohongshuHTTPClient 相同的接口：
+
+- 每个账号独立的令牌桶配额（请求速率 + 突发）
+- 最少负载路由：优先选择进行中请求最少、配额最充足的账号
+- 健康检查：登录过期或连续失败的账号自动摘除，恢复登录后自动加回
+- 详情请求路由到签发 xsec_token 的账号（token 与账号会话绑定）；签发账号不可用时直接失败，
+  不把 token 发给其他账号（必然失败，还会计入该账号的连续失败次数）
+
+配置：XIAOHONGSHU_MCP_URLS=http://mcp-a:18060,http://mcp-b:18060
+"""
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+import httpx
+
+from ..state import NotePreview, NoteDetail, NoteData
+from .http_client import XiaohongshuHTTPClient
+from .singleflight import SingleFlight
+from ..services.rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+
+# 单账号默认配额：每秒请求数与突发容量
+DEFAULT_ACCOUNT_QPS = 1.0
+DEFAULT_ACCOUNT_BURST = 3
+# 连续失败多少次后摘除账号（等待下次健康检查恢复）
+MAX_CONSECUTIVE_FAILURES = 3
+
+
+@dataclass
+class MCPAccount:
+    """池中的单个账号"""
+    name: str
+    client: XiaohongshuHTTPClient
+    bucket: TokenBucket
+    healthy: bool = True
+    username: str = ""
+    inflight: int = 0
+    requests: int = 0
+    errors: int = 0
+    consecutive_failures: int = 0
+    last_error: str = ""
+    last_checked: float = 0.0
+    tokens: dict[str, str] = field(default_factory=dict)  # 该账号签发的 xsec_token
+
+    def load(self) -> float:
+        """负载评分：进行中请求数 + 配额等待时间"""
+        return self.inflight + self.bucket.wait_time
+
+
+class MCPEndpointPool:
+    """
+    多账号 MCP 服务池
+
+    使用方法:
+        pool = MCPEndpointPool(["http://mcp-a:18060", "http://mcp-b:18060"])
+        await pool.connect()
+        notes, tokens = await pool.search_feeds("露营装备")
+        detail = await pool.get_feed_detail(notes[0].id, tokens[notes[0].id])
+    """
+
+    def __init__(
+        self,
+        base_urls: list[str],
+        qps_per_account: float = DEFAULT_ACCOUNT_QPS,
+        burst_per_account: int = DEFAULT_ACCOUNT_BURST,
+        timeout: float = 120.0,
+        transport_factory: Optional[Callable[[str], httpx.AsyncBaseTransport]] = None
+    ):
+        """
+        Args:
+            base_urls: 各账号 xiaohongshu-mcp 服务地址
+            qps_per_account: 单账号每秒请求数配额（<=0 表示不限速）
+            burst_per_account: 单账号突发容量
+            timeout: 请求超时时间（秒）
+            transport_factory: 可选，按地址创建 httpx 传输层（测试时直连 ASGI 应用）
+        """
+        if not base_urls:
+            raise ValueError("MCP 服务池至少需要一个地址")
+        self.accounts: list[MCPAccount] = []
+        for url in base_urls:
+            transport = transport_factory(url) if transport_factory else None
+            self.accounts.append(MCPAccount(
+                name=url.rstrip("/"),
+                client=XiaohongshuHTTPClient(base_url=url, timeout=timeout, transport=transport),
+                bucket=TokenBucket(qps_per_account, burst_per_account)
+            ))
+        self._flight = SingleFlight()
+        self._token_owner: dict[str, MCPAccount] = {}  # feed_id -> 签发 token 的账号
+
+    @property
+    def healthy_count(self) -> int:
+        """可用账号数"""
+        return sum(1 for account in self.accounts if account.healthy)
+
+    async def connect(self) -> None:
+        for account in self.accounts:
+            await account.client.connect()
+
+    async def disconnect(self) -> None:
+        for account in self.accounts:
+            await account.client.disconnect()
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *args):
+        await self.disconnect()
+
+    # ==== 健康检查 / 登录 ====
+
+    async def check_health(self) -> None:
+        """检查所有账号的登录状态，摘除过期账号、恢复重新登录的账号"""
+        await asyncio.gather(*(self._check_account(account) for account in self.accounts))
+
+    async def _check_account(self, account: MCPAccount) -> None:
+        try:
+            status = await account.client.check_login_status()
+            logged_in = bool(status.get("is_logged_in"))
+            account.username = status.get("username", "")
+            account.last_error = "" if logged_in else "未登录或登录已过期"
+        except Exception as e:
+            logged_in = False
+            account.last_error = str(e)
+        account.last_checked = time.time()
+
+        if logged_in != account.healthy:
+            state = "恢复" if logged_in else "摘除"
+            logger.warning(f"[MCPEndpointPool] 账号{state}: {account.name} {account.last_error}")
+        account.healthy = logged_in
+        if logged_in:
+            account.consecutive_failures = 0
+
+    async def check_login_status(self) -> dict:
+        """
+        检查登录状态（同时刷新各账号健康状态）
+
+        Returns:
+            {"is_logged_in": bool, "username": str, "accounts": [...]}
+            任一账号可用即视为已登录
+        """
+        await self.check_health()
+        healthy = [account for account in self.accounts if account.healthy]
+        return {
+            "is_logged_in": bool(healthy),
+            "username": ", ".join(account.username for account in healthy if account.username),
+            "accounts": self._account_summaries()
+        }
+
+    async def get_login_qrcode(self) -> dict:
+        """获取登录二维码（优先为未登录的账号获取）"""
+        target = next((account for account in self.accounts if not account.healthy), self.accounts[0])
+        result = await target.client.get_login_qrcode()
+        result["account"] = target.name
+        return result
+
+    # ==== 路由 ====
+
+    def _pick(self, preferred: Optional[MCPAccount] = None) -> MCPAccount:
+        """选择账号：优先指定账号（需可用），否则选负载最低的可用账号"""
+        if preferred is not None and preferred.healthy:
+            return preferred
+        healthy = [account for account in self.accounts if account.healthy]
+        if not healthy:
+            raise Exception("没有可用的小红书账号（全部未登录或不可用）")
+        return min(healthy, key=lambda account: account.load())
+
+    async def _call(self, account: MCPAccount, func: Callable):
+        await account.bucket.acquire()
+        account.inflight += 1
+        account.requests += 1
+        try:
+            result = await func(account.client)
+        except Exception as e:
+            account.errors += 1
+            account.consecutive_failures += 1
+            account.last_error = str(e)
+            if account.consecutive_failures >= MAX_CONSECUTIVE_FAILURES and account.healthy:
+                account.healthy = False
+                logger.warning(f"[MCPEndpointPool] 账号连续失败，暂时摘除: {account.name} {e}")
+            raise
+        finally:
+            account.inflight -= 1
+        account.consecutive_failures = 0
+        return result
+
+    # ==== 搜索相关 ====
+
+    async def search_feeds(
+        self,
+        keyword: str,
+        sort_by: str = "综合",
+        note_type: str = "不限",
+        max_retries: int = 3
+    ) -> tuple[list[NotePreview], dict[str, str]]:
+        """搜索笔记（路由到负载最低的账号，并发的相同搜索合并为一次请求）"""
+        notes, tokens = await self._flight.do(
+            ("search", keyword, sort_by, note_type),
+            lambda: self._search_feeds(keyword, sort_by, note_type, max_retries)
+        )
+        return [note.model_copy() for note in notes], dict(tokens)
+
+    async def _search_feeds(
+        self,
+        keyword: str,
+        sort_by: str,
+        note_type: str,
+        max_retries: int
+    ) -> tuple[list[NotePreview], dict[str, str]]:
+        account = self._pick()
+        notes, tokens = await self._call(
+            account,
+            lambda client: client.search_feeds(keyword, sort_by, note_type, max_retries)
+        )
+        for feed_id, token in tokens.items():
+            account.tokens[feed_id] = token
+            self._token_owner[feed_id] = account
+        return notes, tokens
+
+    async def get_feed_detail(self, feed_id: str, xsec_token: str) -> NoteDetail:
+        """
+        获取笔记详情（路由到签发 token 的账号）
+
+        Raises:
+            Exception: 签发 token 的账号不可用（token 只在签发账号的会话中有效，不退回其他账号）
+        """
+        detail = await self._flight.do(
+            ("detail", feed_id),
+            lambda: self._get_feed_detail(feed_id, xsec_token)
+        )
+        return detail.model_copy(deep=True)
+
+    async def _get_feed_detail(self, feed_id: str, xsec_token: str) -> NoteDetail:
+        owner = self._token_owner.get(feed_id)
+        if owner is not None and not owner.healthy:
+            raise Exception(f"签发 xsec_token 的账号不可用: {owner.name}")
+        # 来源未知的 token（调用方自行传入）交给负载最低的账号
+        account = owner or self._pick()
+        return await self._call(account, lambda client: client.get_feed_detail(feed_id, xsec_token))
+
+    # ==== 兼容旧接口 ====
+
+    async def search_notes(self, keyword: str, limit: int = 10, sort: str = "general") -> list[NotePreview]:
+        """搜索笔记（兼容旧接口）"""
+        notes, _ = await self.search_feeds(keyword)
+        return notes[:limit]
+
+    async def get_note_with_detail(self, preview: NotePreview, delay: float = 1.0, xsec_token: str = None) -> NoteData:
+        """获取完整笔记数据 - 自动使用签发账号缓存的 xsec_token"""
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        owner = self._token_owner.get(preview.id)
+        token = xsec_token or (owner.tokens.get(preview.id) if owner else None)
+        if not token:
+            return NoteData(preview=preview, detail=NoteDetail(
+                title=preview.title, author=preview.author, url=preview.url
+            ))
+
+        try:
+            detail = await self.get_feed_detail(preview.id, token)
+            return NoteData(preview=preview, detail=detail)
+        except Exception:
+            return NoteData(preview=preview)
+
+    # ==== 发布相关 ====
+
+    async def publish_content(self, title: str, content: str, images: list[str], tags: list[str] = None) -> dict:
+        """发布笔记（使用第一个可用账号）"""
+        account = self._pick(preferred=next((a for a in self.accounts if a.healthy), None))
+        return await account.client.publish_content(title, content, images, tags)
+
+    # ==== 指标 ====
+
+    def get_metrics(self) -> dict:
+        """
+        请求合并统计 + 各账号负载
+
+        Returns:
+            {"search": {...}, "detail": {...}, "inflight": int, "accounts": [...]}
+        """
+        metrics = {
+            group: dict(counter)
+            for group, counter in self._flight.stats.items()
+        }
+        metrics["inflight"] = self._flight.inflight
+        metrics["accounts"] = self._account_summaries()
+        return metrics
+
+    def _account_summaries(self) -> list[dict]:
+        return [
+            {
+                "name": account.name,
+                "username": account.username,
+                "healthy": account.healthy,
+                "inflight": account.inflight,
+                "requests": account.requests,
+                "errors": account.errors,
+                "last_error": account.last_error,
+            }
+            for account in self.accounts
+        ]
+
+
+def create_mcp_client():
+    """
+    根据环境变量创建 MCP 客户端
+
+    - XIAOHONGSHU_MCP_URLS（逗号分隔，多于一个地址）: 返回 MCPEndpointPool
+    - 否则: 返回单账号的 XiaohongshuHTTPClient（XIAOHONGSHU_MCP_URL）
+    """
+    urls = [url.strip() for url in os.getenv("XIAOHONGSHU_MCP_URLS", "").split(",") if url.strip()]
+    if len(urls) > 1:
+        return MCPEndpointPool(
+            urls,
+            qps_per_account=float(os.getenv("MCP_ACCOUNT_QPS", str(DEFAULT_ACCOUNT_QPS))),
+            burst_per_account=int(os.getenv("MCP_ACCOUNT_BURST", str(DEFAULT_ACCOUNT_BURST)))
+        )
+    mcp_url = urls[0] if urls else os.getenv("XIAOHONGSHU_MCP_URL", "http://localhost:18060")
+    return XiaohongshuHTTPClient(base_url=mcp_url)
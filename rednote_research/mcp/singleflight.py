@@ -0,0 +1,57 @@
+"""请求合并（single-flight）- 并发的相同请求共享同一个进行中的调用
+
+多个研究任务同时搜索热门话题时，相同的 search_feeds(keyword) 和
+get_feed_detail(feed_id) 会被并发发出。合并后只有第一个请求真正访问
+MCP 服务，其余请求等待并共享它的结果（或异常）。
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    请求合并器
+
+    使用方法:
+        flight = SingleFlight()
+        result = await flight.do(("search", keyword), lambda: do_search(keyword))
+
+    key 为元组时，第一个元素作为统计分组名。
+    """
+
+    def __init__(self):
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+        self.stats: dict[str, dict[str, int]] = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        """执行或加入一个进行中的调用"""
+        group = key[0] if isinstance(key, tuple) and key else "default"
+        counter = self.stats.setdefault(group, {"calls": 0, "executed": 0, "coalesced": 0})
+        counter["calls"] += 1
+
+        future = self._inflight.get(key)
+        if future is None:
+            counter["executed"] += 1
+            future = asyncio.ensure_future(func())
+            self._inflight[key] = future
+            future.add_done_callback(lambda f, k=key: self._forget(k, f))
+        else:
+            counter["coalesced"] += 1
+
+        # shield：某个等待者被取消时，不影响共享同一调用的其他等待者
+        return await asyncio.shield(future)
+
+    @property
+    def inflight(self) -> int:
+        """进行中的调用数"""
+        return len(self._inflight)
+
+    def _forget(self, key: Hashable, future: asyncio.Future) -> None:
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        # 所有等待者都已取消时，避免 "exception was never retrieved" 警告
+        if not future.cancelled():
+            future.exception()
@@ -1,9 +1,38 @@
 """报告导出服务 - 支持多格式导出"""
 
 import re
+import urllib.request
 from typing import Optional
 from datetime import datetime
 
+from ..services.image_cache import get_image_cache
+from ..services.image_downloader import DEFAULT_HEADERS
+
+
+def _cached_url_fetcher(url: str, *args, **kwargs) -> dict:
+    """
+    WeasyPrint 资源加载：远程图片经过本地图片缓存
+
+    未命中时带 Referer 下载（CDN 防盗链）并写入缓存，非图片资源不缓存。
+    """
+    from weasyprint import default_url_fetcher
+    
+    if not url.startswith(("http://", "https://")):
+        return default_url_fetcher(url, *args, **kwargs)
+    
+    cache = get_image_cache()
+    hit = cache.get(url)
+    if hit is not None:
+        return {"string": hit.data, "mime_type": hit.content_type, "redirected_url": url}
+    
+    request = urllib.request.Request(url, headers=DEFAULT_HEADERS)
+    with urllib.request.urlopen(request, timeout=30) as resp:
+        data = resp.read()
+        mime_type = resp.headers.get_content_type()
+    if mime_type.startswith("image/"):
+        cache.put(url, data, mime_type)
+    return {"string": data, "mime_type": mime_type, "redirected_url": url}
+
 
 class ReportExporter:
     """
@@ -134,7 +163,7 @@ class ReportExporter:
         try:
             from weasyprint import HTML
             logger.info("[Exporter] 开始PDF转换...")
-            pdf_bytes = HTML(string=html).write_pdf()
+            pdf_bytes = HTML(string=html, url_fetcher=_cached_url_fetcher).write_pdf()
             logger.info(f"[Exporter] PDF转换成功，大小: {len(pdf_bytes)} bytes")
             return pdf_bytes
         except ImportError as e:
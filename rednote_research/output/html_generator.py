@@ -6,7 +6,10 @@ from typing import Optional, Callable, AsyncGenerator
 from openai import AsyncOpenAI
 from ..state import ResearchState
 from ..services.settings import get_settings_service
-from ..prompts.section_writer import SECTION_WRITER_PROMPT
+from ..services.note_summary import select_note_texts
+from ..services.note_format import format_notes_compact
+from ..services.prompt_alias import PromptAliases
+from ..prompts.section_writer import build_section_writer_prompt
 
 logger = logging.getLogger(__name__)
 
@@ -74,13 +77,18 @@ class HTMLReportGenerator:
         section_content = section.get('content', '')
         images = section.get('images', [])
         source_notes = section.get('source_notes', [])
+        aliases = self._new_aliases()
         
         # 准备引用的笔记数据
         notes_context = ""
-        for idx in source_notes:  # 全量引用
-            if idx < len(state.documents):
-                note = state.documents[idx]
-                notes_context += f"\n- {note.detail.title}: {note.detail.content}"
+        notes = [state.documents[idx] for idx in source_notes if idx < len(state.documents)]  # 全量引用
+        contents = select_note_texts(notes, state.note_summaries, self.settings.prompt.section_note_budget)
+        for note, content in zip(notes, contents):
+            note_ref = aliases.note(note) if aliases is not None else None
+            link = f" ({note_ref})" if note_ref else ""
+            notes_context += f"\n- {note.detail.title}{link}: {content}"
+        
+        image_refs = aliases.images(images[:4]) if aliases is not None else images[:4]
         
         # 构建章节Prompt
         prompt = f"""## 章节信息
@@ -89,7 +97,7 @@ class HTMLReportGenerator:
 内容提纲: {section_content}
 
 ## 可用图片
-{chr(10).join([f'- {img}' for img in images[:4]])}
+{chr(10).join([f'- {img}' for img in image_refs])}
 
 ## 引用笔记
 {notes_context if notes_context else '无特定引用'}
@@ -97,7 +105,7 @@ class HTMLReportGenerator:
 请生成这个章节的HTML内容片段，图文交错排版。"""
         
         messages = [
-            {"role": "system", "content": SECTION_WRITER_PROMPT},
+            {"role": "system", "content": build_section_writer_prompt(aliases is not None)},
             {"role": "user", "content": prompt}
         ]
         
@@ -120,6 +128,8 @@ class HTMLReportGenerator:
         
         html = response.choices[0].message.content or ""
         html = self._clean_markdown_wrapper(html)
+        if aliases is not None:
+            html = aliases.restore(html)
         html = self._ensure_referrer_policy(html)
         
         return f'''<section class="report-section" data-type="{section_type}">
@@ -272,10 +282,12 @@ class HTMLReportGenerator:
 2. 防盗链处理：所有图片必须使用 referrerpolicy="no-referrer"
 3. 美观排版：使用现代CSS，Card布局
 4. 引用标注：每个论点标注来源笔记
+5. 链接简写：图片和笔记链接以 img_N / note_N 给出时，直接写入 src / href（如 src="img_3"），系统会替换为真实链接
 
 直接输出完整的HTML代码，不要包含markdown代码块标记。'''
         
-        data_summary = self._prepare_data_for_llm(state)
+        aliases = self._new_aliases()
+        data_summary = self._prepare_data_for_llm(state, aliases)
         
         messages = [
             {"role": "system", "content": HTML_WRITER_PROMPT},
@@ -302,12 +314,27 @@ class HTMLReportGenerator:
         
         html = response.choices[0].message.content or ""
         html = self._clean_markdown_wrapper(html)
+        if aliases is not None:
+            html = aliases.restore(html)
         html = self._ensure_referrer_policy(html)
         
         return html
     
-    def _prepare_data_for_llm(self, state: ResearchState) -> str:
-        """将笔记数据整理为LLM可理解的格式"""
+    def _new_aliases(self) -> Optional[PromptAliases]:
+        """每次生成使用独立的别名表（关闭别名时返回 None，prompt 中使用原始链接）"""
+        return PromptAliases() if self.settings.prompt.url_aliases else None
+    
+    def _prepare_data_for_llm(self, state: ResearchState, aliases: Optional[PromptAliases] = None) -> str:
+        """
+        将笔记数据整理为LLM可理解的格式
+        
+        Args:
+            state: 研究状态
+            aliases: 别名登记表，提供时图片和笔记链接写为 img_N / note_N
+        """
+        if self.settings.prompt.note_format == "compact":
+            return format_notes_compact(state.documents, include_images=True, aliases=aliases)
+        
         summaries = []
         
         for i, note in enumerate(state.documents):  # 全量处理
@@ -318,8 +345,12 @@ class HTMLReportGenerator:
             content = detail.content or preview.content_preview  # 全量内容
             images = detail.images  # 全量图片
             
+            note_ref = aliases.note(note) if aliases is not None else None
+            if aliases is not None:
+                images = aliases.images(images)
+            
             summary = f"""
-### 笔记 {i+1}: {title}
+### 笔记 {i+1}: {title}{f' ({note_ref})' if note_ref else ''}
 - 作者: {detail.author or preview.author}
 - 点赞: {detail.likes or preview.likes}
 - 内容: {content}
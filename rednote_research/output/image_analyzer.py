@@ -4,27 +4,58 @@
 职责：
 1. 收集所有笔记图片
 2. 下载图片转Base64（避免CDN防盗链问题）
-3. 调用VLM分批分析图片内容
-4. 对图片进行分类（实景/攻略/装饰/广告）
-5. 评估图片质量和可用性
+3. 本地预筛剔除明显不可用的图片（图标、横幅、纯色、模糊、二维码）
+4. 调用VLM分批分析图片内容（下载/预处理与VLM调用流水线重叠，多批次并行）
+5. 对图片进行分类（实景/攻略/装饰/广告）
+6. 评估图片质量和可用性
 """
 
 import asyncio
-import logging
+import hashlib
 import logging
 import json
+import time
+from dataclasses import dataclass
 from typing import Optional, Callable
 import re
-import base64
-import aiohttp
 from openai import AsyncOpenAI
 
 from ..state import ResearchState, ImageAnalysisResult
 from ..services.settings import get_settings_service
+from ..services.image_downloader import DownloadedImage, DownloadStats, get_image_downloader
+from ..services.image_preprocess import PreprocessStats, get_image_preprocessor
+from ..services.image_hash import NearDuplicateIndex, image_hashes
+from ..services.image_prescreen import prescreen_image
+from ..services.image_cache import ImageCache
+from ..services.rate_limit import ByteBudget, get_vlm_rate_limiter
+from ..services.vlm_batching import (
+    AdaptiveBatcher, BatchRecord, BatchSizeStats, classify_vlm_error, create_batcher, estimate_image_tokens
+)
+from ..services.image_analysis_cache import ImageAnalysisCache, analysis_version, get_image_analysis_cache
+from ..prompts.image_analyzer import IMAGE_ANALYZER_PROMPT, build_image_analyzer_prompt
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class PendingImage:
+    """等待送入VLM的图片（预处理结果落盘后只保留引用，调用VLM时再读回）"""
+    url: str
+    tokens: int  # 估算图片token
+    payload_bytes: int  # 请求中的体积（data URI 长度；下载失败时为 URL 长度）
+    cache_key: Optional[str] = None  # 落盘的预处理结果
+    image: Optional[DownloadedImage] = None  # 未落盘时保留在内存
+
+
+def _batch_cost(item: PendingImage) -> tuple[int, int]:
+    """待分析图片的 (请求字节, 图片token)"""
+    return item.payload_bytes, item.tokens
+
+
+def _data_uri_length(image: DownloadedImage) -> int:
+    return len(f"data:{image.content_type};base64,") + (len(image.data) + 2) // 3 * 4
+
+
 class ImageAnalyzer:
     """图片分析器 - VLM图片理解"""
     
@@ -37,6 +68,37 @@ class ImageAnalyzer:
             api_key=vlm_api_key,
             base_url=self.settings.vlm.base_url
         )
+        
+        # 共享连接池的图片下载器
+        self.downloader = get_image_downloader()
+        self.download_stats = DownloadStats()
+        
+        # 送入VLM前缩放、重新编码（线程池执行）
+        self.preprocessor = get_image_preprocessor()
+        
+        # 预处理结果落盘到图片缓存，排队中的批次不占内存
+        self.spill_cache: Optional[ImageCache] = (
+            getattr(self.downloader, "cache", None) if self.settings.vlm.spill_to_disk else None
+        )
+        
+        # 所有VLM请求共享的限速器（多个批次并行时总速率仍受限）
+        self.rate_limiter = get_vlm_rate_limiter()
+        
+        # VLM分析结果缓存（按图片内容哈希 + prompt/模型版本）
+        self.analysis_cache: Optional[ImageAnalysisCache] = (
+            get_image_analysis_cache() if self.settings.vlm.analysis_cache else None
+        )
+        # 分析结果与送入的分辨率有关，缩放尺寸也计入版本
+        self.analysis_version = analysis_version(
+            IMAGE_ANALYZER_PROMPT, self.settings.vlm.model, variant=f"max_side={self.preprocessor.max_side}"
+        )
+        self.cache_hits = 0
+        # 近似重复图片 {图片URL: 代表图片URL}
+        self.image_duplicates: dict[str, str] = {}
+        # 本地预筛剔除的图片数 {原因: 张数}
+        self.prescreen_rejects: dict[str, int] = {}
+        # 最近一次运行的VLM批次统计（批次大小、延迟、吞吐量）
+        self.batch_stats = BatchSizeStats()
     
     async def analyze(self, state: ResearchState, on_log: Optional[Callable[[str], None]] = None) -> tuple[ResearchState, dict]:
         """
@@ -73,9 +135,16 @@ class ImageAnalyzer:
         # 2. 分批分析
         analyses, vlm_calls = await self._analyze_images_batch(images, state.task)
         stats["vlm_calls"] = vlm_calls
+        stats["downloaded_images"] = self.download_stats.succeeded
+        stats["cached_analyses"] = self.cache_hits
+        stats["download_failures"] = self.download_stats.failed
+        stats["duplicate_images"] = len(self.image_duplicates)
+        stats["prescreened_images"] = sum(self.prescreen_rejects.values())
+        stats["vlm_batch_sizes"] = [record.size for record in self.batch_stats.records]
         
         # 3. 更新state
         state.image_analyses = analyses
+        state.image_duplicates = self.image_duplicates
         
         # 4. 统计日志
         categories = {}
@@ -85,8 +154,11 @@ class ImageAnalyzer:
         
         usable = sum(1 for r in analyses.values() if r.should_use)
         stats["usable_images"] = usable
-        logger.info(f"[ImageAnalyzer] 分析完成 | 总计: {len(analyses)}张 | 可用: {usable}张 | VLM调用: {vlm_calls}次")
+        logger.info(f"[ImageAnalyzer] 分析完成 | 总计: {len(analyses)}张 | 可用: {usable}张 | VLM调用: {vlm_calls}次 | 缓存命中: {self.cache_hits}张")
         logger.info(f"[ImageAnalyzer] 分类统计: {categories}")
+        logger.info(f"[ImageAnalyzer] 图片下载汇总: {self.download_stats.summary()}")
+        if self.batch_stats.records and on_log:
+            on_log(f"[ImageAnalyzer] VLM批次: {self.batch_stats.summary()}")
         
         return state, stats
     
@@ -116,233 +188,387 @@ class ImageAnalyzer:
         
         Args:
             url: 图片URL
-            max_retries: 最大重试次数
+            max_retries: 最大重试次数（由共享下载器配置，保留参数兼容旧调用）
             
         Returns:
             base64编码的data URI，失败返回None
         """
-        headers = {
-            "Referer": "https://www.xiaohongshu.com/",
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-        }
-        
-        for attempt in range(max_retries + 1):
-            try:
-                # 增加超时时间到30秒
-                timeout = aiohttp.ClientTimeout(total=30, connect=10)
-                async with aiohttp.ClientSession(timeout=timeout) as session:
-                    async with session.get(url, headers=headers) as resp:
-                        if resp.status == 200:
-                            data = await resp.read()
-                            b64 = base64.b64encode(data).decode()
-                            content_type = resp.headers.get("Content-Type", "image/jpeg")
-                            return f"data:{content_type};base64,{b64}"
-                        else:
-                            logger.warning(f"[ImageAnalyzer] 下载图片失败 HTTP {resp.status}: {url[:60]}...")
-                            break  # HTTP错误不重试
-            except asyncio.TimeoutError:
-                if attempt < max_retries:
-                    logger.warning(f"[ImageAnalyzer] 下载图片超时(尝试{attempt+1}/{max_retries+1}): {url[:60]}...")
-                    await asyncio.sleep(1)  # 短暂等待后重试
-                else:
-                    logger.warning(f"[ImageAnalyzer] 下载图片超时(已放弃): {url[:60]}...")
-            except Exception as e:
-                logger.warning(f"[ImageAnalyzer] 下载图片异常: {url[:60]}... - {e}")
-                break  # 其他异常不重试
-        return None
+        image = await self.downloader.fetch(url)
+        return image.to_data_uri() if image else None
     
     async def _analyze_images_batch(
         self,
         images: list[str],
         topic: str
     ) -> tuple[dict[str, ImageAnalysisResult], int]:
-        """分批分析图片
+        """流水线分析图片（下载/预处理与VLM调用重叠，只把未缓存的图片送入VLM）
+        
+        生产者按块下载图片，去重、查分析缓存、预处理后凑满一批放入队列；
+        最多 max_inflight_batches 个批次同时调用VLM，所有请求经共享限速器。
+        总耗时接近 max(下载, VLM) 而不是两者之和。
+        
+        预处理结果落盘，队列中只有引用；调用VLM前才读回并编码，
+        同时在内存中的请求体积受 inflight_payload_mb 限制。
         
         Returns:
             (分析结果字典, VLM调用次数)
         """
         
         # 参数配置
-        BATCH_SIZE = 10  # 减小批次大小，提高稳定性
+        BATCH_SIZE = 10  # 初始批次大小，之后按请求体积和接口延迟自适应调整
         use_rate_limit = getattr(self.settings.vlm, 'rate_limit_mode', True)
-        BATCH_DELAY = 3.0 if use_rate_limit else 0
         MAX_RETRIES = 3 if use_rate_limit else 1
+        max_inflight = max(1, self.settings.vlm.max_inflight_batches)
         
-        all_analyses = {}
-        total_batches = (len(images) + BATCH_SIZE - 1) // BATCH_SIZE
+        all_analyses: dict[str, ImageAnalysisResult] = {}
+        content_hashes: dict[str, str] = {}
+        dedup_index = NearDuplicateIndex() if self.settings.vlm.image_dedup else None
+        preprocess_stats = PreprocessStats()
+        batcher = create_batcher(BATCH_SIZE, self.settings.vlm)
+        budget = ByteBudget(int(self.settings.vlm.inflight_payload_mb * 1024 * 1024))
+        self.batch_stats = batcher.stats
+        prompt = build_image_analyzer_prompt(topic)
+        # 队列容量即预取深度：VLM 处理中的批次之外，最多再准备好 max_inflight 批
+        queue: asyncio.Queue = asyncio.Queue(maxsize=max_inflight)
         vlm_call_count = 0  # VLM调用计数器
+        batch_count = 0
         
-        # 优化后的prompt - 明确要求JSON输出，增加语义关键词提取
-        prompt = f"""你是图片分析专家。请分析以下图片并以JSON数组格式输出分析结果。
-
-## 研究主题
-{topic}
-
-## 输出要求
-请输出一个JSON数组，每个元素包含以下字段：
-- image_index: 图片序号（从0开始）
-- description: 图片内容描述（20字以内）
-- tags: 标签数组（2-3个关键词）
-- category: 分类（只能是：实景、攻略、装饰、广告 之一）
-- content_keywords: 图片核心内容关键词（3-5个），用于语义匹配章节内容
-- scene_type: 场景类型（只能是以下之一）
-- quality_score: 质量分数（1-10整数）
-- should_use: 是否建议使用（true/false）
-
-## 分类说明
-- 实景: 真实场景拍摄
-- 攻略: 包含文字说明的教程图
-- 装饰: 通用装饰插图
-- 广告: 明显的营销推广图
-
-## 场景类型说明
-- 风格展示: 装修风格、效果图、设计渲染
-- 数据展示: 表格、清单、对比图、价格单
-- 教程步骤: 操作流程、步骤说明、攻略图
-- 产品展示: 具体产品、材料、工具
-- 真实场景: 实拍照片、工地图、现场图
-
-## content_keywords 示例
-- 装修效果图 → ["北欧风", "客厅设计", "简约"]
-- 预算表格 → ["装修预算", "费用明细", "价格对比"]
-- 施工现场 → ["水电改造", "工地现场", "施工进度"]
-
-请直接输出JSON数组，不要添加任何解释文字："""
+        logger.info(f"[ImageAnalyzer] 正在下载并分析 {len(images)} 张图片（最多 {max_inflight} 个批次并行）...")
         
-        for batch_idx in range(total_batches):
-            start = batch_idx * BATCH_SIZE
-            end = min(start + BATCH_SIZE, len(images))
-            batch_images = images[start:end]
-            batch_count = len(batch_images)
-            
-            logger.info(f"[ImageAnalyzer] 批次 {batch_idx+1}/{total_batches}，图片 {start+1}-{end}")
-            
-            # 下载图片转base64
-            logger.info(f"[ImageAnalyzer] 正在下载 {batch_count} 张图片...")
-            image_contents = []
-            successful_downloads = 0
-            
-            for i, img_url in enumerate(batch_images):
-                base64_data = await self._download_image_to_base64(img_url)
-                if base64_data:
-                    image_contents.append({
-                        "type": "image_url",
-                        "image_url": {"url": base64_data}
-                    })
-                    successful_downloads += 1
-                else:
-                    # 下载失败时尝试直接使用URL
-                    image_contents.append({
-                        "type": "image_url",
-                        "image_url": {"url": img_url}
-                    })
-            
-            logger.info(f"[ImageAnalyzer] 下载完成: {successful_downloads}/{batch_count} 成功")
-            
-            if not image_contents:
-                logger.warning(f"[ImageAnalyzer] 批次{batch_idx+1}无可用图片，跳过")
-                continue
-            
-            # 构建消息
-            content = [{"type": "text", "text": prompt}]
-            content.extend(image_contents)
-            
-            for retry in range(MAX_RETRIES):
-                try:
-                    # 使用 response_format 确保JSON输出（Qwen支持json_object）
-                    response = await self.vlm_client.chat.completions.create(
-                        model=self.settings.vlm.model,
-                        messages=[{"role": "user", "content": content}],
-                        max_tokens=self.settings.vlm.max_tokens,
-                        temperature=self.settings.vlm.temperature,
-                        response_format={"type": "json_object"}  # Qwen支持
+        async def produce() -> None:
+            ready: list[PendingImage] = []
+            try:
+                start = 0
+                while start < len(images):
+                    # 下载块大小跟随当前批次大小
+                    chunk = images[start:start + batcher.size]
+                    start += len(chunk)
+                    ready.extend(await self._prepare_chunk(
+                        chunk, topic, dedup_index, content_hashes, all_analyses, preprocess_stats
+                    ))
+                    while ready and batcher.is_full(ready, _batch_cost):
+                        batch, ready = batcher.take(ready, _batch_cost)
+                        await queue.put(batch)
+                while ready:
+                    batch, ready = batcher.take(ready, _batch_cost)
+                    await queue.put(batch)
+            finally:
+                for _ in range(max_inflight):
+                    await queue.put(None)
+        
+        async def consume() -> None:
+            nonlocal vlm_call_count, batch_count
+            while (batch := await queue.get()) is not None:
+                batch_idx = batch_count
+                batch_count += 1
+                async with budget.reserve(sum(item.payload_bytes for item in batch)):
+                    calls = await self._analyze_vlm_batch(
+                        batch, batch_idx, prompt, topic, MAX_RETRIES, all_analyses, content_hashes, batcher
                     )
-                    vlm_call_count += 1  # VLM调用成功，计数+1
-                    
-                    result_text = response.choices[0].message.content or "{}"
-                    
-                    # 记录原始响应用于调试
-                    logger.info(f"[ImageAnalyzer] 批次{batch_idx+1} VLM响应: {result_text[:300]}...")
-                    
-                    # 解析JSON
-                    analyses_list = self._parse_json_robust(result_text, batch_idx, batch_count)
-                    
-                    # 转换结果
-                    for item in analyses_list:
-                        local_idx = item.get("image_index", 0)
-                        global_idx = start + local_idx
-                        if global_idx < len(images):
-                            url = images[global_idx]
-                            all_analyses[url] = ImageAnalysisResult(
-                                image_url=url,
-                                description=item.get("description", ""),
-                                tags=item.get("tags", []),
-                                category=item.get("category", "未分类"),
-                                content_keywords=item.get("content_keywords", []),
-                                scene_type=item.get("scene_type", ""),
-                                quality_score=item.get("quality_score", 5),
-                                should_use=item.get("should_use", True),
-                                matched_sections=[]
-                            )
-                    
-                    logger.info(f"[ImageAnalyzer] 批次{batch_idx+1}完成，解析{len(analyses_list)}张，累计{len(all_analyses)}张")
+                vlm_call_count += calls
+        
+        await asyncio.gather(produce(), *[consume() for _ in range(max_inflight)])
+        
+        if preprocess_stats.count:
+            logger.info(f"[ImageAnalyzer] 图片预处理: {preprocess_stats.summary()}")
+        logger.info(f"[ImageAnalyzer] VLM批次: {batcher.stats.summary()}")
+        logger.info(f"[ImageAnalyzer] 在途请求体积峰值: {budget.peak / 1024 / 1024:.1f}MB")
+        if self.image_duplicates:
+            logger.info(f"[ImageAnalyzer] 近似重复图片: 跳过 {len(self.image_duplicates)} 张")
+        if self.cache_hits:
+            logger.info(f"[ImageAnalyzer] 分析缓存命中 {self.cache_hits} 张")
+        if self.prescreen_rejects:
+            logger.info(f"[ImageAnalyzer] 本地预筛剔除 {sum(self.prescreen_rejects.values())} 张: {self.prescreen_rejects}")
+        if self.analysis_cache is not None:
+            self.analysis_cache.save()
+        
+        return all_analyses, vlm_call_count
+    
+    async def _prepare_chunk(
+        self,
+        urls: list[str],
+        topic: str,
+        dedup_index: Optional[NearDuplicateIndex],
+        content_hashes: dict[str, str],
+        all_analyses: dict[str, ImageAnalysisResult],
+        preprocess_stats: PreprocessStats
+    ) -> list[PendingImage]:
+        """
+        下载一块图片，去重、查分析缓存（命中直接写入 all_analyses）、预处理并落盘
+        
+        Returns:
+            待送入VLM的图片，下载失败的图片直接使用URL
+        """
+        # 并发下载图片（共享连接池 + 图片缓存）
+        downloaded, download_stats = await self.downloader.fetch_many(urls)
+        self.download_stats.merge(download_stats)
+        for url, image in zip(urls, downloaded):
+            if image:
+                content_hashes[url] = hashlib.sha256(image.data).hexdigest()
+        
+        # 近似重复图片每簇只分析一张代表图
+        targets = list(zip(urls, downloaded))
+        if dedup_index is not None:
+            targets = await self._dedup_images(targets, dedup_index)
+        
+        # 命中分析缓存的图片不再送入VLM
+        pending = []
+        for url, image in targets:
+            content_hash = content_hashes.get(url)
+            cached = (
+                self.analysis_cache.get(content_hash, self.analysis_version, topic, url)
+                if self.analysis_cache is not None and content_hash else None
+            )
+            if cached:
+                all_analyses[url] = cached
+                self.cache_hits += 1
+            else:
+                pending.append((url, image))
+        
+        # 本地预筛：明显不可用的图片直接标记，不占用VLM调用
+        if self.settings.vlm.prescreen:
+            pending = await self._prescreen_images(pending, all_analyses)
+        
+        # 只预处理需要送入VLM的图片
+        prepared, stats = await self.preprocessor.process_many([image for _, image in pending])
+        preprocess_stats.merge(stats)
+        items = []
+        for (url, _), image in zip(pending, prepared):
+            if image is None:
+                items.append(PendingImage(url, estimate_image_tokens(None), len(url)))
+                continue
+            item = PendingImage(url, estimate_image_tokens(image.data), _data_uri_length(image))
+            if self.spill_cache is not None and url in content_hashes:
+                item.cache_key = f"vlm-input:{content_hashes[url]}:{self.preprocessor.max_side}"
+                await asyncio.to_thread(self.spill_cache.put, item.cache_key, image.data, image.content_type, False)
+            else:
+                item.image = image
+            items.append(item)
+        if self.spill_cache is not None:
+            await asyncio.to_thread(self.spill_cache.flush)
+        return items
+    
+    def _load_payload(self, item: PendingImage) -> str:
+        """读回预处理结果并编码为 data URI（缓存已淘汰时直接使用URL）"""
+        if item.image is not None:
+            return item.image.to_data_uri()
+        if item.cache_key and self.spill_cache is not None:
+            hit = self.spill_cache.get(item.cache_key)
+            if hit is not None:
+                return DownloadedImage(item.url, hit.data, hit.content_type).to_data_uri()
+        return item.url
+    
+    async def _analyze_vlm_batch(
+        self,
+        batch: list[PendingImage],
+        batch_idx: int,
+        prompt: str,
+        topic: str,
+        max_retries: int,
+        all_analyses: dict[str, ImageAnalysisResult],
+        content_hashes: dict[str, str],
+        batcher: AdaptiveBatcher
+    ) -> int:
+        """
+        调用VLM分析一批图片（带重试，每次请求先从共享限速器取令牌）
+        
+        每次请求的延迟和结果反馈给 batcher；超时或 413 时把本批拆成两半分别重试。
+        
+        Returns:
+            VLM调用次数
+        """
+        batch_images = [item.url for item in batch]
+        batch_count = len(batch_images)
+        vlm_call_count = 0
+        logger.info(f"[ImageAnalyzer] 批次 {batch_idx+1}，{batch_count} 张图片")
+        
+        # 构建消息（此时才读回图片并编码，批次结束即释放）
+        content = [{"type": "text", "text": prompt}]
+        content.extend({"type": "image_url", "image_url": {"url": self._load_payload(item)}} for item in batch)
+        
+        def collect(analyses_list: list, record: BatchRecord, latency: float) -> None:
+            parsed = 0
+            for item in analyses_list:
+                local_idx = item.get("image_index", 0)
+                if not isinstance(local_idx, int) or not 0 <= local_idx < batch_count:
+                    continue
+                url = batch_images[local_idx]
+                result = ImageAnalysisResult(
+                    image_url=url,
+                    description=item.get("description", ""),
+                    tags=item.get("tags", []),
+                    category=item.get("category", "未分类"),
+                    content_keywords=item.get("content_keywords", []),
+                    scene_type=item.get("scene_type", ""),
+                    quality_score=item.get("quality_score", 5),
+                    should_use=item.get("should_use", True),
+                    matched_sections=[]
+                )
+                all_analyses[url] = result
+                # 解析失败时的默认结果没有描述，不缓存
+                if result.description:
+                    parsed += 1
+                    if self.analysis_cache is not None and url in content_hashes:
+                        self.analysis_cache.put(content_hashes[url], self.analysis_version, topic, result)
+            # 输出被截断或格式错误导致部分图片没有结果，说明批次偏大
+            if parsed < batch_count:
+                batcher.failed(record, "parse", latency)
+            else:
+                batcher.succeeded(record, latency)
+        
+        for retry in range(max_retries):
+            record: Optional[BatchRecord] = None
+            began = time.perf_counter()
+            try:
+                await self.rate_limiter.acquire()
+                record = batcher.start(batch, _batch_cost)
+                began = time.perf_counter()
+                # 使用 response_format 确保JSON输出（Qwen支持json_object）
+                response = await self.vlm_client.chat.completions.create(
+                    model=self.settings.vlm.model,
+                    messages=[{"role": "user", "content": content}],
+                    max_tokens=self.settings.vlm.max_tokens,
+                    temperature=self.settings.vlm.temperature,
+                    response_format={"type": "json_object"}  # Qwen支持
+                )
+                vlm_call_count += 1  # VLM调用成功，计数+1
+                latency = time.perf_counter() - began
+                
+                result_text = response.choices[0].message.content or "{}"
+                
+                # 记录原始响应用于调试
+                logger.info(f"[ImageAnalyzer] 批次{batch_idx+1} VLM响应({latency:.1f}s): {result_text[:300]}...")
+                
+                # 解析JSON并转换结果
+                analyses_list = self._parse_json_robust(result_text, batch_idx, batch_count)
+                collect(analyses_list, record, latency)
+                
+                logger.info(f"[ImageAnalyzer] 批次{batch_idx+1}完成，解析{len(analyses_list)}张，累计{len(all_analyses)}张")
+                break
+                
+            except Exception as e:
+                error_str = str(e)
+                reason = classify_vlm_error(e)
+                if record is not None and reason:
+                    batcher.failed(record, reason, time.perf_counter() - began)
+                if reason in ("timeout", "413") and batch_count > 1:
+                    # 批次过大：拆成两半分别分析
+                    half = batch_count // 2
+                    content.clear()
+                    logger.warning(f"[ImageAnalyzer] 批次{batch_idx+1}{reason}，拆分为 {half}+{batch_count - half} 张重试")
+                    for part in (batch[:half], batch[half:]):
+                        calls = await self._analyze_vlm_batch(
+                            part, batch_idx, prompt, topic, max_retries, all_analyses, content_hashes, batcher
+                        )
+                        vlm_call_count += calls
                     break
-                    
-                except Exception as e:
-                    error_str = str(e)
-                    if "429" in error_str or "rate limit" in error_str.lower():
-                        wait_time = (retry + 1) * 10
-                        logger.warning(f"[ImageAnalyzer] 速率限制，等待{wait_time}秒")
-                        await asyncio.sleep(wait_time)
-                    elif "response_format" in error_str.lower():
-                        # 模型不支持response_format，使用fallback
-                        logger.warning(f"[ImageAnalyzer] 模型不支持response_format，尝试不使用")
-                        try:
-                            response = await self.vlm_client.chat.completions.create(
-                                model=self.settings.vlm.model,
-                                messages=[{"role": "user", "content": content}],
-                                max_tokens=self.settings.vlm.max_tokens,
-                                temperature=self.settings.vlm.temperature
-                            )
-                            vlm_call_count += 1  # fallback调用也计数
-                            result_text = response.choices[0].message.content or "[]"
-                            logger.info(f"[ImageAnalyzer] 批次{batch_idx+1} VLM响应(无format): {result_text[:300]}...")
-                            analyses_list = self._parse_json_robust(result_text, batch_idx, batch_count)
-                            for item in analyses_list:
-                                local_idx = item.get("image_index", 0)
-                                global_idx = start + local_idx
-                                if global_idx < len(images):
-                                    url = images[global_idx]
-                                    all_analyses[url] = ImageAnalysisResult(
-                                        image_url=url,
-                                        description=item.get("description", ""),
-                                        tags=item.get("tags", []),
-                                        category=item.get("category", "未分类"),
-                                        content_keywords=item.get("content_keywords", []),
-                                        scene_type=item.get("scene_type", ""),
-                                        quality_score=item.get("quality_score", 5),
-                                        should_use=item.get("should_use", True),
-                                        matched_sections=[]
-                                    )
-                            logger.info(f"[ImageAnalyzer] 批次{batch_idx+1}完成(fallback)，累计{len(all_analyses)}张")
-                            break
-                        except Exception as e2:
-                            logger.error(f"[ImageAnalyzer] 批次{batch_idx+1} fallback也失败: {e2}")
-                            # 使用默认值
-                            self._add_default_analyses(all_analyses, batch_images, images, start)
-                            break
-                    else:
-                        logger.error(f"[ImageAnalyzer] 批次{batch_idx+1}失败: {e}")
-                        if retry == MAX_RETRIES - 1:
-                            # 最后一次重试仍失败，使用默认值
-                            self._add_default_analyses(all_analyses, batch_images, images, start)
+                if reason == "429":
+                    wait_time = (retry + 1) * 10
+                    logger.warning(f"[ImageAnalyzer] 速率限制，等待{wait_time}秒")
+                    await asyncio.sleep(wait_time)
+                elif "response_format" in error_str.lower():
+                    # 模型不支持response_format，使用fallback
+                    logger.warning(f"[ImageAnalyzer] 模型不支持response_format，尝试不使用")
+                    try:
+                        await self.rate_limiter.acquire()
+                        record = batcher.start(batch, _batch_cost)
+                        began = time.perf_counter()
+                        response = await self.vlm_client.chat.completions.create(
+                            model=self.settings.vlm.model,
+                            messages=[{"role": "user", "content": content}],
+                            max_tokens=self.settings.vlm.max_tokens,
+                            temperature=self.settings.vlm.temperature
+                        )
+                        vlm_call_count += 1  # fallback调用也计数
+                        latency = time.perf_counter() - began
+                        result_text = response.choices[0].message.content or "[]"
+                        logger.info(f"[ImageAnalyzer] 批次{batch_idx+1} VLM响应(无format): {result_text[:300]}...")
+                        analyses_list = self._parse_json_robust(result_text, batch_idx, batch_count)
+                        collect(analyses_list, record, latency)
+                        logger.info(f"[ImageAnalyzer] 批次{batch_idx+1}完成(fallback)，累计{len(all_analyses)}张")
                         break
-            
-            # 批次间延迟
-            if batch_idx < total_batches - 1 and BATCH_DELAY > 0:
-                await asyncio.sleep(BATCH_DELAY)
+                    except Exception as e2:
+                        logger.error(f"[ImageAnalyzer] 批次{batch_idx+1} fallback也失败: {e2}")
+                        # 使用默认值
+                        self._add_default_analyses(all_analyses, batch_images, batch_images, 0)
+                        break
+                else:
+                    logger.error(f"[ImageAnalyzer] 批次{batch_idx+1}失败: {e}")
+                    if retry == max_retries - 1:
+                        # 最后一次重试仍失败，使用默认值
+                        self._add_default_analyses(all_analyses, batch_images, batch_images, 0)
+                    break
         
-        return all_analyses, vlm_call_count
+        return vlm_call_count
+    
+    async def _prescreen_images(
+        self,
+        pending: list[tuple[str, Optional[DownloadedImage]]],
+        all_analyses: dict[str, ImageAnalysisResult]
+    ) -> list[tuple[str, Optional[DownloadedImage]]]:
+        """
+        本地预筛（尺寸、长宽比、纯色、模糊、二维码），剔除的图片写入 all_analyses（should_use=False）
+        
+        Returns:
+            仍需送入VLM的图片
+        """
+        loop = asyncio.get_running_loop()
+        
+        async def screen(image):
+            if image is None:
+                return None
+            return await loop.run_in_executor(self.preprocessor.executor, prescreen_image, image.data)
+        
+        results = await asyncio.gather(*[screen(image) for _, image in pending])
+        kept = []
+        for (url, image), result in zip(pending, results):
+            if result is None or not result.reject:
+                kept.append((url, image))
+                continue
+            all_analyses[url] = ImageAnalysisResult(
+                image_url=url,
+                description=f"[预筛] {result.reason}",
+                category=result.category,
+                quality_score=1,
+                should_use=False,
+                matched_sections=[]
+            )
+            reason = result.reason.split("(")[0]
+            self.prescreen_rejects[reason] = self.prescreen_rejects.get(reason, 0) + 1
+        return kept
+    
+    async def _dedup_images(
+        self,
+        targets: list[tuple[str, Optional[DownloadedImage]]],
+        index: NearDuplicateIndex
+    ) -> list[tuple[str, Optional[DownloadedImage]]]:
+        """
+        感知哈希匹配近似重复图片（转发、不同CDN参数/尺寸），记录到 self.image_duplicates
+        
+        按下载顺序增量匹配，每簇以最先出现的图片为代表。
+        
+        Returns:
+            未与已有代表图重复的图片（未下载成功或无法解码的图片原样保留）
+        """
+        loop = asyncio.get_running_loop()
+        
+        async def compute(image):
+            if image is None:
+                return None
+            try:
+                return await loop.run_in_executor(self.preprocessor.executor, image_hashes, image.data)
+            except Exception:
+                return None
+        
+        hashes = await asyncio.gather(*[compute(image) for _, image in targets])
+        kept = []
+        for (url, image), image_hash in zip(targets, hashes):
+            rep = index.match(url, image_hash) if image_hash is not None else None
+            if rep is None:
+                kept.append((url, image))
+            else:
+                self.image_duplicates[url] = rep
+        return kept
     
     def _add_default_analyses(
         self, 
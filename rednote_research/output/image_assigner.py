@@ -8,7 +8,12 @@
 """
 
 import asyncio
+import heapq
+import itertools
 import logging
+import re
+from collections import defaultdict
+from dataclasses import dataclass
 from typing import Callable, Optional
 from openai import AsyncOpenAI
 
@@ -18,6 +23,92 @@ from ..services.settings import get_settings_service
 logger = logging.getLogger(__name__)
 
 
+_WORD_PATTERN = re.compile(r'[\u4e00-\u9fa5a-zA-Z0-9]+')
+
+
+def extract_keywords(text: str) -> set[str]:
+    """从文本中提取关键词（简单实现：按非中英文数字字符切分，过滤单字）"""
+    return set(w for w in _WORD_PATTERN.findall(text) if len(w) >= 2)
+
+
+def scene_match_level(overlap: int) -> int:
+    """场景类型分词与章节标题分词的重叠数 → 匹配等级（2=高度匹配，1=部分匹配，0=无匹配）"""
+    return 2 if overlap >= 2 else 1 if overlap >= 1 else 0
+
+
+@dataclass
+class IndexedImage:
+    """索引中的单张图片（预先计算的分词结果）"""
+    url: str
+    result: ImageAnalysisResult
+    keywords: frozenset[str]
+    scene_tokens: frozenset[str]
+
+
+class ImageIndex:
+    """
+    图片倒排索引（每次分配构建一次，所有章节共用）
+
+    预先计算每张可用图片的内容关键词集合和场景类型分词，按内容关键词、场景类型、
+    场景分词、分类建立倒排表。章节只对至少命中一项的图片完整打分；其余图片的得分
+    只有质量分，按预先排好的质量分顺序合并即可，结果与逐张打分一致。
+    """
+
+    def __init__(self, analyses: dict[str, ImageAnalysisResult]):
+        self.images: list[IndexedImage] = []
+        self.by_keyword: dict[str, list[int]] = defaultdict(list)
+        self.by_scene_type: dict[str, list[int]] = defaultdict(list)
+        self.by_scene_token: dict[str, list[int]] = defaultdict(list)
+        self.by_category: dict[str, list[int]] = defaultdict(list)
+        # 带 matched_sections 的图片（章节标题子串匹配无法建索引，总是打分）
+        self.with_sections: list[int] = []
+
+        for url, result in analyses.items():
+            if not result.should_use:
+                continue
+            i = len(self.images)
+            image = IndexedImage(
+                url=url,
+                result=result,
+                keywords=frozenset(result.content_keywords or []),
+                scene_tokens=frozenset(extract_keywords(result.scene_type)) if result.scene_type else frozenset()
+            )
+            self.images.append(image)
+            for keyword in image.keywords:
+                self.by_keyword[keyword].append(i)
+            for token in image.scene_tokens:
+                self.by_scene_token[token].append(i)
+            self.by_scene_type[result.scene_type].append(i)
+            self.by_category[result.category].append(i)
+            if result.matched_sections:
+                self.with_sections.append(i)
+
+        # 未命中任何倒排表的图片得分即质量分：按质量分降序（同分保持原顺序）预排
+        self.by_quality = sorted(range(len(self.images)), key=lambda i: -self.images[i].result.quality_score)
+
+    def touched(
+        self,
+        target_keywords: set[str],
+        title_tokens: set[str],
+        preferred_scene_types: list[str],
+        preferred_types: list[str]
+    ) -> set[int]:
+        """至少命中一项加分条件的图片下标"""
+        hits: set[int] = set(self.with_sections)
+        for keyword in target_keywords:
+            hits.update(self.by_keyword.get(keyword, ()))
+        for token in title_tokens:
+            hits.update(self.by_scene_token.get(token, ()))
+        for scene_type in preferred_scene_types or ():
+            hits.update(self.by_scene_type.get(scene_type, ()))
+        for category in preferred_types or ():
+            hits.update(self.by_category.get(category, ()))
+        return hits
+
+    def __len__(self) -> int:
+        return len(self.images)
+
+
 class ImageAssigner:
     """图片分配器 - 为章节分配和生成图片"""
     
@@ -48,6 +139,9 @@ class ImageAssigner:
             添加了images字段的大纲
         """
         enriched_outline = []
+        duplicates = state.image_duplicates
+        # 分词和倒排表只构建一次，各章节共用
+        index = ImageIndex(state.image_analyses)
         
         for section in outline:
             section_title = section.get("title", "")
@@ -65,26 +159,29 @@ class ImageAssigner:
                 enriched_outline.append({**section, "images": []})
                 continue
             
-            # 筛选候选图片（传入required_keywords用于语义匹配）
+            MIN_IMAGES = 1
+            MAX_IMAGES = min(suggested_count + 1, 4)
+            SCORE_THRESHOLD = 8  # 匹配分数阈值，低于此值视为不匹配
+            
+            # 筛选候选图片（传入required_keywords用于语义匹配；只取前 MAX_IMAGES 张）
             candidates = self._find_candidates(
                 state.image_analyses,
                 section_title,
                 section_content,
                 required_keywords,
                 preferred_scene_types,
-                preferred_types
+                preferred_types,
+                duplicates,
+                index,
+                limit=MAX_IMAGES
             )
             
             # 选取图片
-            MIN_IMAGES = 1
-            MAX_IMAGES = min(suggested_count + 1, 4)
-            SCORE_THRESHOLD = 8  # 匹配分数阈值，低于此值视为不匹配
-            
             selected_urls = []
             best_score = 0
-            for url, result, score in candidates[:MAX_IMAGES]:
+            for url, result, score in candidates:
                 selected_urls.append(url)
-                self.used_images.add(url)
+                self._mark_used(url, duplicates)
                 if score > best_score:
                     best_score = score
             
@@ -117,7 +214,7 @@ class ImageAssigner:
                 "images": selected_urls
             })
             
-            logger.info(f"[ImageAssigner] '{section_title}' | 候选: {len(candidates)} | 最高分: {best_score} | 分配: {len(selected_urls)}")
+            logger.info(f"[ImageAssigner] '{section_title}' | 图片: {len(index)} | 最高分: {best_score} | 分配: {len(selected_urls)}")
         
         return enriched_outline
     
@@ -128,67 +225,107 @@ class ImageAssigner:
         section_content: str,
         required_keywords: list[str],
         preferred_scene_types: list[str],
-        preferred_types: list[str]
+        preferred_types: list[str],
+        duplicates: Optional[dict[str, str]] = None,
+        index: Optional[ImageIndex] = None,
+        limit: Optional[int] = None
     ) -> list[tuple[str, ImageAnalysisResult, int]]:
-        """查找适合章节的候选图片 - 基于语义关键词匹配"""
-        candidates = []
-        
+        """
+        查找适合章节的候选图片 - 基于语义关键词匹配（近似重复图片按代表图判断是否已使用）
+
+        Args:
+            analyses: 图片分析结果（未传 index 时据此构建索引）
+            index: 预先构建的图片索引（assign 中各章节共用）
+            limit: 只返回前 limit 张（None 返回全部）
+
+        Returns:
+            [(图片URL, 分析结果, 匹配分数)]，按分数降序（同分保持原顺序）
+        """
+        duplicates = duplicates or {}
+        if index is None:
+            index = ImageIndex(analyses)
+
         # 0. 准备匹配关键词
         # 如果大纲指定了 required_keywords，则优先使用；否则从内容中提取
         if required_keywords:
             target_keywords = set(required_keywords)
         else:
-            target_keywords = self._extract_keywords(section_title + " " + section_content)
-            
-        for url, result in analyses.items():
-            if url in self.used_images:
-                continue
-            
-            if not result.should_use:
+            target_keywords = extract_keywords(section_title + " " + section_content)
+        title_tokens = extract_keywords(section_title)
+        # 如果是 LLM 指定的精确关键词，权重更高 (+5/词)，否则 (+3/词)
+        weight = 5 if required_keywords else 3
+
+        def available(url: str) -> bool:
+            return url not in self.used_images and duplicates.get(url, url) not in self.used_images
+
+        # 只对命中倒排表的图片完整打分
+        touched = index.touched(target_keywords, title_tokens, preferred_scene_types, preferred_types)
+        scored = []
+        for i in touched:
+            image = index.images[i]
+            if not available(image.url):
                 continue
-            
-            # 计算匹配分数
-            score = result.quality_score
-            
-            # 1. 语义关键词匹配
-            image_keywords = set(result.content_keywords or [])
-            keyword_overlap = len(target_keywords & image_keywords)
-            # 如果是 LLM 指定的精确关键词，权重更高 (+5/词)，否则 (+3/词)
-            weight = 5 if required_keywords else 3
-            score += keyword_overlap * weight
-            
-            # 2. 场景类型匹配
-            if preferred_scene_types and result.scene_type in preferred_scene_types:
-                 score += 5  # 明确匹配到偏好场景
-            else:
-                 # 否则尝试推断匹配
-                 scene_match = self._match_scene_type(section_title, result.scene_type)
-                 score += scene_match * 4
-            
-            # 3. 原有的章节标题匹配加分
-            if section_title in result.matched_sections:
-                score += 5
-            elif any(section_title in s or s in section_title for s in result.matched_sections):
-                score += 3
-            
-            # 4. 分类匹配加分
-            if result.category in preferred_types:
-                score += 2
-            
-            candidates.append((url, result, score))
-        
-        # 按分数排序
-        candidates.sort(key=lambda x: x[2], reverse=True)
-        
-        return candidates
+            score = self._score_image(
+                image, section_title, target_keywords, title_tokens, weight, preferred_scene_types, preferred_types
+            )
+            scored.append(((-score, i), (image.url, image.result, score)))
+        scored.sort(key=lambda item: item[0])
+
+        # 其余图片得分即质量分，按预排顺序与打分结果归并
+        rest = (
+            ((-image.result.quality_score, i), (image.url, image.result, image.result.quality_score))
+            for i in index.by_quality
+            if i not in touched and available((image := index.images[i]).url)
+        )
+        merged = heapq.merge(scored, rest, key=lambda item: item[0])
+        return [candidate for _, candidate in itertools.islice(merged, limit)]
+
+    def _score_image(
+        self,
+        image: IndexedImage,
+        section_title: str,
+        target_keywords: set[str],
+        title_tokens: set[str],
+        weight: int,
+        preferred_scene_types: list[str],
+        preferred_types: list[str]
+    ) -> int:
+        """计算单张图片与章节的匹配分数"""
+        result = image.result
+        score = result.quality_score
+
+        # 1. 语义关键词匹配
+        score += len(target_keywords & image.keywords) * weight
+
+        # 2. 场景类型匹配
+        if preferred_scene_types and result.scene_type in preferred_scene_types:
+            score += 5  # 明确匹配到偏好场景
+        else:
+            # 否则尝试推断匹配
+            score += scene_match_level(len(image.scene_tokens & title_tokens)) * 4
+
+        # 3. 原有的章节标题匹配加分
+        if section_title in result.matched_sections:
+            score += 5
+        elif any(section_title in s or s in section_title for s in result.matched_sections):
+            score += 3
+
+        # 4. 分类匹配加分
+        if result.category in preferred_types:
+            score += 2
+
+        return score
+
+    def _mark_used(self, url: str, duplicates: dict[str, str]) -> None:
+        """标记图片已使用；近似重复图片视为同一张，整簇一起标记"""
+        representative = duplicates.get(url, url)
+        self.used_images.add(url)
+        self.used_images.add(representative)
+        self.used_images.update(member for member, rep in duplicates.items() if rep == representative)
     
     def _extract_keywords(self, text: str) -> set[str]:
         """从文本中提取关键词（简单实现）"""
-        # 移除标点，按空格分词
-        import re
-        words = re.findall(r'[\u4e00-\u9fa5a-zA-Z0-9]+', text)
-        # 过滤太短的词
-        return set(w for w in words if len(w) >= 2)
+        return extract_keywords(text)
     
     def _match_scene_type(self, section_title: str, scene_type: str) -> int:
         """
@@ -206,14 +343,7 @@ class ImageAssigner:
         title_keywords = self._extract_keywords(section_title)
         
         # 计算重叠度
-        overlap = len(scene_keywords & title_keywords)
-        
-        if overlap >= 2:
-            return 2  # 高度匹配
-        elif overlap >= 1:
-            return 1  # 部分匹配
-        else:
-            return 0  # 无匹配
+        return scene_match_level(len(scene_keywords & title_keywords))
     
     async def _generate_images(
         self,
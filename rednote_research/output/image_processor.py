@@ -2,12 +2,14 @@
 
 import asyncio
 import logging
+import time
 from typing import Optional
 from pydantic import BaseModel
 from openai import AsyncOpenAI
 
 from ..state import ResearchState
 from ..services.settings import get_settings_service
+from ..services.vlm_batching import DEFAULT_IMAGE_TOKENS, classify_vlm_error, create_batcher
 
 logger = logging.getLogger(__name__)
 
@@ -164,7 +166,7 @@ class ImageProcessor:
 
 请直接输出JSON数组，不要输出任何其他内容："""
         
-        # 分批处理：每批最多20张图片（VLM单次请求限制）
+        # 分批处理：初始每批20张图片，之后按接口延迟和错误自适应调整
         BATCH_SIZE = 20
         # 根据配置决定是否使用速率限制模式
         use_rate_limit = getattr(self.settings.vlm, 'rate_limit_mode', True)
@@ -177,14 +179,22 @@ class ImageProcessor:
             logger.info("[ImageProcessor] 使用快速模式（无延迟）")
         
         all_analyses = {}
-        total_batches = (len(images) + BATCH_SIZE - 1) // BATCH_SIZE
+        batcher = create_batcher(BATCH_SIZE, self.settings.vlm)
         
-        for batch_idx in range(total_batches):
-            start = batch_idx * BATCH_SIZE
-            end = min(start + BATCH_SIZE, len(images))
-            batch_images = images[start:end]
+        def url_cost(url: str) -> tuple[int, int]:
+            # 图片以URL形式送入VLM，请求体积按URL长度、token按默认值估算
+            return len(url), DEFAULT_IMAGE_TOKENS
+        
+        remaining = list(images)
+        batch_idx = -1
+        
+        while remaining:
+            batch_idx += 1
+            start = len(images) - len(remaining)
+            batch_images, remaining = batcher.take(remaining, url_cost)
+            end = start + len(batch_images)
             
-            logger.info(f"[ImageProcessor] VLM分析批次 {batch_idx+1}/{total_batches}，图片 {start+1}-{end}")
+            logger.info(f"[ImageProcessor] VLM分析批次 {batch_idx+1}（{len(batch_images)}张），图片 {start+1}-{end}/{len(images)}")
             
             # 构建多图消息
             content = [{"type": "text", "text": prompt}]
@@ -196,6 +206,8 @@ class ImageProcessor:
             
             # 带重试的VLM调用
             for retry in range(MAX_RETRIES):
+                record = batcher.start(batch_images, url_cost)
+                began = time.perf_counter()
                 try:
                     response = await self.vlm_client.chat.completions.create(
                         model=self.settings.vlm.model,
@@ -245,10 +257,14 @@ class ImageProcessor:
                         analyses_list = []
                     
                     # 转换为字典（调整索引为全局索引）
+                    parsed = 0
                     for item in analyses_list:
                         local_idx = item.get("image_index", 0)
+                        if not isinstance(local_idx, int) or not 0 <= local_idx < len(batch_images):
+                            continue
                         global_idx = start + local_idx
                         if global_idx < len(images):
+                            parsed += 1
                             url = images[global_idx]
                             all_analyses[url] = ImageAnalysis(
                                 image_index=global_idx,
@@ -262,12 +278,26 @@ class ImageProcessor:
                                 reason=item.get("reason", "")
                             )
                     
+                    # 输出被截断或无法解析导致部分图片没有结果，缩小后续批次
+                    latency = time.perf_counter() - began
+                    if parsed < len(batch_images):
+                        batcher.failed(record, "parse", latency)
+                    else:
+                        batcher.succeeded(record, latency)
+                    
                     logger.info(f"[ImageProcessor] 批次{batch_idx+1}完成，累计{len(all_analyses)}张")
                     break  # 成功则跳出重试循环
                     
                 except Exception as e:
-                    error_str = str(e)
-                    if "429" in error_str or "rate limit" in error_str.lower():
+                    reason = classify_vlm_error(e)
+                    if reason:
+                        batcher.failed(record, reason, time.perf_counter() - began)
+                    if reason in ("timeout", "413") and len(batch_images) > batcher.size:
+                        # 批次过大：本批放回队首，按缩小后的批次大小重新组批
+                        logger.warning(f"[ImageProcessor] 批次{batch_idx+1}{reason}，缩小批次后重试")
+                        remaining = batch_images + remaining
+                        break
+                    if reason == "429":
                         wait_time = (retry + 1) * 10  # 指数退避：10s, 20s, 30s
                         logger.warning(f"[ImageProcessor] 批次{batch_idx+1}触发速率限制，等待{wait_time}秒后重试({retry+1}/{MAX_RETRIES})")
                         await asyncio.sleep(wait_time)
@@ -276,11 +306,12 @@ class ImageProcessor:
                         break  # 非429错误不重试
             
             # 批次间延迟，避免触发速率限制
-            if batch_idx < total_batches - 1:
+            if remaining:
                 logger.info(f"[ImageProcessor] 等待{BATCH_DELAY}秒后处理下一批...")
                 await asyncio.sleep(BATCH_DELAY)
         
         logger.info(f"[ImageProcessor] VLM分析全部完成，共{len(all_analyses)}张图片有结果")
+        logger.info(f"[ImageProcessor] VLM批次: {batcher.stats.summary()}")
         return all_analyses
     
     async def _assign_images_to_sections(
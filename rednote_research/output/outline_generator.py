@@ -5,6 +5,11 @@ from typing import Optional, Callable
 from openai import AsyncOpenAI
 from ..state import ResearchState
 from ..prompts.outline_generator import OUTLINE_GENERATOR_PROMPT
+from ..services.vector_index import get_note_index
+from ..services.note_summary import OUTLINE_NOTE_COUNT, select_note_texts
+from ..services.note_format import format_notes_compact
+from ..services.prompt_alias import parse_note_ref
+from ..services.settings import get_settings_service
 
 
 class OutlineSection:
@@ -128,20 +133,25 @@ class OutlineGenerator:
     def _prepare_notes_summary(self, state: ResearchState) -> str:
         """准备笔记摘要供 LLM 分析"""
         summaries = []
+        notes = state.documents[:OUTLINE_NOTE_COUNT]
+        prompt_settings = get_settings_service().load().prompt
+        contents = select_note_texts(notes, state.note_summaries, prompt_settings.outline_note_budget)
         
-        for i, note in enumerate(state.documents[:15]):
+        if prompt_settings.note_format == "compact":
+            # 大纲的 source_notes 从 0 开始编号
+            return format_notes_compact(notes, contents, numbers=list(range(len(notes))))
+        
+        for i, (note, content) in enumerate(zip(notes, contents)):
             detail = note.detail
             preview = note.preview
             
             title = detail.title or preview.title
-            content = (detail.content or preview.content_preview)[:200]
-            images = detail.images[:2] if detail.images else []
             
             summary = f"""
 ### 笔记 {i}: {title}
 - 作者: {detail.author or preview.author}
 - 点赞: {detail.likes or preview.likes}
-- 内容: {content}...
+- 内容: {content}
 - 图片数量: {len(detail.images if detail.images else [])}
 """
             summaries.append(summary)
@@ -222,10 +232,15 @@ class OutlineGenerator:
                     "type": section.get("type", "content"),
                     "title": section.get("title", ""),
                     "content": section.get("content", ""),
-                    "source_notes": section.get("source_notes", []),
+                    "source_notes": self._parse_source_notes(section.get("source_notes", [])),
                     "images": []
                 }
-                
+                outline.append(section_dict)
+            
+            # LLM 未标注来源的正文章节，按相似度补齐
+            self._fill_source_notes(state, outline)
+            
+            for section_dict in outline:
                 # 从引用的笔记中提取图片
                 for note_idx in section_dict["source_notes"]:
                     if 0 <= note_idx < len(state.documents):
@@ -235,14 +250,19 @@ class OutlineGenerator:
                 
                 # 限制每章节最多 4 张图片
                 section_dict["images"] = section_dict["images"][:4]
-                
-                outline.append(section_dict)
             
             return outline
             
         except json.JSONDecodeError:
             return self._generate_fallback_outline(state)
     
+    def _parse_source_notes(self, refs) -> list[int]:
+        """笔记引用转为下标（兼容 3 / "3" 写法，丢弃无法解析的项和 note_N 别名）"""
+        if not isinstance(refs, list):
+            refs = [refs]
+        indices = [parse_note_ref(ref) for ref in refs]
+        return [idx for idx in indices if idx is not None]
+    
     def _generate_fallback_outline(self, state: ResearchState) -> list[dict]:
         """生成备用大纲（当 LLM 失败时）"""
         outline = []
@@ -268,8 +288,8 @@ class OutlineGenerator:
                 "type": "content",
                 "title": "核心发现",
                 "content": content,
-                "source_notes": list(range(min(3, len(state.documents)))),
-                "images": self._collect_images(state, 0, 3)
+                "source_notes": [],
+                "images": []
             })
         
         # 用户痛点
@@ -284,8 +304,8 @@ class OutlineGenerator:
                 "type": "content",
                 "title": "用户痛点",
                 "content": content,
-                "source_notes": list(range(3, min(6, len(state.documents)))),
-                "images": self._collect_images(state, 3, 6)
+                "source_notes": [],
+                "images": []
             })
         
         # 建议总结
@@ -303,13 +323,39 @@ class OutlineGenerator:
                 "images": []
             })
         
+        # 核心发现/用户痛点按内容相似度关联来源笔记
+        self._fill_source_notes(state, outline)
+        for section in outline:
+            section["images"] = self._collect_images(state, section["source_notes"])
+        
         return outline
     
-    def _collect_images(self, state: ResearchState, start: int, end: int) -> list[str]:
+    # 自动补齐来源时每章节关联的笔记数
+    AUTO_SOURCE_NOTES = 3
+    
+    def _fill_source_notes(self, state: ResearchState, outline: list[dict]) -> None:
+        """为没有来源的正文章节按向量相似度批量补齐 source_notes（一次矩阵运算）"""
+        targets = [
+            section for section in outline
+            if section["type"] == "content" and not section["source_notes"]
+        ]
+        if not targets or not state.documents:
+            return
+        
+        index = get_note_index(state)
+        hits = index.search(
+            [f"{section['title']} {section['content']}" for section in targets],
+            k=self.AUTO_SOURCE_NOTES
+        )
+        for section, section_hits in zip(targets, hits):
+            section["source_notes"] = [note_idx for note_idx, _ in section_hits]
+    
+    def _collect_images(self, state: ResearchState, note_indices: list[int]) -> list[str]:
         """从笔记中收集图片"""
         images = []
-        for i in range(start, min(end, len(state.documents))):
-            note = state.documents[i]
-            if note.detail.images:
-                images.extend(note.detail.images[:2])
+        for i in note_indices:
+            if 0 <= i < len(state.documents):
+                note = state.documents[i]
+                if note.detail.images:
+                    images.extend(note.detail.images[:2])
         return images[:4]
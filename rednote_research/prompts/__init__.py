@@ -15,6 +15,7 @@ from .analyzer import ANALYZER_PROMPT
 from .outline_generator import OUTLINE_GENERATOR_PROMPT
 from .section_writer import SECTION_WRITER_PROMPT
 from .image_analyzer import IMAGE_ANALYZER_PROMPT
+from .note_summary import NOTE_SUMMARY_PROMPT
 
 __all__ = [
     "PLANNER_PROMPT",
@@ -23,4 +24,5 @@ __all__ = [
     "OUTLINE_GENERATOR_PROMPT",
     "SECTION_WRITER_PROMPT",
     "IMAGE_ANALYZER_PROMPT",
+    "NOTE_SUMMARY_PROMPT",
 ]
@@ -39,3 +39,29 @@ ANALYZER_PROMPT = """你是一个专业的数据分析师和内容撰写专家
 ```
 
 如果 needs_more_data 为 true，请在 suggested_keywords 中提供补充搜索的关键词。"""
+
+
+# 增量分析：在上一轮洞察基础上只分析新增笔记
+ANALYZER_INCREMENTAL_TEMPLATE = """
+## 研究主题
+{task}
+
+## 研究计划
+{plan}
+
+## 上一轮分析结果
+以下洞察基于之前分析过的 {previous_count} 篇笔记（source_ids 为笔记序号，已与当前序号对齐）：
+```json
+{previous_insights}
+```
+
+## 新增数据（共 {new_count} 篇，序号接续全部笔记编号）
+{data_summary}
+
+请结合新增数据更新上一轮分析结果：
+- 新数据支持已有观点时，补充 source_ids 并视情况提高 confidence
+- 新数据与已有观点矛盾时，修正或降低该观点的 confidence
+- 新数据带来新的发现或痛点时，追加条目
+- 保留上一轮中仍然成立的条目，不要丢弃
+按原有 JSON 格式输出完整的、更新后的洞察。
+"""
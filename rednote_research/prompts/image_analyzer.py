@@ -41,4 +41,4 @@ def build_image_analyzer_prompt(topic: str) -> str:
 ## 研究主题
 {topic}
 
-{IMAGE_ANALYZER_PROMPT.split("## 输出要求", 1)[1] if "## 输出要求" in IMAGE_ANALYZER_PROMPT else IMAGE_ANALYZER_PROMPT}"""
+## 输出要求{IMAGE_ANALYZER_PROMPT.split("## 输出要求", 1)[1]}"""
@@ -1,20 +1,37 @@
 """章节撰写器 Prompt"""
 
-SECTION_WRITER_PROMPT = '''你是一个专业的内容撰写专家。根据提供的章节数据，生成该章节的HTML内容片段。
+_SECTION_WRITER_TEMPLATE = '''你是一个专业的内容撰写专家。根据提供的章节数据，生成该章节的HTML内容片段。
 
 ## 要求
 1. 只生成该章节的内容，不要包含HTML文档结构
 2. 图文交错：图片自然嵌入文字段落间
 3. 图片使用 `referrerpolicy="no-referrer"` 属性
 4. 标注来源：引用内容需标注笔记标题
-5. 使用div和p标签组织内容
+5. 使用div和p标签组织内容{alias_rule}
 
 ## 图片格式
 ```html
 <figure class="note-image">
-  <img src="{url}" alt="描述" referrerpolicy="no-referrer" loading="lazy">
-  <figcaption>来源：{笔记标题}</figcaption>
+  <img src="{image_src}" alt="描述" referrerpolicy="no-referrer" loading="lazy">
+  <figcaption>来源：<a href="{note_href}">{{笔记标题}}</a></figcaption>
 </figure>
 ```
 
 直接输出HTML片段，不要包含markdown代码块标记。'''
+
+_ALIAS_RULE = "\n6. 链接简写：图片和笔记链接以 img_N / note_N 给出时，直接写入 src / href，不要改写编号，系统会替换为真实链接"
+
+
+def build_section_writer_prompt(url_aliases: bool = True) -> str:
+    """
+    按链接别名模式生成章节撰写 Prompt
+
+    Args:
+        url_aliases: True 时示例使用 img_N / note_N 别名；False 时示例使用原始链接占位
+    """
+    if url_aliases:
+        return _SECTION_WRITER_TEMPLATE.format(alias_rule=_ALIAS_RULE, image_src="img_1", note_href="note_1")
+    return _SECTION_WRITER_TEMPLATE.format(alias_rule="", image_src="{图片链接}", note_href="{笔记链接}")
+
+
+SECTION_WRITER_PROMPT = build_section_writer_prompt(url_aliases=True)
@@ -0,0 +1,26 @@
+"""本地缓存目录 - 各类可复用计算结果（向量、摘要、图片等）的存放位置"""
+
+import os
+from pathlib import Path
+
+
+def get_cache_dir(name: str) -> Path:
+    """
+    获取（并创建）指定类别的缓存目录
+
+    优先使用环境变量 CACHE_DIR；否则存储在 data/cache 下（容器中为 /app/data/cache），
+    data 目录不存在时回退到 services/.cache。
+
+    Args:
+        name: 缓存类别，如 "vectors"、"images"
+    """
+    env_dir = os.getenv("CACHE_DIR")
+    if env_dir:
+        base = Path(env_dir)
+    else:
+        data_dir = Path(__file__).parent.parent.parent / "data"
+        base = data_dir / "cache" if data_dir.exists() else Path(__file__).parent / ".cache"
+
+    cache_dir = base / name
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    return cache_dir
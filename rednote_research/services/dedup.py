@@ -0,0 +1,202 @@
+"""近似重复笔记检测 - SimHash 指纹 + LSH 分桶，线性时间聚类
+
+小红书上搬运、模板化的笔记很常见（正文几乎相同、ID 不同）。它们全部进入
+Analyzer / OutlineGenerator / HTML 生成会浪费 token，并让重复观点被放大。
+
+流程：
+1. 对每篇笔记的标题+正文提取字符 3-gram，计算 64 位 SimHash
+2. 指纹切成 8 段（每段 8 位）分桶：汉明距离 ≤6 的两个指纹至少有一段完全相同
+3. 只比较同桶内的指纹，命中的用并查集合并为簇
+4. 每簇保留一篇代表（点赞最高），点赞数累加，其余笔记ID记入 duplicate_ids
+
+NoteDeduper 逐篇加入笔记，流式搜索时详情一就绪就能判断是否重复。
+"""
+
+import hashlib
+import re
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+
+from ..state import NoteData
+from .text_utils import char_ngrams, estimate_tokens, normalize_text
+
+
+FINGERPRINT_BITS = 64
+LSH_BANDS = 8
+# 汉明距离阈值（需小于 LSH_BANDS，保证分桶不漏检）
+MAX_HAMMING_DISTANCE = 6
+# 归一化文本短于该长度时不参与去重（仅有标题的笔记极易误判）
+MIN_TEXT_LENGTH = 20
+SHINGLE_SIZE = 3
+# 正文中的话题标签（#穿搭[话题]#）大量雷同，不能作为重复依据
+_TOPIC_TAG = re.compile(r"#[^#\n]*?\[话题\]#")
+
+
+def _shingle_hash(shingle: str) -> int:
+    # 内置 hash() 受 PYTHONHASHSEED 影响，指纹需要跨进程稳定
+    return int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def simhash(text: str, shingle_size: int = SHINGLE_SIZE) -> int:
+    """计算文本的 64 位 SimHash（按 shingle 出现次数加权）"""
+    # 先按字节累加权重（每个 shingle 8 次操作而非 64 次），最后再拆到各位
+    byte_weights = [defaultdict(int) for _ in range(FINGERPRINT_BITS // 8)]
+    total = 0
+    for shingle, count in Counter(char_ngrams(text, shingle_size)).items():
+        h = _shingle_hash(shingle)
+        total += count
+        for table in byte_weights:
+            table[h & 0xFF] += count
+            h >>= 8
+
+    fingerprint = 0
+    for position, table in enumerate(byte_weights):
+        for bit in range(8):
+            ones = sum(weight for value, weight in table.items() if value >> bit & 1)
+            # 该位为 1 的权重超过一半即置 1
+            if 2 * ones > total:
+                fingerprint |= 1 << (position * 8 + bit)
+    return fingerprint
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def note_text(note: NoteData) -> str:
+    """笔记文本（标题 + 正文）"""
+    return f"{note.detail.title or note.preview.title}\n{note.detail.content}"
+
+
+def fingerprint_text(note: NoteData) -> str:
+    """参与指纹计算的文本（去掉话题标签）"""
+    return _TOPIC_TAG.sub(" ", note_text(note))
+
+
+@dataclass
+class DedupResult:
+    """去重结果"""
+    notes: list[NoteData]  # 去重后的笔记（保持原顺序）
+    clusters: list[list[str]] = field(default_factory=list)  # 含重复的簇（笔记ID列表，代表在前）
+    removed: int = 0
+    tokens_saved: int = 0
+
+
+class _UnionFind:
+    def __init__(self, size: int = 0):
+        self.parent = list(range(size))
+
+    def add(self) -> int:
+        self.parent.append(len(self.parent))
+        return len(self.parent) - 1
+
+    def find(self, x: int) -> int:
+        while self.parent[x] != x:
+            self.parent[x] = self.parent[self.parent[x]]
+            x = self.parent[x]
+        return x
+
+    def union(self, a: int, b: int) -> None:
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[max(root_a, root_b)] = min(root_a, root_b)
+
+
+class NoteDeduper:
+    """
+    增量去重：笔记逐篇加入，立即判断是否与已加入的笔记近似重复
+
+    流式搜索时每篇详情就绪就加入，重复笔记不必等全部搜索完成才被识别；
+    result() 的结果与对同一顺序的列表调用 dedup_notes 一致。
+    """
+
+    def __init__(self, max_distance: int = MAX_HAMMING_DISTANCE):
+        self.max_distance = min(max_distance, LSH_BANDS - 1)
+        self.notes: list[NoteData] = []
+        self._fingerprints: dict[int, int] = {}
+        self._buckets: dict[tuple[int, int], list[int]] = defaultdict(list)
+        self._uf = _UnionFind()
+
+    def add(self, note: NoteData) -> bool:
+        """
+        加入一篇笔记
+
+        Returns:
+            是否与已加入的笔记近似重复
+        """
+        index = self._uf.add()
+        self.notes.append(note)
+        text = fingerprint_text(note)
+        if len(normalize_text(text)) < MIN_TEXT_LENGTH:
+            return False
+
+        fp = self._fingerprints[index] = simhash(text)
+        band_bits = FINGERPRINT_BITS // LSH_BANDS
+        band_mask = (1 << band_bits) - 1
+        duplicate = False
+        for band in range(LSH_BANDS):
+            members = self._buckets[(band, fp >> (band * band_bits) & band_mask)]
+            for other in members:
+                if self._uf.find(other) != self._uf.find(index) and \
+                        hamming_distance(self._fingerprints[other], fp) <= self.max_distance:
+                    self._uf.union(other, index)
+                    duplicate = True
+            members.append(index)
+        return duplicate
+
+    def result(self) -> DedupResult:
+        """按簇合并，代表笔记的 likes 为簇内点赞之和"""
+        notes = self.notes
+        groups: dict[int, list[int]] = defaultdict(list)
+        for index in range(len(notes)):
+            groups[self._uf.find(index)].append(index)
+
+        keep: dict[int, NoteData] = {}
+        clusters = []
+        tokens_saved = 0
+        for members in groups.values():
+            if len(members) == 1:
+                keep[members[0]] = notes[members[0]]
+                continue
+
+            def likes(i: int) -> int:
+                return notes[i].detail.likes or notes[i].preview.likes
+
+            rep_index = max(members, key=likes)
+            others = [i for i in members if i != rep_index]
+            total_likes = sum(likes(i) for i in members)
+
+            representative = notes[rep_index].model_copy(deep=True)
+            representative.preview.likes = total_likes
+            representative.detail.likes = total_likes
+            for i in others:
+                representative.duplicate_ids.append(notes[i].preview.id)
+                representative.duplicate_ids.extend(notes[i].duplicate_ids)
+                tokens_saved += estimate_tokens(note_text(notes[i]))
+
+            keep[min(members)] = representative
+            clusters.append([notes[rep_index].preview.id] + [notes[i].preview.id for i in others])
+
+        return DedupResult(
+            notes=[keep[i] for i in sorted(keep)],
+            clusters=clusters,
+            removed=len(notes) - len(keep),
+            tokens_saved=tokens_saved
+        )
+
+
+def dedup_notes(notes: list[NoteData], max_distance: int = MAX_HAMMING_DISTANCE) -> DedupResult:
+    """
+    合并近似重复的笔记
+
+    Args:
+        notes: 笔记列表
+        max_distance: 视为重复的最大汉明距离（≤ LSH_BANDS - 1）
+
+    Returns:
+        DedupResult，代表笔记的 likes 为簇内点赞之和
+    """
+    deduper = NoteDeduper(max_distance)
+    for note in notes:
+        deduper.add(note)
+    return deduper.result()
@@ -0,0 +1,114 @@
+"""VLM 图片分析缓存 - 按图片内容哈希 + prompt/模型版本持久化分析结果
+
+VLM 是整个流程最慢、限流最严的环节，而相近主题的研究会反复搜到同一批图片。
+分析结果按图片内容 SHA-256 缓存（签名链接变化、不同笔记转发同一张图都能命中），
+键中带 prompt 模板和模型的哈希，改 prompt 或换模型后自动失效。
+
+描述、标签、分类、场景类型、质量分等与主题无关的字段跨主题复用；
+should_use 是针对研究主题的判断，按主题单独记录，其他主题复用时按分类和质量分推断。
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+from ..state import ImageAnalysisResult
+from .cache_paths import get_cache_dir
+
+logger = logging.getLogger(__name__)
+
+
+# 跨主题复用的字段
+SHARED_FIELDS = ("description", "tags", "category", "content_keywords", "scene_type", "quality_score")
+# 其他主题复用时，should_use 的推断规则
+MIN_REUSE_QUALITY = 4
+EXCLUDED_CATEGORIES = ("广告",)
+
+
+def analysis_version(prompt_template: str, model: str, variant: str = "") -> str:
+    """prompt 模板 + 模型（+ 图片预处理参数等变体）的版本哈希"""
+    return hashlib.sha1(f"{model}\x00{variant}\x00{prompt_template}".encode("utf-8")).hexdigest()[:12]
+
+
+def _topic_key(topic: str) -> str:
+    return hashlib.sha1(topic.strip().encode("utf-8")).hexdigest()[:12]
+
+
+class ImageAnalysisCache:
+    """VLM 图片分析结果持久化缓存（JSON 文件）"""
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path or get_cache_dir("vlm") / "image_analyses.json"
+        # "内容哈希:版本" -> {共享字段..., "topics": {主题哈希: should_use}}
+        self._data: dict[str, dict] = {}
+        self._dirty = False
+        if self.path.exists():
+            try:
+                self._data = json.loads(self.path.read_text(encoding="utf-8"))
+            except Exception as e:
+                logger.warning(f"[ImageAnalysisCache] 读取缓存失败: {e}")
+
+    def get(self, content_hash: str, version: str, topic: str, url: str) -> Optional[ImageAnalysisResult]:
+        """
+        读取分析结果
+
+        Args:
+            content_hash: 图片内容 SHA-256
+            version: analysis_version() 返回的版本
+            topic: 当前研究主题
+            url: 当前图片链接（结果中的 image_url）
+
+        Returns:
+            分析结果，未命中返回 None
+        """
+        entry = self._data.get(f"{content_hash}:{version}")
+        if entry is None:
+            return None
+        should_use = entry.get("topics", {}).get(_topic_key(topic))
+        if should_use is None:
+            should_use = (
+                entry.get("category") not in EXCLUDED_CATEGORIES
+                and entry.get("quality_score", 5) >= MIN_REUSE_QUALITY
+            )
+        return ImageAnalysisResult(
+            image_url=url,
+            should_use=should_use,
+            **{field: entry[field] for field in SHARED_FIELDS if field in entry}
+        )
+
+    def put(self, content_hash: str, version: str, topic: str, result: ImageAnalysisResult) -> None:
+        key = f"{content_hash}:{version}"
+        entry = self._data.get(key, {})
+        entry.update({field: getattr(result, field) for field in SHARED_FIELDS})
+        entry.setdefault("topics", {})[_topic_key(topic)] = result.should_use
+        self._data[key] = entry
+        self._dirty = True
+
+    def save(self) -> None:
+        """写回磁盘（先写临时文件再替换）"""
+        if not self._dirty:
+            return
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self._data, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# 全局单例
+_analysis_cache: Optional[ImageAnalysisCache] = None
+
+
+def get_image_analysis_cache() -> ImageAnalysisCache:
+    """获取 VLM 图片分析缓存单例"""
+    global _analysis_cache
+    if _analysis_cache is None:
+        _analysis_cache = ImageAnalysisCache()
+    return _analysis_cache
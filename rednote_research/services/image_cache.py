@@ -0,0 +1,249 @@
+"""图片字节缓存 - 按规范化 URL 索引、SHA-256 内容寻址的磁盘缓存
+
+同一张 CDN 图片会被 VLM 分析、图片验证、PDF 导出、发布草稿分别下载，
+后续研究搜到同一笔记时还会再下载一遍。所有图片读取都经过这里：
+
+- 键：规范化 URL。xhscdn 链接带时间戳和签名路径段（每次搜索都不同），
+  去掉后同一图片的不同签名链接命中同一条目
+- 值：按内容 SHA-256 存储（objects/ab/abcdef...），相同内容只存一份
+- 条目超过 TTL 视为未命中；总大小超过上限时按最近访问时间（LRU）淘汰
+- 文件和索引均先写临时文件再原子替换，进程中断不会留下半个文件
+- 内部状态由锁保护：异步调用方用 asyncio.to_thread 执行 put / flush，
+  文件写入和淘汰不阻塞事件循环
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urlsplit
+
+from .cache_paths import get_cache_dir
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_TTL = 7 * 24 * 3600
+
+# xhscdn 签名链接: /202401011200/5f3c...e1/1040g2sg30a...!nd_dft_wlteh_webp_3
+_XHS_SIGNED_PATH = re.compile(r"^/\d{10,14}/[0-9a-f]{16,64}/(.+)$")
+
+
+def canonical_image_url(url: str) -> str:
+    """
+    规范化图片 URL（缓存键）
+
+    - 去掉 fragment
+    - xhscdn 图片去掉时间戳和签名路径段，并忽略具体的 CDN 节点域名
+    """
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.endswith("xhscdn.com"):
+        match = _XHS_SIGNED_PATH.match(parts.path)
+        path = match.group(1) if match else parts.path.lstrip("/")
+        query = f"?{parts.query}" if parts.query else ""
+        return f"xhscdn:{path}{query}"
+    query = f"?{parts.query}" if parts.query else ""
+    return f"{parts.scheme.lower()}://{host}{parts.path}{query}"
+
+
+@dataclass
+class CachedImage:
+    """缓存命中的图片"""
+    data: bytes
+    content_type: str
+    sha256: str
+    path: Path
+
+
+class ImageCache:
+    """
+    图片字节磁盘缓存
+
+    使用方法:
+        cache = get_image_cache()
+        hit = cache.get(url)                       # CachedImage 或 None
+        cache.put(url, data, "image/jpeg")         # 返回内容 SHA-256
+    """
+
+    def __init__(
+        self,
+        root: Optional[Path] = None,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        ttl: float = DEFAULT_TTL
+    ):
+        """
+        Args:
+            root: 缓存目录（默认 get_cache_dir("images")）
+            max_bytes: 图片文件总大小上限
+            ttl: 条目有效期（秒）
+        """
+        self.root = root or get_cache_dir("images")
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.index_path = self.root / "index.json"
+        # 规范化URL -> {sha256, content_type, fetched_at}
+        self._entries: dict[str, dict] = {}
+        # sha256 -> {size, accessed_at}
+        self._objects: dict[str, dict] = {}
+        # 图片文件总大小（随写入/淘汰增量维护）
+        self._total_bytes = 0
+        self._lock = threading.RLock()
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def _load(self) -> None:
+        if not self.index_path.exists():
+            return
+        try:
+            data = json.loads(self.index_path.read_text(encoding="utf-8"))
+            self._entries = data.get("entries", {})
+            self._objects = data.get("objects", {})
+        except Exception as e:
+            logger.warning(f"[ImageCache] 读取索引失败，忽略已有缓存: {e}")
+            self._entries, self._objects = {}, {}
+        self._total_bytes = sum(obj["size"] for obj in self._objects.values())
+
+    def _object_path(self, sha256: str) -> Path:
+        return self.root / "objects" / sha256[:2] / sha256
+
+    @staticmethod
+    def _atomic_write(path: Path, data: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def get(self, url: str) -> Optional[CachedImage]:
+        """读取缓存（过期或文件缺失视为未命中）"""
+        key = canonical_image_url(url)
+        with self._lock:
+            entry = self._entries.get(key)
+        now = time.time()
+        if entry is None or now - entry["fetched_at"] > self.ttl:
+            self.misses += 1
+            return None
+
+        sha256 = entry["sha256"]
+        path = self._object_path(sha256)
+        try:
+            data = path.read_bytes()
+        except OSError:
+            with self._lock:
+                self._entries.pop(key, None)
+                removed = self._objects.pop(sha256, None)
+                if removed is not None:
+                    self._total_bytes -= removed["size"]
+                self._dirty = True
+            self.misses += 1
+            return None
+
+        with self._lock:
+            obj = self._objects.get(sha256)
+            if obj is None:
+                obj = self._objects[sha256] = {"size": len(data)}
+                self._total_bytes += len(data)
+            obj["accessed_at"] = now
+            self._dirty = True
+        self.hits += 1
+        return CachedImage(data=data, content_type=entry["content_type"], sha256=sha256, path=path)
+
+    def path_for(self, url: str) -> Optional[Path]:
+        """已缓存图片的本地文件路径（供需要文件的场景，如发布草稿）"""
+        hit = self.get(url)
+        return hit.path if hit else None
+
+    def put(self, url: str, data: bytes, content_type: str = "image/jpeg", flush: bool = True) -> str:
+        """
+        写入缓存（写文件并可能淘汰旧文件，异步调用方应通过 asyncio.to_thread 执行）
+
+        Args:
+            url: 图片URL
+            data: 图片字节
+            content_type: MIME 类型
+            flush: 是否立即写回索引（批量写入时由调用方最后统一 flush）
+
+        Returns:
+            内容 SHA-256
+        """
+        sha256 = hashlib.sha256(data).hexdigest()
+        now = time.time()
+        path = self._object_path(sha256)
+        with self._lock:
+            if sha256 not in self._objects or not path.exists():
+                self._atomic_write(path, data)
+            previous = self._objects.get(sha256)
+            self._total_bytes += len(data) - (previous["size"] if previous else 0)
+            self._objects[sha256] = {"size": len(data), "accessed_at": now}
+            self._entries[canonical_image_url(url)] = {
+                "sha256": sha256,
+                "content_type": content_type,
+                "fetched_at": now
+            }
+            self._dirty = True
+            self._evict()
+            if flush:
+                self.flush()
+        return sha256
+
+    def _evict(self) -> None:
+        """按最近访问时间淘汰，直到总大小不超过上限（调用方持有锁）"""
+        if self._total_bytes <= self.max_bytes:
+            return
+        removed = set()
+        for sha256, obj in sorted(self._objects.items(), key=lambda item: item[1].get("accessed_at", 0)):
+            if self._total_bytes <= self.max_bytes:
+                break
+            self._object_path(sha256).unlink(missing_ok=True)
+            self._total_bytes -= obj["size"]
+            removed.add(sha256)
+        for sha256 in removed:
+            del self._objects[sha256]
+        self._entries = {key: entry for key, entry in self._entries.items() if entry["sha256"] not in removed}
+        logger.info(f"[ImageCache] 淘汰 {len(removed)} 张图片，当前 {self._total_bytes / 1024 / 1024:.1f}MB")
+
+    def flush(self) -> None:
+        """写回索引（访问时间在下次写入或退出时持久化）"""
+        with self._lock:
+            if not self._dirty:
+                return
+            payload = json.dumps({"entries": self._entries, "objects": self._objects}, ensure_ascii=False)
+            self._atomic_write(self.index_path, payload.encode("utf-8"))
+            self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# 全局单例
+_image_cache: Optional[ImageCache] = None
+
+
+def get_image_cache() -> ImageCache:
+    """获取图片缓存单例（IMAGE_CACHE_MAX_MB / IMAGE_CACHE_TTL_HOURS 可调整上限和有效期）"""
+    global _image_cache
+    if _image_cache is None:
+        _image_cache = ImageCache(
+            max_bytes=int(float(os.getenv("IMAGE_CACHE_MAX_MB", "512")) * 1024 * 1024),
+            ttl=float(os.getenv("IMAGE_CACHE_TTL_HOURS", "168")) * 3600
+        )
+    return _image_cache
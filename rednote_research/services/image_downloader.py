@@ -0,0 +1,318 @@
+"""图片下载器 - 共享连接池的并发图片下载
+
+VLM 分析前需要把笔记图片下载为 base64（CDN 防盗链，VLM 无法直接访问原链接）。
+原实现每张图片新建一个 ClientSession 并串行下载，一批 10 张图片要做 10 次
+TCP/TLS 握手。这里所有下载共用一个会话：
+
+- 连接池复用 keep-alive 连接
+- 全局并发数 + 单域名并发数双重限制（避免对单个 CDN 节点突发请求）
+- 每批下载统计成功/失败数、字节数和吞吐量
+- 先读磁盘图片缓存（services/image_cache.py），命中则不发请求；写缓存在线程中执行
+"""
+
+import asyncio
+import base64
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from .image_cache import ImageCache, get_image_cache
+from .settings import get_settings_service
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_HEADERS = {
+    "Referer": "https://www.xiaohongshu.com/",
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+}
+
+
+@dataclass
+class DownloadedImage:
+    """下载结果"""
+    url: str
+    data: bytes
+    content_type: str = "image/jpeg"
+
+    def to_data_uri(self) -> str:
+        return f"data:{self.content_type};base64,{base64.b64encode(self.data).decode()}"
+
+
+@dataclass
+class DownloadStats:
+    """一批下载的统计"""
+    total: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    cache_hits: int = 0
+    bytes: int = 0
+    elapsed: float = 0.0
+    errors: dict[str, int] = field(default_factory=dict)  # 失败原因 -> 次数
+
+    @property
+    def throughput(self) -> float:
+        """字节/秒"""
+        return self.bytes / self.elapsed if self.elapsed > 0 else 0.0
+
+    def record_error(self, reason: str) -> None:
+        self.errors[reason] = self.errors.get(reason, 0) + 1
+
+    def merge(self, other: "DownloadStats") -> None:
+        self.total += other.total
+        self.succeeded += other.succeeded
+        self.failed += other.failed
+        self.cache_hits += other.cache_hits
+        self.bytes += other.bytes
+        self.elapsed += other.elapsed
+        for reason, count in other.errors.items():
+            self.errors[reason] = self.errors.get(reason, 0) + count
+
+    def summary(self) -> str:
+        text = (
+            f"{self.succeeded}/{self.total} 成功 | {self.bytes / 1024:.0f}KB | "
+            f"{self.elapsed:.1f}s | {self.throughput / 1024:.0f}KB/s"
+        )
+        if self.cache_hits:
+            text += f" | 缓存命中 {self.cache_hits}"
+        if self.errors:
+            text += " | 失败: " + ", ".join(f"{reason}×{count}" for reason, count in self.errors.items())
+        return text
+
+
+class ImageDownloader:
+    """
+    共享连接池的图片下载器
+
+    使用方法:
+        downloader = get_image_downloader()
+        images, stats = await downloader.fetch_many(urls)   # 与 urls 一一对应，失败为 None
+        logger.info(stats.summary())
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 16,
+        per_host: int = 6,
+        timeout: float = 30.0,
+        connect_timeout: float = 10.0,
+        max_retries: int = 2,
+        headers: Optional[dict[str, str]] = None,
+        cache: Optional[ImageCache] = None
+    ):
+        """
+        Args:
+            concurrency: 全局并发下载数
+            per_host: 单域名并发下载数
+            timeout: 单次请求总超时（秒）
+            connect_timeout: 建立连接超时（秒）
+            max_retries: 超时重试次数（HTTP 错误不重试）
+            headers: 请求头（默认带小红书 Referer）
+            cache: 图片磁盘缓存（None 时不缓存）
+        """
+        self.concurrency = max(1, concurrency)
+        self.per_host = max(1, min(per_host, self.concurrency))
+        self.timeout = aiohttp.ClientTimeout(total=timeout, connect=connect_timeout)
+        self.max_retries = max_retries
+        self.headers = headers or DEFAULT_HEADERS
+        self.cache = cache
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._host_slots: dict[str, asyncio.Semaphore] = {}
+        # 进行中的 fetch / fetch_many 调用数；被替换（retire）后归零即关闭连接池
+        self._active = 0
+        self._retired = False
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # 会话和信号量绑定事件循环，换循环（如测试、脚本多次 asyncio.run）时重建；
+            # 先切换状态再等待关闭旧会话，同一新循环上的并发调用不会重复重建
+            stale, self._session = self._session, None
+            self._loop = loop
+            self._slots = asyncio.Semaphore(self.concurrency)
+            self._host_slots = {}
+            await self._discard_session(stale)
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.concurrency,
+                limit_per_host=self.per_host,
+                ttl_dns_cache=300
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout, headers=self.headers)
+        return self._session
+
+    @staticmethod
+    async def _discard_session(session: Optional[aiohttp.ClientSession]) -> None:
+        """关闭绑定在旧事件循环上的会话（旧循环已关闭时连接无法正常关闭，直接释放连接器）"""
+        if session is None or session.closed:
+            return
+        try:
+            await session.close()
+        except Exception as e:
+            logger.debug(f"[ImageDownloader] 关闭旧会话失败，直接释放连接器: {e}")
+            connector = session.connector
+            session.detach()
+            if connector is not None:
+                try:
+                    await connector.close()
+                except Exception:
+                    pass
+
+    def _host_slot(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        slot = self._host_slots.get(host)
+        if slot is None:
+            slot = self._host_slots[host] = asyncio.Semaphore(self.per_host)
+        return slot
+
+    async def fetch(self, url: str, stats: Optional[DownloadStats] = None) -> Optional[DownloadedImage]:
+        """
+        获取单张图片（先读缓存；下载时超时重试，HTTP 错误和其他异常不重试）
+
+        Args:
+            url: 图片URL
+            stats: 统计对象，提供时记录结果
+
+        Returns:
+            下载结果，失败返回None
+        """
+        self._active += 1
+        try:
+            image = await self._fetch(url, stats)
+            if self.cache is not None:
+                await asyncio.to_thread(self.cache.flush)
+            return image
+        finally:
+            await self._release()
+
+    async def _fetch(self, url: str, stats: Optional[DownloadStats]) -> Optional[DownloadedImage]:
+        if self.cache is not None:
+            hit = self.cache.get(url)
+            if hit is not None:
+                if stats is not None:
+                    stats.succeeded += 1
+                    stats.cache_hits += 1
+                return DownloadedImage(url, hit.data, hit.content_type)
+
+        session = await self._get_session()
+        reason = "unknown"
+        async with self._slots, self._host_slot(url):
+            for attempt in range(self.max_retries + 1):
+                try:
+                    async with session.get(url) as resp:
+                        if resp.status == 200:
+                            data = await resp.read()
+                            content_type = resp.headers.get("Content-Type", "image/jpeg")
+                            if stats is not None:
+                                stats.succeeded += 1
+                                stats.bytes += len(data)
+                            if self.cache is not None:
+                                # 写文件和 LRU 淘汰在线程中执行，不阻塞事件循环
+                                await asyncio.to_thread(self.cache.put, url, data, content_type, False)
+                            return DownloadedImage(url, data, content_type)
+                        reason = f"HTTP {resp.status}"
+                        logger.warning(f"[ImageDownloader] 下载图片失败 {reason}: {url[:60]}...")
+                        break
+                except asyncio.TimeoutError:
+                    reason = "timeout"
+                    if attempt < self.max_retries:
+                        logger.warning(f"[ImageDownloader] 下载图片超时(尝试{attempt+1}/{self.max_retries+1}): {url[:60]}...")
+                        await asyncio.sleep(1)
+                    else:
+                        logger.warning(f"[ImageDownloader] 下载图片超时(已放弃): {url[:60]}...")
+                except Exception as e:
+                    reason = type(e).__name__
+                    logger.warning(f"[ImageDownloader] 下载图片异常: {url[:60]}... - {e}")
+                    break
+
+        if stats is not None:
+            stats.failed += 1
+            stats.record_error(reason)
+        return None
+
+    async def fetch_many(self, urls: list[str]) -> tuple[list[Optional[DownloadedImage]], DownloadStats]:
+        """
+        并发下载一批图片
+
+        Returns:
+            (与 urls 一一对应的下载结果, 本批统计)
+        """
+        stats = DownloadStats(total=len(urls))
+        started = time.perf_counter()
+        self._active += 1
+        try:
+            results = await asyncio.gather(*[self._fetch(url, stats) for url in urls])
+            stats.elapsed = time.perf_counter() - started
+            if self.cache is not None:
+                await asyncio.to_thread(self.cache.flush)
+        finally:
+            await self._release()
+        return list(results), stats
+
+    async def _release(self) -> None:
+        self._active -= 1
+        if self._retired and not self._active:
+            await self.close()
+
+    def retire(self) -> None:
+        """
+        标记为已被替换：进行中的下载完成后关闭连接池
+
+        仍持有该实例的调用方可以继续使用（会重新建立连接池，用完再关闭）。
+        """
+        self._retired = True
+        if self._active:
+            return
+        try:
+            asyncio.get_running_loop().create_task(self.close())
+        except RuntimeError:
+            # 不在事件循环中（无法异步关闭），退出时由 close_image_downloader 关闭
+            pass
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        if self._retired and self in _retired_downloaders:
+            _retired_downloaders.remove(self)
+
+
+# 全局单例（按并发配置重建；旧下载器可能仍被进行中的分析使用，用完即关闭，退出时关闭剩余的）
+_downloader: Optional[ImageDownloader] = None
+_downloader_key: Optional[tuple] = None
+_retired_downloaders: list[ImageDownloader] = []
+
+
+def get_image_downloader() -> ImageDownloader:
+    """获取图片下载器单例（并发参数取自 VLM 配置，读写全局图片缓存）"""
+    global _downloader, _downloader_key
+    vlm = get_settings_service().load().vlm
+    key = (vlm.download_concurrency, vlm.download_per_host)
+    if _downloader is None or key != _downloader_key:
+        if _downloader is not None:
+            _retired_downloaders.append(_downloader)
+            _downloader.retire()
+        _downloader = ImageDownloader(
+            concurrency=vlm.download_concurrency,
+            per_host=vlm.download_per_host,
+            cache=get_image_cache()
+        )
+        _downloader_key = key
+    return _downloader
+
+
+async def close_image_downloader() -> None:
+    """关闭下载器连接池（应用退出时调用）"""
+    for downloader in list(_retired_downloaders):
+        await downloader.close()
+    _retired_downloaders.clear()
+    if _downloader is not None:
+        await _downloader.close()
+        if _downloader.cache is not None:
+            _downloader.cache.flush()
@@ -0,0 +1,118 @@
+"""近似重复图片检测 - dHash + pHash 感知哈希，NumPy 向量化聚类
+
+同一张照片被不同作者转发、或以不同 CDN 参数/尺寸/压缩率提供时，URL 不同但
+内容几乎一样。按 URL 去重无法识别，它们会被重复送入 VLM，并可能分配到多个章节。
+
+流程：
+1. 解码为灰度缩略图（JPEG 用 draft 模式直接按 1/2~1/8 解码，很快）
+2. dHash：9×8 缩略图相邻像素比较，64 位
+3. pHash：32×32 缩略图做 DCT，取左上 8×8 低频分量与中位数比较，64 位
+4. dHash 和 pHash 的汉明距离都在阈值内才视为同一张图
+5. NearDuplicateIndex 增量匹配：新图片与已有代表图一次向量化比较，命中即归入该簇，
+   否则成为新代表。图片分析流水线边下载边去重，每簇以最先出现的图片为代表
+"""
+
+import io
+import logging
+from typing import Optional
+
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+
+HASH_SIZE = 8
+PHASH_SIZE = 32
+# 64 位哈希的汉明距离阈值（重新压缩/缩放通常 ≤4，不同图片通常 >20）
+MAX_DHASH_DISTANCE = 10
+MAX_PHASH_DISTANCE = 10
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    return np.cos(np.pi * (2 * i + 1) * k / (2 * n))
+
+
+_DCT = _dct_matrix(PHASH_SIZE)
+
+
+def _pack_bits(bits: np.ndarray) -> int:
+    return int.from_bytes(np.packbits(bits.ravel()).tobytes(), "big")
+
+
+def dhash(gray: np.ndarray) -> int:
+    """差值哈希：gray 为 (HASH_SIZE, HASH_SIZE + 1) 灰度矩阵"""
+    return _pack_bits(gray[:, 1:] > gray[:, :-1])
+
+
+def phash(gray: np.ndarray) -> int:
+    """感知哈希：gray 为 (PHASH_SIZE, PHASH_SIZE) 灰度矩阵"""
+    low = (_DCT @ gray @ _DCT.T)[:HASH_SIZE, :HASH_SIZE]
+    # 直流分量只反映整体亮度，不参与中位数
+    median = np.median(low.ravel()[1:])
+    return _pack_bits(low > median)
+
+
+def image_hashes(data: bytes) -> tuple[int, int]:
+    """
+    计算图片的 (dHash, pHash)（同步，CPU 密集）
+
+    Raises:
+        PIL.UnidentifiedImageError / OSError: 无法解码
+    """
+    with Image.open(io.BytesIO(data)) as img:
+        img.draft("L", (PHASH_SIZE * 4, PHASH_SIZE * 4))
+        gray = img.convert("L")
+        small = np.asarray(gray.resize((HASH_SIZE + 1, HASH_SIZE), Image.Resampling.BILINEAR), dtype=np.float32)
+        large = np.asarray(gray.resize((PHASH_SIZE, PHASH_SIZE), Image.Resampling.BILINEAR), dtype=np.float32)
+    return dhash(small), phash(large)
+
+
+def _popcount(values: np.ndarray) -> np.ndarray:
+    """uint64 数组逐元素的置位数"""
+    return np.unpackbits(values.view(np.uint8)).reshape(values.shape + (64,)).sum(axis=-1)
+
+
+class NearDuplicateIndex:
+    """
+    近似重复图片增量索引（保存每簇代表图的哈希）
+
+    使用方法:
+        index = NearDuplicateIndex()
+        rep = index.match(url, hashes)   # 命中返回代表图URL，否则登记为新代表并返回 None
+    """
+
+    def __init__(self, max_dhash: int = MAX_DHASH_DISTANCE, max_phash: int = MAX_PHASH_DISTANCE):
+        self.max_dhash = max_dhash
+        self.max_phash = max_phash
+        self.urls: list[str] = []
+        self._dhashes = np.empty(0, dtype=np.uint64)
+        self._phashes = np.empty(0, dtype=np.uint64)
+
+    def find(self, hashes: tuple[int, int]) -> Optional[str]:
+        """查找与 hashes 近似重复的代表图（多个命中时取距离之和最小的）"""
+        if not self.urls:
+            return None
+        d = _popcount(self._dhashes ^ np.uint64(hashes[0]))
+        p = _popcount(self._phashes ^ np.uint64(hashes[1]))
+        hits = np.flatnonzero((d <= self.max_dhash) & (p <= self.max_phash))
+        if hits.size == 0:
+            return None
+        return self.urls[hits[np.argmin((d + p)[hits])]]
+
+    def add(self, url: str, hashes: tuple[int, int]) -> None:
+        self.urls.append(url)
+        self._dhashes = np.append(self._dhashes, np.uint64(hashes[0]))
+        self._phashes = np.append(self._phashes, np.uint64(hashes[1]))
+
+    def match(self, url: str, hashes: tuple[int, int]) -> Optional[str]:
+        """查找代表图；未命中时把 url 登记为新代表"""
+        rep = self.find(hashes)
+        if rep is None:
+            self.add(url, hashes)
+        return rep
+
+    def __len__(self) -> int:
+        return len(self.urls)
@@ -0,0 +1,194 @@
+"""图片预处理 - 送入 VLM 前缩放、去元数据、重新编码
+
+笔记原图常见 3000px 以上、单张数 MB，一次 VLM 请求带 10 张 base64 原图，
+请求体可达数十 MB；VLM 的图片 token 数又随分辨率增长。分析类任务（分类、
+描述、关键词）用 1024px 左右的图已足够：
+
+- 按最长边等比缩小（不放大），EXIF 方向先校正
+- 丢弃 EXIF/ICC 等元数据，统一重新编码为 JPEG/WebP
+- 解码和编码是 CPU 密集操作，放到线程池执行，不阻塞事件循环
+- 重新编码后反而更大（已是小图）时保留原图
+
+不同尺寸下的请求体积、VLM 延迟和结果一致性见 scripts/bench_vlm_image_size.py。
+"""
+
+import asyncio
+import io
+import logging
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+
+from PIL import Image, ImageOps
+
+from .image_downloader import DownloadedImage
+from .settings import get_settings_service
+
+logger = logging.getLogger(__name__)
+
+
+FORMATS = {"JPEG": "image/jpeg", "WEBP": "image/webp"}
+
+
+@dataclass
+class PreprocessStats:
+    """一批图片的预处理统计"""
+    count: int = 0
+    resized: int = 0
+    failed: int = 0
+    bytes_before: int = 0
+    bytes_after: int = 0
+
+    def merge(self, other: "PreprocessStats") -> None:
+        self.count += other.count
+        self.resized += other.resized
+        self.failed += other.failed
+        self.bytes_before += other.bytes_before
+        self.bytes_after += other.bytes_after
+
+    def summary(self) -> str:
+        ratio = self.bytes_after / self.bytes_before if self.bytes_before else 1.0
+        return (
+            f"{self.count} 张 | 缩放 {self.resized} 张 | "
+            f"{self.bytes_before / 1024:.0f}KB → {self.bytes_after / 1024:.0f}KB ({ratio:.0%})"
+            + (f" | 解码失败 {self.failed} 张" if self.failed else "")
+        )
+
+
+def downscale_image(data: bytes, max_side: int, quality: int = 80, fmt: str = "JPEG") -> tuple[bytes, str, bool]:
+    """
+    缩放并重新编码图片（同步，CPU 密集）
+
+    Args:
+        data: 原始图片字节
+        max_side: 最长边上限（像素）
+        quality: 编码质量 1-95
+        fmt: 输出格式 JPEG / WEBP
+
+    Returns:
+        (图片字节, MIME 类型, 是否缩放)。重新编码后不比原图小且无需缩放时返回原图。
+
+    Raises:
+        PIL.UnidentifiedImageError / OSError: 无法解码
+    """
+    fmt = fmt.upper()
+    with Image.open(io.BytesIO(data)) as img:
+        source_type = Image.MIME.get(img.format or "", "image/jpeg")
+        img = ImageOps.exif_transpose(img)  # 动图只取第一帧
+        resized = max(img.size) > max_side
+        if resized:
+            img.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+
+        if fmt == "JPEG" and img.mode != "RGB":
+            if img.mode in ("RGBA", "LA", "P"):
+                # 透明背景铺白，避免 JPEG 里变成黑底
+                rgba = img.convert("RGBA")
+                background = Image.new("RGB", rgba.size, (255, 255, 255))
+                background.paste(rgba, mask=rgba.getchannel("A"))
+                img = background
+            else:
+                img = img.convert("RGB")
+        elif fmt == "WEBP" and img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "A" in img.getbands() or img.mode == "P" else "RGB")
+
+        out = io.BytesIO()
+        # 不传 exif/icc_profile，元数据不会写入
+        img.save(out, format=fmt, quality=quality, optimize=True)
+        encoded = out.getvalue()
+
+    if not resized and len(encoded) >= len(data):
+        return data, source_type, False
+    return encoded, FORMATS.get(fmt, "image/jpeg"), resized
+
+
+class ImagePreprocessor:
+    """
+    VLM 图片预处理器
+
+    使用方法:
+        preprocessor = get_image_preprocessor()
+        images, stats = await preprocessor.process_many(downloaded)
+    """
+
+    def __init__(
+        self,
+        max_side: int = 1024,
+        quality: int = 80,
+        fmt: str = "JPEG",
+        executor: Optional[Executor] = None
+    ):
+        """
+        Args:
+            max_side: 最长边上限（像素），<=0 表示不处理
+            quality: 编码质量
+            fmt: 输出格式 JPEG / WEBP
+            executor: 执行解码/编码的线程池或进程池（None 时使用事件循环默认线程池）
+        """
+        self.max_side = max_side
+        self.quality = quality
+        self.fmt = fmt.upper() if fmt.upper() in FORMATS else "JPEG"
+        self.executor = executor
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_side > 0
+
+    async def process(
+        self,
+        image: Optional[DownloadedImage],
+        stats: Optional[PreprocessStats] = None
+    ) -> Optional[DownloadedImage]:
+        """预处理单张图片（解码失败时原样返回）"""
+        if image is None or not self.enabled:
+            return image
+        if stats is not None:
+            stats.count += 1
+            stats.bytes_before += len(image.data)
+        loop = asyncio.get_running_loop()
+        try:
+            data, content_type, resized = await loop.run_in_executor(
+                self.executor, downscale_image, image.data, self.max_side, self.quality, self.fmt
+            )
+        except Exception as e:
+            logger.warning(f"[ImagePreprocessor] 图片解码失败，使用原图: {image.url[:60]}... - {e}")
+            if stats is not None:
+                stats.failed += 1
+                stats.bytes_after += len(image.data)
+            return image
+        if stats is not None:
+            stats.resized += int(resized)
+            stats.bytes_after += len(data)
+        return DownloadedImage(image.url, data, content_type)
+
+    async def process_many(
+        self,
+        images: list[Optional[DownloadedImage]]
+    ) -> tuple[list[Optional[DownloadedImage]], PreprocessStats]:
+        """并行预处理一批图片，返回与输入一一对应的结果"""
+        stats = PreprocessStats()
+        results = await asyncio.gather(*[self.process(image, stats) for image in images])
+        return list(results), stats
+
+
+# 全局单例（按预处理配置重建；线程池只在线程数变化时重建，旧线程池不再被引用后其线程自动退出）
+_preprocessor: Optional[ImagePreprocessor] = None
+_preprocessor_key: Optional[tuple] = None
+
+
+def get_image_preprocessor() -> ImagePreprocessor:
+    """获取图片预处理器单例（参数取自 VLM 配置）"""
+    global _preprocessor, _preprocessor_key
+    vlm = get_settings_service().load().vlm
+    key = (vlm.image_max_side, vlm.image_quality, vlm.image_format, vlm.preprocess_workers)
+    if _preprocessor is None or key != _preprocessor_key:
+        executor = _preprocessor.executor if _preprocessor is not None else None
+        if executor is None or _preprocessor_key[3] != vlm.preprocess_workers:
+            executor = ThreadPoolExecutor(max_workers=vlm.preprocess_workers, thread_name_prefix="image-preprocess")
+        _preprocessor = ImagePreprocessor(
+            max_side=vlm.image_max_side,
+            quality=vlm.image_quality,
+            fmt=vlm.image_format,
+            executor=executor
+        )
+        _preprocessor_key = key
+    return _preprocessor
@@ -0,0 +1,206 @@
+"""图片本地预筛 - 送入 VLM 前用 NumPy 剔除明显不可用的图片
+
+小图标、横幅、纯色/空白图、严重模糊的图、带二维码的引流图送进 VLM 也只会被判为不可用，
+白白占用批次和限流配额。预筛只解码一张灰度缩略图（JPEG draft 模式），单张毫秒级：
+
+- 尺寸：最短边过小（图标、表情）
+- 长宽比：过宽/过长（横幅、分隔条）
+- 近似纯色：灰度熵和标准差都很低
+- 模糊：拉普拉斯算子响应的方差过低
+- 二维码：行、列扫描 1:1:3:1:1 的定位图案，按 7×7 模块模板复核，三个定位点构成等腰直角三角形
+
+阈值偏保守，只剔除“明显”的图片；拿不准的交给 VLM。
+"""
+
+import io
+import logging
+import math
+from dataclasses import dataclass
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+
+MIN_SIDE = 150  # 最短边下限（像素）
+MAX_ASPECT_RATIO = 4.0  # 长边/短边上限（小红书长图攻略通常在 3:1 以内）
+MIN_ENTROPY = 1.0  # 灰度直方图熵（bit），与标准差同时低于阈值才视为纯色
+MIN_STDDEV = 8.0
+MIN_SHARPNESS = 5.0  # 512px 缩略图上拉普拉斯响应的方差（清晰照片通常 >50）
+ANALYSIS_SIDE = 512  # 熵 / 清晰度计算用的缩略图边长
+QR_SIDE = 800  # 二维码扫描用的缩略图边长（二维码常只占图片一角）
+
+# 定位图案（黑白黑白黑）宽度比例
+_FINDER_RATIO = np.array([1, 1, 3, 1, 1], dtype=np.float32)
+# 定位图案 7×7 模块模板：到中心的切比雪夫距离 ≤1 深、=2 浅、=3 深
+_OFFSETS = np.arange(-3, 4)
+_FINDER_TEMPLATE = np.maximum(np.abs(_OFFSETS)[:, None], np.abs(_OFFSETS)[None, :]) != 2
+
+
+@dataclass
+class PrescreenResult:
+    """预筛结果"""
+    reject: bool
+    reason: str = ""
+    category: str = ""  # 剔除时记录的分类（二维码 → 广告，其余 → 装饰）
+
+
+def _grayscale(data: bytes, side: int) -> tuple[tuple[int, int], np.ndarray]:
+    """原图尺寸 + 最长边不超过 side 的灰度矩阵"""
+    with Image.open(io.BytesIO(data)) as img:
+        size = img.size
+        img.draft("L", (side, side))
+        gray = img.convert("L")
+        gray.thumbnail((side, side), Image.Resampling.BILINEAR)
+        return size, np.asarray(gray, dtype=np.float32)
+
+
+def gray_entropy(gray: np.ndarray) -> float:
+    """灰度直方图熵（bit）"""
+    hist = np.bincount(gray.astype(np.uint8).ravel(), minlength=256).astype(np.float64)
+    p = hist[hist > 0] / hist.sum()
+    return float(-(p * np.log2(p)).sum())
+
+
+def laplacian_variance(gray: np.ndarray) -> float:
+    """4 邻域拉普拉斯算子响应的方差（越小越模糊）"""
+    if min(gray.shape) < 3:
+        return 0.0
+    lap = (
+        gray[:-2, 1:-1] + gray[2:, 1:-1] + gray[1:-1, :-2] + gray[1:-1, 2:]
+        - 4 * gray[1:-1, 1:-1]
+    )
+    return float(lap.var())
+
+
+def _finder_centers(binary: np.ndarray) -> list[tuple[float, float, float]]:
+    """
+    逐行扫描定位图案（整幅图一次行程编码，不逐行循环）
+
+    Returns:
+        [(行号, 中心列坐标, 模块宽度)]
+    """
+    height, width = binary.shape
+    flat = binary.ravel()
+    # 行程起点：值变化处或每行开头
+    boundary = np.ones(flat.size, dtype=bool)
+    boundary[1:] = flat[1:] != flat[:-1]
+    boundary[::width] = True
+    starts = np.flatnonzero(boundary)
+    if starts.size < 5:
+        return []
+    widths = np.diff(np.append(starts, flat.size)).astype(np.float32)
+    rows = starts // width
+
+    windows = sliding_window_view(widths, 5)
+    unit = windows.sum(axis=1) / 7
+    ok = (np.abs(windows - unit[:, None] * _FINDER_RATIO) <= unit[:, None] * 0.6).all(axis=1)
+    first = starts[:-4]
+    ok &= flat[first] & (unit >= 1) & (rows[:-4] == rows[4:])  # 以深色开始且五段在同一行
+    idx = np.flatnonzero(ok)
+    centers = starts[idx + 2] - rows[idx] * width + windows[idx, 2] / 2
+    return list(zip(rows[idx].astype(float), centers.astype(float), unit[idx].astype(float)))
+
+
+def _matches_finder(binary: np.ndarray, y: float, x: float, unit: float) -> bool:
+    """按 7×7 模块采样，与定位图案模板比较（最多 3 个模块不符）"""
+    ys = np.rint(y + _OFFSETS * unit).astype(int)
+    xs = np.rint(x + _OFFSETS * unit).astype(int)
+    if ys.min() < 0 or xs.min() < 0 or ys.max() >= binary.shape[0] or xs.max() >= binary.shape[1]:
+        return False
+    return int((binary[np.ix_(ys, xs)] != _FINDER_TEMPLATE).sum()) <= 3
+
+
+def has_qr_code(gray: np.ndarray) -> bool:
+    """检测二维码的三个定位图案"""
+    binary = gray < (gray.min() + gray.max()) / 2
+    rows = _finder_centers(binary)
+    if len(rows) < 3:
+        return False
+    cols = _finder_centers(binary.T)
+
+    # 行扫描和列扫描都命中的位置才是定位图案中心
+    if not cols:
+        return False
+    # 列扫描结果为 (列号, 中心行坐标, 模块宽度)
+    col_points = np.array([(cy, cx) for cx, cy, _ in cols])
+    clusters: list[list[tuple[float, float, float]]] = []
+    for row_y, x, unit in rows:
+        distance = np.abs(col_points - (row_y, x)).max(axis=1)
+        nearest = int(distance.argmin())
+        if distance[nearest] > max(2.0, unit):
+            continue
+        # 行扫描给出水平中心，列扫描给出垂直中心
+        hit = (float(col_points[nearest][0]), x, unit)
+        # 同一定位图案在相邻多行都会命中，按位置聚合
+        for cluster in clusters:
+            if abs(cluster[0][0] - hit[0]) <= 3 * unit and abs(cluster[0][1] - hit[1]) <= 3 * unit:
+                cluster.append(hit)
+                break
+        else:
+            clusters.append([hit])
+    # 定位图案中心宽 3 个模块，至少在 2 行命中（排除随机纹理的偶然匹配）；取中位数抵抗相邻数据模块的干扰
+    candidates = [tuple(np.median(np.array(c), axis=0)) for c in clusters if len(c) >= 2]
+    centers = [c for c in candidates if _matches_finder(binary, *c)]
+    if len(centers) < 3:
+        return False
+
+    # 任意三个模块宽度相近的中心构成等腰直角三角形
+    for i in range(len(centers)):
+        for j in range(i + 1, len(centers)):
+            for k in range(j + 1, len(centers)):
+                trio = [centers[i], centers[j], centers[k]]
+                units = [c[2] for c in trio]
+                if max(units) > 1.5 * min(units):
+                    continue
+                sides = sorted(
+                    math.dist(a[:2], b[:2])
+                    for a, b in ((trio[0], trio[1]), (trio[0], trio[2]), (trio[1], trio[2]))
+                )
+                if sides[0] < 7 * min(units):
+                    continue
+                if sides[1] <= 1.15 * sides[0] and abs(sides[2] - sides[0] * math.sqrt(2)) <= 0.15 * sides[2]:
+                    return True
+    return False
+
+
+def prescreen_image(data: bytes) -> PrescreenResult:
+    """
+    本地预筛单张图片（同步，CPU 密集）
+
+    Args:
+        data: 图片字节
+
+    Returns:
+        PrescreenResult；无法解码时不剔除（交给后续流程处理）
+    """
+    try:
+        (width, height), gray = _grayscale(data, QR_SIDE)
+    except Exception:
+        return PrescreenResult(reject=False)
+
+    short, long = min(width, height), max(width, height)
+    if short < MIN_SIDE:
+        return PrescreenResult(True, f"尺寸过小({width}×{height})", "装饰")
+    if long / short > MAX_ASPECT_RATIO:
+        return PrescreenResult(True, f"长宽比异常({long / short:.1f}:1)", "装饰")
+
+    small = gray
+    if max(gray.shape) > ANALYSIS_SIDE:
+        scale = ANALYSIS_SIDE / max(gray.shape)
+        resized = Image.fromarray(gray.astype(np.uint8)).resize(
+            (max(1, round(gray.shape[1] * scale)), max(1, round(gray.shape[0] * scale))),
+            Image.Resampling.BILINEAR
+        )
+        small = np.asarray(resized, dtype=np.float32)
+
+    if small.std() < MIN_STDDEV and gray_entropy(small) < MIN_ENTROPY:
+        return PrescreenResult(True, "近似纯色/空白", "装饰")
+    sharpness = laplacian_variance(small)
+    if sharpness < MIN_SHARPNESS:
+        return PrescreenResult(True, f"严重模糊(清晰度{sharpness:.1f})", "装饰")
+    if has_qr_code(gray):
+        return PrescreenResult(True, "包含二维码", "广告")
+    return PrescreenResult(reject=False)
@@ -0,0 +1,81 @@
+"""VLM 图片验证缓存 - 按图片内容哈希 + 上下文哈希持久化验证结果
+
+图片验证回答的是“这张图是否适合这段内容”，结果同时取决于图片和上下文（分论点 + 主题）。
+同一报告反复验证、重新生成章节时，图片和上下文都不变，直接复用上次的判断。
+键为 “内容哈希:上下文哈希:版本”，版本含 prompt 模板和模型，改 prompt 或换模型后自动失效。
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+from .cache_paths import get_cache_dir
+
+logger = logging.getLogger(__name__)
+
+
+def context_hash(context: str, topic: str = "") -> str:
+    """验证上下文（主题 + 内容）的哈希"""
+    return hashlib.sha1(f"{topic.strip()}\x00{context.strip()}".encode("utf-8")).hexdigest()[:12]
+
+
+class ImageValidationCache:
+    """VLM 图片验证结果持久化缓存（JSON 文件）"""
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path or get_cache_dir("vlm") / "image_validations.json"
+        # "内容哈希:上下文哈希:版本" -> ImageValidationResult 字段
+        self._data: dict[str, dict] = {}
+        self._dirty = False
+        if self.path.exists():
+            try:
+                self._data = json.loads(self.path.read_text(encoding="utf-8"))
+            except Exception as e:
+                logger.warning(f"[ImageValidationCache] 读取缓存失败: {e}")
+
+    def get(self, image_hash: str, ctx_hash: str, version: str) -> Optional[dict]:
+        """
+        读取验证结果
+
+        Args:
+            image_hash: 图片内容 SHA-256
+            ctx_hash: context_hash() 返回的上下文哈希
+            version: prompt 模板 + 模型版本
+
+        Returns:
+            验证结果字段，未命中返回 None
+        """
+        return self._data.get(f"{image_hash}:{ctx_hash}:{version}")
+
+    def put(self, image_hash: str, ctx_hash: str, version: str, result: dict) -> None:
+        self._data[f"{image_hash}:{ctx_hash}:{version}"] = result
+        self._dirty = True
+
+    def save(self) -> None:
+        """写回磁盘（先写临时文件再替换）"""
+        if not self._dirty:
+            return
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self._data, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# 全局单例
+_validation_cache: Optional[ImageValidationCache] = None
+
+
+def get_image_validation_cache() -> ImageValidationCache:
+    """获取 VLM 图片验证缓存单例"""
+    global _validation_cache
+    if _validation_cache is None:
+        _validation_cache = ImageValidationCache()
+    return _validation_cache
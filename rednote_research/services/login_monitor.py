@@ -0,0 +1,152 @@
+"""登录状态监控 - 缓存小红书登录状态并在后台定期刷新
+
+研究任务启动时直接读取缓存状态，无需每次同步请求 MCP 服务；
+登录过期由后台任务异步发现，并推送给订阅者（如设置页的 SSE 连接）。
+"""
+
+import asyncio
+import logging
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+# 缓存有效期（秒）
+DEFAULT_TTL = 60.0
+# 后台刷新间隔（秒），须小于 TTL，否则缓存在两次刷新之间过期，请求又退回同步检查
+DEFAULT_REFRESH_INTERVAL = 20.0
+
+
+class LoginStatusMonitor:
+    """
+    登录状态监控器
+
+    使用方法:
+        monitor = LoginStatusMonitor(mcp_client)
+        monitor.start()                      # 在 lifespan 中启动后台刷新
+        status = await monitor.get_status()  # TTL 内直接返回缓存
+        queue = monitor.subscribe()          # 订阅登录状态变化
+    """
+
+    def __init__(
+        self,
+        client,
+        ttl: float = DEFAULT_TTL,
+        refresh_interval: float = DEFAULT_REFRESH_INTERVAL
+    ):
+        """
+        Args:
+            client: 提供 check_login_status() 的 MCP 客户端
+            ttl: 缓存有效期（秒）
+            refresh_interval: 后台刷新间隔（秒），须小于 ttl；不满足时改为 ttl / 3
+        """
+        if refresh_interval >= ttl:
+            logger.warning(
+                f"[LoginStatusMonitor] 刷新间隔 {refresh_interval}s 不小于缓存有效期 {ttl}s，改为 {ttl / 3:.0f}s"
+            )
+            refresh_interval = ttl / 3
+        self.client = client
+        self.ttl = ttl
+        self.refresh_interval = refresh_interval
+        self._status: Optional[dict] = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._subscribers: set[asyncio.Queue] = set()
+
+    @property
+    def status(self) -> Optional[dict]:
+        """最近一次检查的状态（可能已过期，未检查过为 None）"""
+        return self._status
+
+    @property
+    def is_fresh(self) -> bool:
+        return self._status is not None and time.monotonic() - self._checked_at < self.ttl
+
+    async def get_status(self, force: bool = False) -> dict:
+        """
+        获取登录状态
+
+        Args:
+            force: 忽略缓存，立即检查
+
+        Returns:
+            {"is_logged_in": bool, "username": str, "checked_at": float, "error"?: str}
+        """
+        if not force and self.is_fresh:
+            return self._status
+        return await self.refresh(force=force)
+
+    async def refresh(self, force: bool = True) -> dict:
+        """检查登录状态并更新缓存，状态变化时通知订阅者"""
+        async with self._lock:
+            # 等锁期间其他调用可能已刷新
+            if not force and self.is_fresh:
+                return self._status
+
+            try:
+                result = await self.client.check_login_status()
+                status = {
+                    "is_logged_in": bool(result.get("is_logged_in")),
+                    "username": result.get("username", ""),
+                }
+            except Exception as e:
+                status = {"is_logged_in": False, "username": "", "error": str(e)}
+            status["checked_at"] = time.time()
+
+            previous = self._status
+            self._status = status
+            self._checked_at = time.monotonic()
+
+        if previous is None or previous["is_logged_in"] != status["is_logged_in"]:
+            if previous is not None:
+                logger.info(f"[LoginStatusMonitor] 登录状态变化: {previous['is_logged_in']} -> {status['is_logged_in']}")
+            self._publish(status)
+        return status
+
+    def invalidate(self) -> None:
+        """使缓存失效（如扫码登录后），下次读取时重新检查"""
+        self._checked_at = 0.0
+
+    # ==== 订阅 ====
+
+    def subscribe(self) -> asyncio.Queue:
+        """订阅状态变化，若已有状态会立即推送一次"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=16)
+        self._subscribers.add(queue)
+        if self._status is not None:
+            queue.put_nowait(self._status)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self._subscribers.discard(queue)
+
+    def _publish(self, status: dict) -> None:
+        for queue in list(self._subscribers):
+            if queue.full():
+                # 慢消费者只需要最新状态
+                queue.get_nowait()
+            queue.put_nowait(status)
+
+    # ==== 后台刷新 ====
+
+    def start(self) -> None:
+        """启动后台刷新任务"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """停止后台刷新任务"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.refresh_interval)
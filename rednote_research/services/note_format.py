@@ -0,0 +1,99 @@
+"""笔记的 prompt 序列化格式
+
+默认的 markdown 格式每篇笔记都重复 "### 笔记 i"、"- 作者:"、"- 点赞:" 等字段名，
+正文里还夹带大量表情、话题标签和空行。紧凑格式只输出一次表头，每篇笔记一行：
+
+    序号|标题|作者|赞|标签|图|内容
+    1|露营装备清单|小王|1.2w|露营,装备|3|帐篷睡袋防潮垫...
+
+节省效果可用 scripts/bench_prompt_format.py 在录制数据上测量。
+"""
+
+import re
+from typing import Optional
+
+from ..state import NoteData
+from .prompt_alias import PromptAliases
+
+
+NOTE_FORMATS = ("markdown", "compact")
+
+# 话题标签：#露营[话题]#
+_TOPIC_TAG = re.compile(r"#[^#\n]*?\[话题\]#")
+# 小红书表情：[笑哭R]、[赞R]
+_XHS_EMOTE = re.compile(r"\[[^\[\]\s]{1,6}R\]")
+# 常见 emoji / 符号区段、变体选择符、零宽字符
+_EMOJI = re.compile(
+    "["
+    "\U0001F000-\U0001FAFF"
+    "\u2600-\u27BF"
+    "\u2B00-\u2BFF"
+    "\uFE00-\uFE0F"
+    "\u200B-\u200D\u2060\uFEFF"
+    "]+"
+)
+_WHITESPACE = re.compile(r"\s+")
+
+COMPACT_HEADER = "序号|标题|作者|赞|标签|图|内容"
+
+
+def clean_text(text: str) -> str:
+    """去掉话题标签、表情和多余空白（换行折叠为空格）"""
+    text = _TOPIC_TAG.sub(" ", text or "")
+    text = _XHS_EMOTE.sub("", text)
+    text = _EMOJI.sub("", text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def format_count(value: int) -> str:
+    """紧凑计数：12345 -> 1.2w"""
+    if value >= 10000:
+        return f"{value / 10000:.1f}".rstrip("0").rstrip(".") + "w"
+    return str(value)
+
+
+def _field(text: str) -> str:
+    # 字段内不能出现分隔符
+    return clean_text(text).replace("|", "｜")
+
+
+def format_notes_compact(
+    notes: list[NoteData],
+    contents: Optional[list[str]] = None,
+    numbers: Optional[list[int]] = None,
+    include_images: bool = False,
+    aliases: Optional[PromptAliases] = None
+) -> str:
+    """
+    紧凑表格格式
+
+    Args:
+        notes: 笔记列表
+        contents: 与 notes 对应的正文（如预算选择后的原文/摘要），None 时使用笔记正文
+        numbers: 与 notes 对应的序号，None 时从 1 开始编号
+        include_images: 是否在行尾附加图片链接（以空格分隔）
+        aliases: 别名登记表，提供时图片链接写为 img_N
+
+    Returns:
+        表头 + 每篇笔记一行
+    """
+    header = COMPACT_HEADER + ("|图片链接" if include_images else "")
+    lines = [header]
+    for i, note in enumerate(notes):
+        detail, preview = note.detail, note.preview
+        number = numbers[i] if numbers else i + 1
+        content = contents[i] if contents is not None else (detail.content or preview.content_preview)
+        fields = [
+            str(number),
+            _field(detail.title or preview.title),
+            _field(detail.author or preview.author),
+            format_count(detail.likes or preview.likes),
+            _field(",".join(detail.tags)),
+            str(len(detail.images)),
+            _field(content),
+        ]
+        if include_images:
+            images = aliases.images(detail.images) if aliases is not None else detail.images
+            fields.append(" ".join(images))
+        lines.append("|".join(fields))
+    return "\n".join(lines)
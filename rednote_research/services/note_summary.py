@@ -0,0 +1,190 @@
+"""笔记摘要缓存 - 按笔记ID+内容哈希持久化摘要，并按 token 预算选择原文或摘要
+
+同一篇笔记的全文会在分析、大纲、章节写作三个 prompt 中重复发送，后续研究
+再次搜到同一笔记时还会再发送。摘要在分析阶段一次性生成（见 agents.summarizer），
+覆盖任一 prompt 超出预算时会被替换的笔记；各 prompt 构建时在预算内优先用原文，
+超出预算时长笔记改用摘要。缓存按最近使用顺序保留 MAX_CACHE_ENTRIES 条。
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+from ..state import NoteData
+from .cache_paths import get_cache_dir
+from .text_utils import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+
+# 预算不足以容纳摘要时，每篇笔记至少保留的 token 数
+MIN_NOTE_TOKENS = 60
+# 尚未生成的摘要的 token 估计（摘要 prompt 要求 60-120 字）
+ESTIMATED_SUMMARY_TOKENS = 120
+# 大纲 prompt 包含的笔记数（前 N 篇）
+OUTLINE_NOTE_COUNT = 15
+# 摘要缓存条数上限（超出时淘汰最久未使用的摘要）
+MAX_CACHE_ENTRIES = 5000
+
+
+def note_content(note: NoteData) -> str:
+    """笔记正文"""
+    return note.detail.content or note.preview.content_preview
+
+
+def summary_key(note: NoteData) -> str:
+    """缓存键：笔记ID + 标题正文哈希（笔记被编辑后自动失效）"""
+    title = note.detail.title or note.preview.title
+    digest = hashlib.sha1(f"{title}\x00{note_content(note)}".encode("utf-8")).hexdigest()[:16]
+    return f"{note.preview.id}:{digest}"
+
+
+class NoteSummaryCache:
+    """笔记摘要持久化缓存（JSON 文件，按最近使用顺序保存，超出上限淘汰最旧的）"""
+
+    def __init__(self, path: Optional[Path] = None, max_entries: int = MAX_CACHE_ENTRIES):
+        self.path = path or get_cache_dir("summaries") / "note_summaries.json"
+        self.max_entries = max(1, max_entries)
+        # 插入顺序即使用顺序：最久未使用的在前
+        self._data: dict[str, str] = {}
+        self._dirty = False
+        if self.path.exists():
+            try:
+                self._data = json.loads(self.path.read_text(encoding="utf-8"))
+            except Exception as e:
+                logger.warning(f"[NoteSummaryCache] 读取缓存失败: {e}")
+            self._evict()
+
+    def get(self, note: NoteData) -> Optional[str]:
+        key = summary_key(note)
+        summary = self._data.pop(key, None)
+        if summary is not None:
+            # 移到末尾（最近使用），下次保存时一并写回
+            self._data[key] = summary
+        return summary
+
+    def put(self, note: NoteData, summary: str) -> None:
+        key = summary_key(note)
+        self._data.pop(key, None)
+        self._data[key] = summary
+        self._evict()
+        self._dirty = True
+
+    def _evict(self) -> None:
+        """淘汰最久未使用的摘要，直到不超过上限"""
+        while len(self._data) > self.max_entries:
+            del self._data[next(iter(self._data))]
+            self._dirty = True
+
+    def save(self) -> None:
+        """写回磁盘（先写临时文件再替换，避免并发读到半个文件）"""
+        if not self._dirty:
+            return
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self._data, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def select_note_texts(notes: list[NoteData], summaries: dict[str, str], budget_tokens: int) -> list[str]:
+    """
+    在 token 预算内为每篇笔记选择原文或摘要
+
+    1. 全部原文放得下：使用原文
+    2. 否则从最长的笔记开始替换为摘要，直到放得下
+    3. 仍超出：按平均预算截断
+
+    Args:
+        notes: 笔记列表
+        summaries: {笔记ID: 摘要}
+        budget_tokens: 所有笔记内容的总 token 预算（<=0 表示不限）
+
+    Returns:
+        与 notes 一一对应的文本
+    """
+    texts = [note_content(note) for note in notes]
+    costs = [estimate_tokens(text) for text in texts]
+    total = sum(costs)
+    if budget_tokens <= 0 or total <= budget_tokens:
+        return texts
+
+    for i in sorted(range(len(notes)), key=lambda i: costs[i], reverse=True):
+        summary = summaries.get(notes[i].preview.id)
+        if not summary:
+            continue
+        summary_cost = estimate_tokens(summary)
+        if summary_cost < costs[i]:
+            total -= costs[i] - summary_cost
+            texts[i], costs[i] = summary, summary_cost
+            if total <= budget_tokens:
+                return texts
+
+    per_note = max(MIN_NOTE_TOKENS, budget_tokens // max(1, len(notes)))
+    for i, cost in enumerate(costs):
+        if cost > per_note:
+            # 中文约 1 字/token，按字符截断是保守估计
+            texts[i] = texts[i][:per_note] + "…"
+    return texts
+
+
+def notes_to_summarize(
+    notes: list[NoteData],
+    summaries: dict[str, str],
+    budget_tokens: int,
+    min_chars: int = 0
+) -> list[NoteData]:
+    """
+    按 select_note_texts 的替换顺序，找出需要生成摘要才能放进预算的笔记
+
+    全部原文放得下时不需要摘要；否则从最长的笔记开始，假设每篇替换为摘要
+    （已有摘要按实际长度，未生成的按 ESTIMATED_SUMMARY_TOKENS 估计），直到放得下。
+
+    Args:
+        notes: 将放入 prompt 的笔记
+        summaries: 已有摘要 {笔记ID: 摘要}
+        budget_tokens: 所有笔记内容的总 token 预算（<=0 表示不限）
+        min_chars: 正文短于该长度的笔记不摘要
+
+    Returns:
+        需要新生成摘要的笔记（不含已有摘要的笔记）
+    """
+    costs = [estimate_tokens(note_content(note)) for note in notes]
+    total = sum(costs)
+    if budget_tokens <= 0 or total <= budget_tokens:
+        return []
+
+    needed = []
+    for i in sorted(range(len(notes)), key=lambda i: costs[i], reverse=True):
+        note = notes[i]
+        if not note.preview.id or len(note_content(note)) < min_chars:
+            continue
+        summary = summaries.get(note.preview.id)
+        summary_cost = estimate_tokens(summary) if summary else ESTIMATED_SUMMARY_TOKENS
+        if summary_cost >= costs[i]:
+            continue
+        if not summary:
+            needed.append(note)
+        total -= costs[i] - summary_cost
+        if total <= budget_tokens:
+            break
+    return needed
+
+
+# 全局单例
+_summary_cache: Optional[NoteSummaryCache] = None
+
+
+def get_note_summary_cache() -> NoteSummaryCache:
+    """获取笔记摘要缓存单例"""
+    global _summary_cache
+    if _summary_cache is None:
+        _summary_cache = NoteSummaryCache()
+    return _summary_cache
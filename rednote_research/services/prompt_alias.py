@@ -0,0 +1,93 @@
+"""Prompt 短别名 - 用 img_12 / note_3 代替图片 URL 和笔记链接
+
+xhscdn 图片链接通常 150+ 字符（带签名和时间戳），写进 prompt 后模型还要逐字
+抄回 HTML，既费 token 又容易抄错导致图片失效。构建 prompt 时登记别名，
+生成结果再用 restore() 换回原始 URL：
+
+    aliases = PromptAliases()
+    prompt = f"可用图片: {aliases.image(url)}"        # -> img_1
+    html = aliases.restore(llm_output)                # src="img_1" -> src="https://..."
+"""
+
+import re
+from typing import Optional
+
+from ..state import NoteData
+
+
+# 只替换 src / href 属性值中的别名（正文里出现的 img_1 等文字原样保留）；
+# 模型偶尔会把占位符写成 {img_1} / [img_1]，编号后不能紧跟字母数字下划线（img_10 不是 img_1）
+_ATTR_HANDLE = re.compile(
+    r"""(?P<attr>\b(?:src|href)\s*=\s*)(?P<quote>["']?)\s*[{\[]?(?P<alias>(?:img|note)_\d+)(?![A-Za-z0-9_])[}\]]?\s*(?P=quote)"""
+)
+
+
+class PromptAliases:
+    """
+    单次生成内的别名登记表
+
+    同一 URL 多次登记得到同一别名；restore() 只替换 src / href 中登记过的别名，
+    未知编号（模型臆造的 img_99）和正文中的文字原样保留。
+    """
+
+    def __init__(self):
+        self._aliases: dict[tuple[str, str], str] = {}  # (前缀, 原值) -> 别名
+        self._targets: dict[str, str] = {}  # 别名 -> 原值
+        self._counters: dict[str, int] = {"img": 0, "note": 0}
+
+    def _register(self, prefix: str, value: str) -> str:
+        key = (prefix, value)
+        alias = self._aliases.get(key)
+        if alias is None:
+            self._counters[prefix] += 1
+            alias = f"{prefix}_{self._counters[prefix]}"
+            self._aliases[key] = alias
+            self._targets[alias] = value
+        return alias
+
+    def image(self, url: str) -> str:
+        """登记图片 URL，返回 img_N"""
+        return self._register("img", url) if url else url
+
+    def images(self, urls: list[str]) -> list[str]:
+        return [self.image(url) for url in urls]
+
+    def note(self, note: NoteData) -> Optional[str]:
+        """登记笔记链接，返回 note_N（笔记没有链接时返回 None）"""
+        url = note.detail.url or note.preview.url
+        return self._register("note", url) if url else None
+
+    def resolve(self, alias: str) -> Optional[str]:
+        return self._targets.get(alias)
+
+    def restore(self, text: str) -> str:
+        """把 src / href 属性中登记过的别名换回原始 URL"""
+        if not self._targets or not text:
+            return text
+
+        def replace(match: re.Match) -> str:
+            target = self._targets.get(match.group("alias"))
+            if target is None:
+                return match.group(0)
+            quote = match.group("quote") or '"'
+            return f"{match.group('attr')}{quote}{target}{quote}"
+
+        return _ATTR_HANDLE.sub(replace, text)
+
+    def __len__(self) -> int:
+        return len(self._targets)
+
+
+def parse_note_ref(value) -> Optional[int]:
+    """
+    解析大纲中的笔记引用：3、"3" 返回 3，无法解析返回 None
+
+    note_N 是别名（从 1 开始按登记顺序编号），与大纲的笔记下标（从 0 开始）不是
+    同一套编号，不能按数字直接换算，这里一律拒绝。
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    match = re.fullmatch(r"\s*(\d+)\s*", str(value))
+    return int(match.group(1)) if match else None
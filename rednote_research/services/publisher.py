@@ -11,11 +11,15 @@ import os
 import json
 import uuid
 import asyncio
+import hashlib
+import mimetypes
 from pathlib import Path
 from datetime import datetime
 from typing import Optional, Callable
 from pydantic import BaseModel
 
+from .image_downloader import get_image_downloader
+
 
 class PublishDraft(BaseModel):
     """发布草稿"""
@@ -258,7 +262,7 @@ class PublishService:
     
     # ===== 草稿管理 =====
     
-    def create_draft(
+    async def create_draft(
         self,
         topic: str,
         summary: str,
@@ -282,6 +286,16 @@ class PublishService:
         images_dir = os.path.join(draft_dir, "images")
         Path(images_dir).mkdir(parents=True, exist_ok=True)
         
+        # 笔记图片链接经共享下载器读取：先读图片缓存（分析阶段通常已下载过），未命中时下载并写入缓存
+        remote_urls = [
+            img for section in sections or [] for img in section.get("images") or []
+            if img.startswith(("http://", "https://"))
+        ]
+        downloaded = {}
+        if remote_urls:
+            images, _ = await get_image_downloader().fetch_many(list(dict.fromkeys(remote_urls)))
+            downloaded = {image.url: image for image in images if image}
+        
         # 提取并复制已有图片
         import shutil
         existing_images = []
@@ -290,6 +304,21 @@ class PublishService:
                 if section.get("images"):
                     for img_path in section["images"]:
                         try:
+                            # 笔记图片链接：写入下载结果
+                            if img_path.startswith(("http://", "https://")):
+                                image = downloaded.get(img_path)
+                                if image is None:
+                                    print(f"Fetch image failed: {img_path[:60]}")
+                                    continue
+                                content_type = image.content_type.split(";")[0].strip()
+                                ext = mimetypes.guess_extension(content_type) or ".jpg"
+                                digest = hashlib.sha256(image.data).hexdigest()[:16]
+                                dst_path = os.path.join(images_dir, f"{digest}{ext}")
+                                await asyncio.to_thread(Path(dst_path).write_bytes, image.data)
+                                if dst_path not in existing_images:
+                                    existing_images.append(dst_path)
+                                continue
+                            
                             # 处理源路径
                             src_path = img_path
                             # 如果是相对路径，尝试解析（假设相对于 output_base_dir 或项目根目录）
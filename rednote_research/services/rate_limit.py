@@ -0,0 +1,100 @@
+"""限流工具 - 令牌桶、VLM 全局限速器与字节预算
+
+VLM 接口（ModelScope 等）按账号限制请求速率，图片分析、图片验证等调用方
+共用同一个令牌桶：多个批次并发请求时，总速率仍受配置约束。
+
+字节预算限制同时在内存中的请求体积（如多个并行 VLM 批次的 base64 图片），
+大规模运行时内存峰值不随图片数量增长。
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from .settings import get_settings_service
+
+
+class TokenBucket:
+    """令牌桶限速器"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    @property
+    def wait_time(self) -> float:
+        """获取一个令牌需要等待的秒数（不消耗令牌）"""
+        if self.rate <= 0:
+            return 0.0
+        self._refill()
+        return max(0.0, (1 - self._tokens) / self.rate)
+
+    async def acquire(self) -> None:
+        """获取一个令牌（不足时等待）"""
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class ByteBudget:
+    """
+    异步字节预算：同时持有的字节数不超过上限
+
+    单次申请超过上限时，等其他持有者全部释放后单独放行（避免死锁）。
+
+    使用方法:
+        budget = ByteBudget(64 * 1024 * 1024)
+        async with budget.reserve(len(payload)):
+            ...
+    """
+
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self.used = 0
+        self.peak = 0
+        self._cond = asyncio.Condition()
+
+    @asynccontextmanager
+    async def reserve(self, size: int) -> AsyncIterator[None]:
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.used == 0 or self.used + size <= self.limit)
+            self.used += size
+            self.peak = max(self.peak, self.used)
+        try:
+            yield
+        finally:
+            async with self._cond:
+                self.used -= size
+                self._cond.notify_all()
+
+
+# 全局单例（按限速配置重建：设置页修改 rate_limit_mode / requests_per_minute 后立即生效）
+_vlm_limiter: Optional[TokenBucket] = None
+_vlm_limiter_key: Optional[tuple] = None
+
+
+def get_vlm_rate_limiter() -> TokenBucket:
+    """获取 VLM 请求限速器单例（rate_limit_mode 关闭时不限速）"""
+    global _vlm_limiter, _vlm_limiter_key
+    vlm = get_settings_service().load().vlm
+    key = (vlm.rate_limit_mode, vlm.requests_per_minute, vlm.max_inflight_batches)
+    if _vlm_limiter is None or key != _vlm_limiter_key:
+        rate = vlm.requests_per_minute / 60 if vlm.rate_limit_mode else 0
+        _vlm_limiter = TokenBucket(rate=rate, burst=max(1, vlm.max_inflight_batches))
+        _vlm_limiter_key = key
+    return _vlm_limiter
@@ -0,0 +1,114 @@
+"""本地相关性排序 - BM25（中文字符 bigram 分词）
+
+对笔记的标题、正文和标签按研究主题与分析维度打分，毫秒级完成排序、过滤和截断，
+只把拿不准的笔记交给 LLM 复核。
+"""
+
+import math
+from collections import Counter
+from dataclasses import dataclass
+
+from ..state import NoteData
+from .text_utils import char_ngrams
+
+
+# BM25 参数
+K1 = 1.5
+B = 0.75
+# 标题和标签比正文更能代表笔记主题，词频按倍数计入
+TITLE_WEIGHT = 3
+TAG_WEIGHT = 2
+
+# 归一化得分（相对最高分）阈值：低于 LOW 直接过滤，LOW-HIGH 之间为边界笔记
+LOW_THRESHOLD = 0.1
+HIGH_THRESHOLD = 0.3
+
+
+def note_terms(note: NoteData) -> list[str]:
+    """笔记的检索词（标题和标签加权）"""
+    title = note.detail.title or note.preview.title
+    terms = char_ngrams(title) * TITLE_WEIGHT
+    terms += char_ngrams(" ".join(note.detail.tags)) * TAG_WEIGHT
+    terms += char_ngrams(note.detail.content or note.preview.content_preview)
+    return terms
+
+
+class BM25Index:
+    """BM25 倒排统计"""
+
+    def __init__(self, documents: list[list[str]]):
+        self.term_freqs = [Counter(doc) for doc in documents]
+        self.lengths = [len(doc) for doc in documents]
+        self.avg_length = sum(self.lengths) / len(documents) if documents else 0.0
+        doc_freq: Counter = Counter()
+        for tf in self.term_freqs:
+            doc_freq.update(tf.keys())
+        n = len(documents)
+        self.idf = {
+            term: math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for term, df in doc_freq.items()
+        }
+
+    def score(self, query_terms: set[str]) -> list[float]:
+        """计算每篇文档对查询的 BM25 得分"""
+        scores = []
+        for tf, length in zip(self.term_freqs, self.lengths):
+            norm = K1 * (1 - B + B * length / self.avg_length) if self.avg_length else K1
+            score = 0.0
+            for term in query_terms:
+                freq = tf.get(term)
+                if freq:
+                    score += self.idf[term] * freq * (K1 + 1) / (freq + norm)
+            scores.append(score)
+        return scores
+
+
+@dataclass
+class ScoredNote:
+    """带相关性得分的笔记"""
+    note: NoteData
+    score: float  # 原始 BM25 得分
+    relevance: float  # 相对最高分的归一化得分（0-1）
+
+
+def rank_notes(notes: list[NoteData], queries: list[str]) -> list[ScoredNote]:
+    """
+    按相关性对笔记排序
+
+    Args:
+        notes: 笔记列表
+        queries: 查询文本（研究主题、分析维度等），合并为一个词集
+
+    Returns:
+        按得分降序的 ScoredNote 列表；所有笔记都不命中时 relevance 全为 1
+    """
+    if not notes:
+        return []
+
+    query_terms = {term for query in queries for term in char_ngrams(query)}
+    scores = BM25Index([note_terms(note) for note in notes]).score(query_terms)
+    top = max(scores)
+
+    ranked = [
+        ScoredNote(note=note, score=score, relevance=score / top if top > 0 else 1.0)
+        for note, score in zip(notes, scores)
+    ]
+    ranked.sort(key=lambda item: item.score, reverse=True)
+    return ranked
+
+
+def split_by_relevance(
+    ranked: list[ScoredNote],
+    low: float = LOW_THRESHOLD,
+    high: float = HIGH_THRESHOLD
+) -> tuple[list[ScoredNote], list[ScoredNote], list[ScoredNote]]:
+    """
+    按归一化得分分为三组
+
+    Returns:
+        (相关, 边界, 不相关)
+    """
+    relevant = [item for item in ranked if item.relevance >= high]
+    borderline = [item for item in ranked if low <= item.relevance < high]
+    irrelevant = [item for item in ranked if item.relevance < low]
+    return relevant, borderline, irrelevant
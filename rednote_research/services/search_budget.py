@@ -0,0 +1,256 @@
+"""自适应搜索预算分配 - 按关键词的边际收益分配详情获取次数
+
+思路：
+1. 每个关键词先获取一小批详情（首批 tranche）
+2. 度量新颖度：未见过的笔记ID占比 × 已获取内容与语料的差异度
+3. 剩余预算按轮次分配给边际收益最高的关键词
+
+同样的详情获取总量，可以换来更多互不重复、信息量更大的笔记。
+"""
+
+import math
+from dataclasses import dataclass, field
+from typing import Iterable, Optional
+
+from ..state import NoteData, NotePreview
+from .text_utils import char_ngrams, jaccard
+
+
+# 尚未获取任何详情时的内容新颖度先验
+CONTENT_NOVELTY_PRIOR = 0.5
+# 同一轮内重复选中同一关键词时的收益衰减，避免一轮全部押在一个关键词上
+ROUND_DECAY = 0.8
+
+
+@dataclass
+class KeywordBudget:
+    """单个关键词的预算状态"""
+    keyword: str
+    previews: list[NotePreview] = field(default_factory=list)  # 待获取的预览（按点赞降序）
+    total_previews: int = 0
+    fetched: int = 0
+    novelty_scores: list[float] = field(default_factory=list)
+
+    @property
+    def content_novelty(self) -> float:
+        """已获取笔记的平均内容新颖度"""
+        if not self.novelty_scores:
+            return CONTENT_NOVELTY_PRIOR
+        return sum(self.novelty_scores) / len(self.novelty_scores)
+
+
+class AdaptiveBudgetAllocator:
+    """
+    自适应预算分配器
+
+    使用方法:
+        allocator = AdaptiveBudgetAllocator(total_budget=10, tranche=1, known_notes=state.documents)
+        allocator.add_keyword("露营装备", previews)
+        for keyword, preview in allocator.first_tranche():
+            allocator.record(keyword, await fetch(preview))
+        while batch := allocator.next_round(3):
+            ...
+    """
+
+    def __init__(
+        self,
+        total_budget: int,
+        tranche: int = 1,
+        known_notes: Optional[Iterable[NoteData]] = None
+    ):
+        self.total_budget = max(0, total_budget)
+        self.tranche = max(1, tranche)
+        self.spent = 0
+        self._keywords: dict[str, KeywordBudget] = {}
+        self._claimed_ids: set[str] = set()
+        self._corpus: list[set[str]] = []
+
+        for note in known_notes or []:
+            if note.preview.id:
+                self._claimed_ids.add(note.preview.id)
+            self._add_to_corpus(note)
+
+    @property
+    def remaining(self) -> int:
+        return self.total_budget - self.spent
+
+    def add_keyword(self, keyword: str, previews: list[NotePreview]) -> None:
+        """注册关键词的搜索结果"""
+        ordered = sorted(previews, key=lambda p: p.likes, reverse=True)
+        self._keywords[keyword] = KeywordBudget(
+            keyword=keyword,
+            previews=ordered,
+            total_previews=len(ordered)
+        )
+
+    def id_novelty(self, keyword: str) -> float:
+        """该关键词剩余预览中未被认领的比例"""
+        budget = self._keywords[keyword]
+        if not budget.total_previews:
+            return 0.0
+        unseen = sum(1 for p in budget.previews if p.id not in self._claimed_ids)
+        return unseen / budget.total_previews
+
+    def marginal_yield(self, keyword: str) -> float:
+        """关键词的边际收益估计"""
+        return self.id_novelty(keyword) * self._keywords[keyword].content_novelty
+
+    def first_tranche(self) -> list[tuple[str, NotePreview]]:
+        """首批：每个关键词取前 tranche 篇未见过的笔记"""
+        allocations = []
+        for keyword in self._keywords:
+            for _ in range(self.tranche):
+                if self.remaining <= 0:
+                    return allocations
+                preview = self._claim_next(keyword)
+                if preview is None:
+                    break
+                allocations.append((keyword, preview))
+        return allocations
+
+    def next_round(self, size: int) -> list[tuple[str, NotePreview]]:
+        """按边际收益分配下一轮（最多 size 篇）"""
+        allocations = []
+        penalties: dict[str, float] = {}
+
+        while len(allocations) < size and self.remaining > 0:
+            candidates = [
+                (self.marginal_yield(kw) * penalties.get(kw, 1.0), kw)
+                for kw in self._keywords
+                if self.id_novelty(kw) > 0
+            ]
+            if not candidates:
+                break
+            _, keyword = max(candidates)
+            preview = self._claim_next(keyword)
+            if preview is None:
+                continue
+            allocations.append((keyword, preview))
+            penalties[keyword] = penalties.get(keyword, 1.0) * ROUND_DECAY
+
+        return allocations
+
+    def record(self, keyword: str, note: NoteData) -> float:
+        """
+        记录一次详情获取结果，更新关键词的内容新颖度
+
+        Returns:
+            该笔记的内容新颖度（0-1，1 表示与已有语料完全不同）
+        """
+        grams = self._note_grams(note)
+        if not grams:
+            novelty = 0.0
+        elif not self._corpus:
+            novelty = 1.0
+        else:
+            novelty = 1.0 - max(jaccard(grams, other) for other in self._corpus)
+
+        self._keywords[keyword].novelty_scores.append(novelty)
+        if grams:
+            self._corpus.append(grams)
+        return novelty
+
+    def summary(self) -> dict[str, dict]:
+        """各关键词的分配统计"""
+        return {
+            kw: {
+                "fetched": b.fetched,
+                "previews": b.total_previews,
+                "content_novelty": round(b.content_novelty, 2),
+                "id_novelty": round(self.id_novelty(kw), 2),
+            }
+            for kw, b in self._keywords.items()
+        }
+
+    def _claim_next(self, keyword: str) -> Optional[NotePreview]:
+        budget = self._keywords[keyword]
+        while budget.previews:
+            preview = budget.previews.pop(0)
+            if preview.id in self._claimed_ids:
+                continue
+            self._claimed_ids.add(preview.id)
+            budget.fetched += 1
+            self.spent += 1
+            return preview
+        return None
+
+    def _add_to_corpus(self, note: NoteData) -> None:
+        grams = self._note_grams(note)
+        if grams:
+            self._corpus.append(grams)
+
+    @staticmethod
+    def _note_grams(note: NoteData) -> set[str]:
+        text = f"{note.detail.title or note.preview.title} {note.detail.content}"
+        return set(char_ngrams(text, 2))
+
+
+# 全局排序权重
+LIKES_WEIGHT = 0.6
+COVERAGE_WEIGHT = 0.25
+RANK_WEIGHT = 0.15
+
+
+@dataclass
+class RankedPreview:
+    """全局排序后的预览"""
+    preview: NotePreview
+    score: float
+    keywords: list[str]
+
+
+def rank_previews_globally(
+    preview_lists: dict[str, list[NotePreview]],
+    known_ids: Optional[set[str]] = None
+) -> list[RankedPreview]:
+    """
+    对所有关键词的预览做全局排序（去重）
+
+    评分由三部分组成：
+    - 点赞数（对数归一化）
+    - 关键词覆盖度：被越多关键词搜到的笔记越可能切中主题
+    - 搜索排名：平台返回顺序本身反映了相关性
+
+    Args:
+        preview_lists: {关键词: 预览列表（保持搜索返回顺序）}
+        known_ids: 已收集过的笔记ID（直接排除）
+
+    Returns:
+        按得分降序的 RankedPreview 列表
+    """
+    known_ids = known_ids or set()
+    merged: dict[str, RankedPreview] = {}
+    best_rank: dict[str, int] = {}
+
+    for keyword, previews in preview_lists.items():
+        for rank, preview in enumerate(previews):
+            if not preview.id or preview.id in known_ids:
+                continue
+            if preview.id not in merged:
+                merged[preview.id] = RankedPreview(preview=preview, score=0.0, keywords=[])
+                best_rank[preview.id] = rank
+            item = merged[preview.id]
+            if keyword not in item.keywords:
+                item.keywords.append(keyword)
+            best_rank[preview.id] = min(best_rank[preview.id], rank)
+            # 不同关键词返回的点赞数可能不同步，取较大值
+            if preview.likes > item.preview.likes:
+                item.preview = preview
+
+    if not merged:
+        return []
+
+    max_log_likes = max(math.log1p(item.preview.likes) for item in merged.values()) or 1.0
+    keyword_span = max(1, len(preview_lists) - 1)
+
+    for feed_id, item in merged.items():
+        likes_score = math.log1p(item.preview.likes) / max_log_likes
+        coverage_score = (len(item.keywords) - 1) / keyword_span
+        rank_score = 1.0 / (1 + best_rank[feed_id])
+        item.score = (
+            LIKES_WEIGHT * likes_score
+            + COVERAGE_WEIGHT * coverage_score
+            + RANK_WEIGHT * rank_score
+        )
+
+    return sorted(merged.values(), key=lambda item: item.score, reverse=True)
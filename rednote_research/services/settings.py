@@ -1,9 +1,15 @@
 """设置服务 - 管理用户配置的持久化"""
 
 import json
+import logging
 from pathlib import Path
-from typing import Optional
-from pydantic import BaseModel
+from typing import Literal, Optional
+from pydantic import BaseModel, ValidationError
+
+logger = logging.getLogger(__name__)
+
+# 搜索模式（拼写错误在加载配置时报错，而不是静默回退到 per_keyword）
+SearchMode = Literal["per_keyword", "adaptive", "global_topk", "stream"]
 
 
 class LLMSettings(BaseModel):
@@ -32,7 +38,32 @@ class VLMSettings(BaseModel):
     max_tokens: int = 8192  # VLM模型限制最大8192
     repetition_penalty: float = 1.1  # 防止词汇卡死
     # 速率限制模式
-    rate_limit_mode: bool = True  # True=串行延迟(稳定), False=快速并行
+    rate_limit_mode: bool = True  # True=按 requests_per_minute 限速(稳定), False=不限速
+    requests_per_minute: int = 20  # rate_limit_mode 下所有 VLM 请求共享的速率上限
+    max_inflight_batches: int = 3  # 同时进行中的 VLM 批次数（下载/预处理与 VLM 调用流水线重叠）
+    # 图片验证（ImageValidator）：多图一次请求，多个请求并发
+    validate_batch_size: int = 5  # 单次验证请求的图片数
+    validate_concurrency: int = 3  # 同时进行中的验证请求数
+    # 自适应批次：按请求体积和图片 token 组批，超时/413/429/解析不完整时减半，延迟低于目标时 +1
+    adaptive_batching: bool = True
+    batch_max_images: int = 20  # 单批图片数上限
+    batch_max_payload_mb: float = 8.0  # 单批请求体积上限（base64 后）
+    batch_max_image_tokens: int = 16000  # 单批图片 token 上限（按 28px 块估算）
+    batch_target_latency: float = 45.0  # 目标单批延迟（秒）
+    # 图片下载（共享连接池）
+    download_concurrency: int = 16  # 全局并发下载数
+    download_per_host: int = 6  # 单个 CDN 域名并发下载数
+    analysis_cache: bool = True  # 按图片内容哈希缓存 VLM 分析/验证结果（改 prompt 或换模型自动失效）
+    image_dedup: bool = True  # 感知哈希合并近似重复图片（转发、不同尺寸/压缩），每组只分析一张
+    prescreen: bool = True  # 本地预筛（尺寸/长宽比/纯色/模糊/二维码），明显不可用的图片不送入 VLM
+    # 送入 VLM 前的图片预处理（缩放 + 去元数据 + 重新编码）
+    image_max_side: int = 1024  # 最长边上限（像素），0=发送原图
+    image_quality: int = 80  # 重新编码质量
+    image_format: str = "JPEG"  # JPEG / WEBP
+    preprocess_workers: int = 4  # 解码/编码线程数
+    # 大规模运行的内存上限：预处理结果落盘到图片缓存，只在调用 VLM 时读回
+    spill_to_disk: bool = True
+    inflight_payload_mb: float = 64.0  # 并行 VLM 批次在内存中的请求体积（base64）上限
 
 
 class ImageGenSettings(BaseModel):
@@ -55,12 +86,37 @@ class SearchSettings(BaseModel):
     """搜索配置"""
     notes_per_keyword: int = 1  # 每个关键词搜索的笔记数量（默认1，可调高）
     concurrency: int = 3  # 搜索并发数（建议3-5，过高易触发风控）
+    # 搜索模式: per_keyword=每个关键词固定获取 notes_per_keyword 篇详情
+    #          adaptive=总预算不变，按关键词新颖度动态分配详情获取次数
+    #          global_topk=先并行搜索全部关键词，再全局排序只获取前K篇详情
+    #          stream=关键词搜索完成即去重并获取详情，不等待其余关键词
+    mode: SearchMode = "per_keyword"
+    adaptive_tranche: int = 1  # adaptive 模式下每个关键词首批获取的详情数
+    detail_budget: int = 0  # adaptive/global_topk 的详情总预算（0=notes_per_keyword×关键词数）
+    dedup: bool = True  # 获取详情后合并近似重复的笔记（搬运/模板笔记）
+    relevance_filter: bool = False  # 本地 BM25 相关性排序并过滤明显无关的笔记（开启后笔记按相关性重排，需手动开启）
+    relevance_llm: bool = False  # 对边界笔记再用 LLM 复核
+    max_notes: int = 0  # 进入分析的笔记数上限（relevance_filter 开启时按相关性截断，0=不限）
+
+
+class PromptSettings(BaseModel):
+    """Prompt 预算配置"""
+    summarize_notes: bool = True  # 笔记全文超出分析/大纲/章节任一预算时，为将被替换的长笔记生成摘要（按笔记ID+内容哈希缓存，跨研究复用）
+    summary_min_chars: int = 300  # 正文短于该长度的笔记不生成摘要，直接使用原文
+    analyzer_note_budget: int = 24000  # 分析阶段笔记内容的 token 预算，超出时长笔记改用摘要
+    outline_note_budget: int = 3000  # 大纲阶段笔记内容的 token 预算
+    section_note_budget: int = 3000  # 单章节引用笔记的 token 预算
+    note_format: str = "markdown"  # 笔记序列化格式: markdown=逐字段块, compact=表头+每篇一行
+    url_aliases: bool = True  # HTML 生成 prompt 中用 img_N / note_N 代替图片和笔记链接，生成后还原
+    incremental_analysis: bool = True  # 反思补充搜索后只分析新增笔记（基于上一轮洞察更新）
+    incremental_max_delta: float = 0.5  # 新增笔记占比超过该值时仍做全量分析
 
 
 class Settings(BaseModel):
     """用户配置"""
     llm: LLMSettings = LLMSettings()
     search: SearchSettings = SearchSettings()
+    prompt: PromptSettings = PromptSettings()
     vlm: VLMSettings = VLMSettings()
     imageGen: ImageGenSettings = ImageGenSettings()
 
@@ -89,8 +145,8 @@ class SettingsService:
                     # 这里简单起见，利用 Pydantic 的自动转换
                     # 注意：如果文件结构不完整，Pydantic 会用默认值补全
                     settings = Settings(**file_data)
-            except (json.JSONDecodeError, Exception):
-                pass
+            except (json.JSONDecodeError, Exception) as e:
+                logger.error(f"[SettingsService] 配置文件无效，使用默认配置: {e}")
         
         # 3. 环境变量覆盖 (Docker 部署的核心逻辑)
         # LLM
@@ -133,6 +189,24 @@ class SettingsService:
                 settings.search.concurrency = int(env_concurrency)
             except ValueError:
                 pass
+        
+        if env_search_mode := os.getenv("SEARCH_MODE"):
+            try:
+                settings.search = SearchSettings(**{**settings.search.model_dump(), "mode": env_search_mode})
+            except ValidationError as e:
+                logger.error(f"[SettingsService] SEARCH_MODE={env_search_mode!r} 无效，已忽略: {e}")
+        
+        if env_detail_budget := os.getenv("SEARCH_DETAIL_BUDGET"):
+            try:
+                settings.search.detail_budget = int(env_detail_budget)
+            except ValueError:
+                pass
+        
+        if env_max_notes := os.getenv("SEARCH_MAX_NOTES"):
+            try:
+                settings.search.max_notes = int(env_max_notes)
+            except ValueError:
+                pass
              
         return settings
     
@@ -172,7 +246,11 @@ class SettingsService:
             },
             "search": {
                 "notesPerKeyword": settings.search.notes_per_keyword,
-                "concurrency": settings.search.concurrency
+                "concurrency": settings.search.concurrency,
+                "mode": settings.search.mode,
+                "detailBudget": settings.search.detail_budget,
+                "relevanceFilter": settings.search.relevance_filter,
+                "maxNotes": settings.search.max_notes
             }
         }
 
@@ -0,0 +1,53 @@
+"""文本工具 - 面向中文笔记的轻量分词与相似度计算
+
+小红书笔记以中文为主、夹杂英文和表情，直接按空格分词效果很差。
+这里统一使用字符 n-gram，既不依赖分词库，也能稳定度量文本相似度。
+"""
+
+import re
+
+# 保留中文、英文、数字，其余（标点、表情、空白）视为分隔
+_WORD_CHARS = re.compile(r"[一-龥a-zA-Z0-9]+")
+
+
+def normalize_text(text: str) -> str:
+    """归一化文本：小写并只保留中英文和数字片段（以空格连接）"""
+    return " ".join(_WORD_CHARS.findall((text or "").lower()))
+
+
+def char_ngrams(text: str, n: int = 2) -> list[str]:
+    """
+    提取字符 n-gram（不跨越片段边界）
+
+    长度不足 n 的片段整体作为一个 gram，保证短词（如 "咖啡"、"ai"）不丢失。
+    """
+    grams = []
+    for segment in _WORD_CHARS.findall((text or "").lower()):
+        if len(segment) <= n:
+            grams.append(segment)
+        else:
+            grams.extend(segment[i:i + n] for i in range(len(segment) - n + 1))
+    return grams
+
+
+def jaccard(a: set, b: set) -> float:
+    """Jaccard 相似度"""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+_CJK_CHAR = re.compile(r"[一-龥]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    粗略估算文本的 token 数（无需加载分词器）
+
+    中文字符按 1 token/字，其余非空白字符按 4 字符/token。
+    """
+    if not text:
+        return 0
+    cjk = len(_CJK_CHAR.findall(text))
+    other = len(re.sub(r"\s", "", text)) - cjk
+    return cjk + (other + 3) // 4
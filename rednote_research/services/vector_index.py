@@ -0,0 +1,189 @@
+"""笔记向量索引 - 哈希字符 n-gram TF-IDF，纯 CPU / NumPy 实现
+
+分析、大纲 source_notes、图文匹配、历史对比等环节都需要语义相似度。
+这里不依赖 GPU 和嵌入模型：
+
+- 字符 2/3-gram 经哈希映射到固定维度（无需词表，适合中文）
+- 子线性 TF × IDF 加权后 L2 归一化，存为 float32 矩阵
+- 查询批量化：一次矩阵乘法得到所有查询的余弦相似度，再 argpartition 取 top-k
+- 每次研究只构建一次（缓存在 ResearchState 上），可选按语料哈希持久化为 .npz
+"""
+
+import hashlib
+import logging
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from ..state import NoteData, ResearchState
+from .cache_paths import get_cache_dir
+from .text_utils import char_ngrams
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_DIM = 1 << 13
+NGRAM_SIZES = (2, 3)
+
+
+def _bucket(term: str, dim: int) -> int:
+    # 内置 hash() 受 PYTHONHASHSEED 影响，持久化的向量需要跨进程稳定
+    return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "big") % dim
+
+
+def note_document(note: NoteData) -> str:
+    """参与索引的笔记文本"""
+    title = note.detail.title or note.preview.title
+    content = note.detail.content or note.preview.content_preview
+    return f"{title} {title} {' '.join(note.detail.tags)} {content}"
+
+
+class HashedTfidfVectorizer:
+    """哈希字符 n-gram TF-IDF 向量化器"""
+
+    def __init__(self, dim: int = DEFAULT_DIM, ngram_sizes: tuple[int, ...] = NGRAM_SIZES):
+        self.dim = dim
+        self.ngram_sizes = ngram_sizes
+        self.idf: Optional[np.ndarray] = None
+
+    def _term_counts(self, texts: list[str]) -> np.ndarray:
+        counts = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            buckets = [_bucket(term, self.dim) for n in self.ngram_sizes for term in char_ngrams(text, n)]
+            if buckets:
+                counts[row] = np.bincount(buckets, minlength=self.dim)
+        return counts
+
+    def fit_transform(self, texts: list[str]) -> np.ndarray:
+        counts = self._term_counts(texts)
+        doc_freq = np.count_nonzero(counts, axis=0)
+        self.idf = (np.log((1 + len(texts)) / (1 + doc_freq)) + 1).astype(np.float32)
+        return self._weight(counts)
+
+    def transform(self, texts: list[str]) -> np.ndarray:
+        if self.idf is None:
+            raise RuntimeError("向量化器尚未 fit")
+        return self._weight(self._term_counts(texts))
+
+    def _weight(self, counts: np.ndarray) -> np.ndarray:
+        # 子线性 TF：log(1 + tf)，避免长文本被高频词主导
+        vectors = np.log1p(counts) * self.idf
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+
+class NoteVectorIndex:
+    """
+    笔记向量索引
+
+    使用方法:
+        index = get_note_index(state)
+        hits = index.search(["露营装备预算"], k=3)[0]   # [(笔记下标, 相似度), ...]
+        sims = index.similarity(["章节A", "章节B"])       # (2, 笔记数) 相似度矩阵
+    """
+
+    def __init__(self, vectorizer: HashedTfidfVectorizer, matrix: np.ndarray, note_ids: list[str]):
+        self.vectorizer = vectorizer
+        self.matrix = matrix
+        self.note_ids = note_ids
+
+    @classmethod
+    def build(cls, notes: list[NoteData], dim: int = DEFAULT_DIM, use_cache: bool = False) -> "NoteVectorIndex":
+        """
+        构建索引
+
+        Args:
+            notes: 笔记列表（索引下标与列表下标一致）
+            dim: 哈希维度
+            use_cache: 是否按语料哈希读写 .npz 缓存
+        """
+        texts = [note_document(note) for note in notes]
+        note_ids = [note.preview.id for note in notes]
+        cache_path = cls._cache_path(texts, dim) if use_cache else None
+
+        if cache_path is not None and cache_path.exists():
+            try:
+                with np.load(cache_path) as data:
+                    vectorizer = HashedTfidfVectorizer(dim=dim)
+                    vectorizer.idf = data["idf"]
+                    return cls(vectorizer, data["matrix"], note_ids)
+            except Exception as e:
+                logger.warning(f"[NoteVectorIndex] 读取缓存失败，重新构建: {e}")
+
+        vectorizer = HashedTfidfVectorizer(dim=dim)
+        matrix = vectorizer.fit_transform(texts) if texts else np.zeros((0, dim), dtype=np.float32)
+        if cache_path is not None and texts:
+            np.savez_compressed(cache_path, matrix=matrix, idf=vectorizer.idf)
+        return cls(vectorizer, matrix, note_ids)
+
+    @staticmethod
+    def _cache_path(texts: list[str], dim: int) -> Path:
+        digest = hashlib.sha1(f"{dim}\x00".encode("utf-8"))
+        for text in texts:
+            digest.update(text.encode("utf-8"))
+            digest.update(b"\x00")
+        return get_cache_dir("vectors") / f"{digest.hexdigest()}.npz"
+
+    def __len__(self) -> int:
+        return self.matrix.shape[0]
+
+    def similarity(self, queries: list[str]) -> np.ndarray:
+        """批量计算查询与所有笔记的余弦相似度，返回 (查询数, 笔记数) 矩阵"""
+        if not len(self) or not queries:
+            return np.zeros((len(queries), len(self)), dtype=np.float32)
+        return self.vectorizer.transform(queries) @ self.matrix.T
+
+    def search(
+        self,
+        queries: list[str],
+        k: int = 5,
+        exclude: Optional[set[int]] = None,
+        min_score: float = 0.0
+    ) -> list[list[tuple[int, float]]]:
+        """
+        批量 top-k 检索
+
+        Args:
+            queries: 查询文本列表
+            k: 每个查询返回的结果数
+            exclude: 需要排除的笔记下标
+            min_score: 最低相似度
+
+        Returns:
+            每个查询的 [(笔记下标, 相似度), ...]，按相似度降序
+        """
+        sims = self.similarity(queries)
+        if exclude:
+            sims[:, sorted(exclude)] = -1.0
+        k = min(k, len(self))
+        if k <= 0:
+            return [[] for _ in queries]
+
+        top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        results = []
+        for row, candidates in enumerate(top):
+            ordered = candidates[np.argsort(-sims[row, candidates])]
+            results.append([
+                (int(i), float(sims[row, i]))
+                for i in ordered
+                if sims[row, i] > min_score
+            ])
+        return results
+
+    def pairwise(self) -> np.ndarray:
+        """笔记之间的相似度矩阵（用于聚类）"""
+        return self.matrix @ self.matrix.T
+
+
+def get_note_index(state: ResearchState, use_cache: bool = False) -> NoteVectorIndex:
+    """
+    获取当前研究的笔记索引（笔记列表不变时复用，每次研究只构建一次）
+    """
+    index = state._note_index
+    ids = [note.preview.id for note in state.documents]
+    if index is None or index.note_ids != ids:
+        index = NoteVectorIndex.build(state.documents, use_cache=use_cache)
+        state._note_index = index
+    return index
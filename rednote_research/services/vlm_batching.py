@@ -0,0 +1,221 @@
+"""VLM 自适应批次 - 按请求体积和图片 token 组批，按接口表现调整批次大小
+
+固定批次大小（ImageAnalyzer 10 张、ImageProcessor 20 张）不考虑图片大小和接口状态：
+大图批次容易 413/超时，输出过长时 JSON 被截断；接口空闲时小批次又浪费调用次数。
+
+- 组批：按数量上限、请求体积上限（base64 字节）和图片 token 上限三者取最先达到的
+- 调整（AIMD）：延迟低于目标时批次 +1；超时、413、429、解析不完整时批次减半；
+  延迟超过目标时 -1
+- 每次运行记录各批次的大小、体积、延迟和结果，按批次大小汇总吞吐量曲线
+"""
+
+import asyncio
+import io
+import logging
+import math
+from dataclasses import dataclass, field
+from typing import Callable, Optional, Sequence, TypeVar
+
+from PIL import Image
+
+from .settings import VLMSettings, get_settings_service
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Qwen-VL 系列按 28×28 像素块计 token
+PATCH_SIZE = 28
+# 无法读取尺寸（只有 URL）时的单图 token 估计
+DEFAULT_IMAGE_TOKENS = 1280
+
+
+def estimate_image_tokens(data: Optional[bytes]) -> int:
+    """按图片尺寸估算 VLM 图片 token（只读文件头，不解码像素）"""
+    if not data:
+        return DEFAULT_IMAGE_TOKENS
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            width, height = img.size
+    except Exception:
+        return DEFAULT_IMAGE_TOKENS
+    return math.ceil(width / PATCH_SIZE) * math.ceil(height / PATCH_SIZE) + 2
+
+
+def classify_vlm_error(error: BaseException) -> Optional[str]:
+    """
+    识别需要缩小批次的错误
+
+    Returns:
+        "timeout" / "413" / "429"，其他错误返回 None
+    """
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError)):
+        return "timeout"
+    text = f"{type(error).__name__} {error}".lower()
+    if "429" in text or "rate limit" in text:
+        return "429"
+    if "413" in text or "too large" in text or "too long" in text:
+        return "413"
+    if "timeout" in text or "timed out" in text:
+        return "timeout"
+    return None
+
+
+@dataclass
+class BatchRecord:
+    """单个批次的执行记录"""
+    size: int
+    payload_bytes: int
+    image_tokens: int
+    latency: float = 0.0
+    outcome: str = "ok"  # ok / timeout / 413 / 429 / parse
+
+
+@dataclass
+class BatchSizeStats:
+    """一次运行的批次统计"""
+    records: list[BatchRecord] = field(default_factory=list)
+    grown: int = 0
+    shrunk: int = 0
+
+    def throughput_curve(self) -> dict[int, tuple[int, float, float]]:
+        """按批次大小汇总成功批次：{大小: (批次数, 平均延迟, 张/秒)}"""
+        curve: dict[int, tuple[int, float, float]] = {}
+        for size in sorted({r.size for r in self.records if r.outcome == "ok"}):
+            latencies = [r.latency for r in self.records if r.outcome == "ok" and r.size == size]
+            avg = sum(latencies) / len(latencies)
+            curve[size] = (len(latencies), avg, size / avg if avg > 0 else 0.0)
+        return curve
+
+    def summary(self) -> str:
+        if not self.records:
+            return "无批次"
+        sizes = [r.size for r in self.records]
+        failures: dict[str, int] = {}
+        for r in self.records:
+            if r.outcome != "ok":
+                failures[r.outcome] = failures.get(r.outcome, 0) + 1
+        curve = ", ".join(
+            f"{size}张×{count}批 {latency:.1f}s ({rate:.2f}张/s)"
+            for size, (count, latency, rate) in self.throughput_curve().items()
+        )
+        text = (
+            f"{len(sizes)} 批 | 大小 {min(sizes)}-{max(sizes)} (平均 {sum(sizes) / len(sizes):.1f}) | "
+            f"扩大 {self.grown} 次，缩小 {self.shrunk} 次"
+        )
+        if failures:
+            text += " | 失败 " + ", ".join(f"{k}×{v}" for k, v in failures.items())
+        return text + (f" | {curve}" if curve else "")
+
+
+class AdaptiveBatcher:
+    """
+    自适应批次大小控制器
+
+    使用方法:
+        batcher = AdaptiveBatcher(initial_size=10)
+        batch, rest = batcher.take(items, cost)      # cost(item) -> (请求字节, 图片token)
+        record = batcher.start(batch, cost)
+        ...调用VLM...
+        batcher.succeeded(record, latency) / batcher.failed(record, "429")
+    """
+
+    def __init__(
+        self,
+        initial_size: int,
+        min_size: int = 1,
+        max_size: Optional[int] = None,
+        max_payload_bytes: int = 8 * 1024 * 1024,
+        max_image_tokens: int = 16000,
+        target_latency: float = 45.0,
+        adaptive: bool = True
+    ):
+        """
+        Args:
+            initial_size: 初始批次大小
+            min_size: 最小批次大小
+            max_size: 最大批次大小（默认等于初始大小的 2 倍）
+            max_payload_bytes: 单批请求体积上限（base64 后字节数）
+            max_image_tokens: 单批图片 token 上限
+            target_latency: 目标延迟（秒），低于目标时扩大批次
+            adaptive: False 时固定批次大小（仍按体积/token 上限组批）
+        """
+        self.min_size = max(1, min_size)
+        self.max_size = max(max_size or initial_size * 2, self.min_size)
+        self.size = min(max(initial_size, self.min_size), self.max_size)
+        self.max_payload_bytes = max_payload_bytes
+        self.max_image_tokens = max_image_tokens
+        self.target_latency = target_latency
+        self.adaptive = adaptive
+        self.stats = BatchSizeStats()
+
+    def take(self, items: Sequence[T], cost: Callable[[T], tuple[int, int]]) -> tuple[list[T], list[T]]:
+        """
+        从 items 头部取一批（至少 1 张，单张超限也单独成批）
+
+        Returns:
+            (本批, 剩余)
+        """
+        payload = tokens = 0
+        count = 0
+        for item in items:
+            if count >= self.size:
+                break
+            item_bytes, item_tokens = cost(item)
+            if count and (payload + item_bytes > self.max_payload_bytes or tokens + item_tokens > self.max_image_tokens):
+                break
+            payload += item_bytes
+            tokens += item_tokens
+            count += 1
+        return list(items[:count]), list(items[count:])
+
+    def is_full(self, items: Sequence[T], cost: Callable[[T], tuple[int, int]]) -> bool:
+        """items 是否已足够组成一个满批（达到数量、体积或 token 上限）"""
+        batch, rest = self.take(items, cost)
+        return bool(rest) or len(batch) >= self.size
+
+    def start(self, batch: Sequence[T], cost: Callable[[T], tuple[int, int]]) -> BatchRecord:
+        costs = [cost(item) for item in batch]
+        record = BatchRecord(
+            size=len(batch),
+            payload_bytes=sum(c[0] for c in costs),
+            image_tokens=sum(c[1] for c in costs)
+        )
+        self.stats.records.append(record)
+        return record
+
+    def succeeded(self, record: BatchRecord, latency: float) -> None:
+        record.latency = latency
+        if not self.adaptive:
+            return
+        if latency <= self.target_latency and record.size >= self.size and self.size < self.max_size:
+            self.size += 1
+            self.stats.grown += 1
+        elif latency > self.target_latency and self.size > self.min_size:
+            self.size -= 1
+            self.stats.shrunk += 1
+
+    def failed(self, record: BatchRecord, reason: str, latency: float = 0.0) -> None:
+        """超时 / 413 / 429 / 解析不完整：批次减半"""
+        record.outcome = reason
+        record.latency = latency
+        if not self.adaptive:
+            return
+        new_size = max(self.min_size, min(self.size, record.size) // 2)
+        if new_size < self.size:
+            logger.info(f"[AdaptiveBatcher] {reason}，批次大小 {self.size} → {new_size}")
+            self.size = new_size
+            self.stats.shrunk += 1
+
+
+def create_batcher(initial_size: int, vlm: Optional[VLMSettings] = None) -> AdaptiveBatcher:
+    """按 VLM 配置创建一次运行使用的批次控制器"""
+    vlm = vlm or get_settings_service().load().vlm
+    return AdaptiveBatcher(
+        initial_size=initial_size,
+        max_size=max(initial_size, vlm.batch_max_images),
+        max_payload_bytes=int(vlm.batch_max_payload_mb * 1024 * 1024),
+        max_image_tokens=vlm.batch_max_image_tokens,
+        target_latency=vlm.batch_target_latency,
+        adaptive=vlm.adaptive_batching
+    )
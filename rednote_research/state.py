@@ -1,8 +1,8 @@
 """共享状态定义 - 所有智能体读写的统一数据结构"""
 
 from datetime import datetime
-from typing import Optional
-from pydantic import BaseModel, Field
+from typing import Any, Optional
+from pydantic import BaseModel, Field, PrivateAttr
 
 
 class NotePreview(BaseModel):
@@ -33,6 +33,7 @@ class NoteData(BaseModel):
     """笔记完整数据（预览+详情）"""
     preview: NotePreview = NotePreview()
     detail: NoteDetail = NoteDetail()
+    duplicate_ids: list[str] = []  # 被合并到本笔记的近似重复笔记ID
 
 
 class ResearchPlan(BaseModel):
@@ -74,11 +75,17 @@ class ResearchState(BaseModel):
     documents: list[NoteData] = []
     
     # 分析阶段
+    note_summaries: dict[str, str] = Field(default_factory=dict, description="笔记摘要 {笔记ID: 摘要}")
     insights: Optional[dict] = None
+    analyzed_note_ids: list[str] = Field(default_factory=list, description="生成当前 insights 时的笔记ID（按 source_ids 编号顺序）")
     final_report: str = ""
     
     # 图片分析阶段（新增）
     image_analyses: dict[str, ImageAnalysisResult] = Field(default_factory=dict, description="图片分析结果 {url: result}")
+    image_duplicates: dict[str, str] = Field(default_factory=dict, description="近似重复图片 {图片URL: 代表图片URL}，只有代表图有分析结果")
+    
+    # 运行期缓存（不序列化）：笔记向量索引，见 services.vector_index.get_note_index
+    _note_index: Any = PrivateAttr(default=None)
     
     # 控制流
     is_complete: bool = False
@@ -9,8 +9,11 @@ from fastapi.responses import FileResponse
 from fastapi.staticfiles import StaticFiles
 
 from ..config import Config
-from ..mcp import XiaohongshuHTTPClient
+from ..mcp import create_mcp_client
 from ..agents.orchestrator import ResearchOrchestrator
+from ..services.login_monitor import DEFAULT_REFRESH_INTERVAL, DEFAULT_TTL, LoginStatusMonitor
+from ..services.image_downloader import close_image_downloader
+from ..agents.image_validator import close_image_validator
 from .context import global_context
 from .routers import research, history, settings, publish, tools, mcp
 
@@ -20,20 +23,31 @@ async def lifespan(app: FastAPI):
     # 启动时初始化
     config = Config.from_env()
     
-    # MCP客户端（使用 HTTP API）
-    mcp_url = os.getenv("XIAOHONGSHU_MCP_URL", "http://localhost:18060")
-    mcp_client = XiaohongshuHTTPClient(base_url=mcp_url)
+    # MCP客户端（使用 HTTP API；配置 XIAOHONGSHU_MCP_URLS 多个地址时为多账号服务池）
+    mcp_client = create_mcp_client()
     await mcp_client.connect()
     orchestrator = ResearchOrchestrator(config, mcp_client)
     
+    # 登录状态缓存 + 后台刷新
+    login_monitor = LoginStatusMonitor(
+        mcp_client,
+        ttl=float(os.getenv("MCP_LOGIN_TTL", DEFAULT_TTL)),
+        refresh_interval=float(os.getenv("MCP_LOGIN_REFRESH_INTERVAL", DEFAULT_REFRESH_INTERVAL))
+    )
+    login_monitor.start()
+    
     # 注入全局上下文
     global_context.config = config
     global_context.mcp_client = mcp_client
     global_context.orchestrator = orchestrator
+    global_context.login_monitor = login_monitor
     
     yield
     
     # 关闭时清理
+    await login_monitor.stop()
+    await close_image_validator()
+    await close_image_downloader()
     if mcp_client:
         await mcp_client.disconnect()
 
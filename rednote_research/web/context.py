@@ -2,6 +2,7 @@ from typing import Optional
 from ..config import Config
 from ..mcp import XiaohongshuHTTPClient
 from ..agents.orchestrator import ResearchOrchestrator
+from ..services.login_monitor import LoginStatusMonitor
 
 class AppContext:
     _instance = None
@@ -10,6 +11,7 @@ class AppContext:
         self.config: Optional[Config] = None
         self.mcp_client: Optional[XiaohongshuHTTPClient] = None
         self.orchestrator: Optional[ResearchOrchestrator] = None
+        self.login_monitor: Optional[LoginStatusMonitor] = None
 
     @classmethod
     def get_instance(cls):
@@ -1,4 +1,6 @@
-from fastapi import APIRouter, HTTPException
+import json
+from fastapi import APIRouter, HTTPException, Query
+from sse_starlette.sse import EventSourceResponse
 from ..context import global_context
 from ...mcp.http_client import get_mcp_client
 
@@ -8,8 +10,11 @@ async def _get_client():
     return global_context.mcp_client or get_mcp_client()
 
 @router.get("/login/status")
-async def check_login_status():
-    """获取小红书登录状态"""
+async def check_login_status(refresh: bool = Query(False)):
+    """获取小红书登录状态（默认读取缓存，refresh=true 时立即检查）"""
+    monitor = global_context.login_monitor
+    if monitor:
+        return await monitor.get_status(force=refresh)
     try:
         client = await _get_client()
         return await client.check_login_status()
@@ -17,11 +22,39 @@ async def check_login_status():
         # 如果连接不上 MCP 服务，返回未登录状态而非 500
         return {"is_logged_in": False, "username": "", "error": str(e)}
 
+@router.get("/login/events")
+async def login_status_events():
+    """SSE 推送登录状态变化（连接时先推送当前状态）"""
+    monitor = global_context.login_monitor
+    if not monitor:
+        raise HTTPException(status_code=503, detail="登录状态监控未启动")
+
+    async def event_generator():
+        queue = monitor.subscribe()
+        try:
+            while True:
+                status = await queue.get()
+                yield {"event": "login_status", "data": json.dumps(status, ensure_ascii=False)}
+        finally:
+            monitor.unsubscribe(queue)
+
+    return EventSourceResponse(event_generator())
+
 @router.get("/login/qrcode")
 async def get_login_qrcode():
     """获取登录二维码"""
     try:
         client = await _get_client()
-        return await client.get_login_qrcode()
+        result = await client.get_login_qrcode()
+        # 扫码登录期间前端会轮询状态，缓存需要尽快反映登录结果
+        if global_context.login_monitor:
+            global_context.login_monitor.invalidate()
+        return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/metrics")
+async def get_mcp_metrics():
+    """获取 MCP 请求合并统计"""
+    client = await _get_client()
+    return client.get_metrics()
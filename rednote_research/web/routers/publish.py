@@ -29,7 +29,7 @@ class UpdatePublishRequest(BaseModel):
 @router.post("/create")
 async def create_publish_draft(request: CreatePublishRequest):
     service = get_publish_service()
-    draft = service.create_draft(
+    draft = await service.create_draft(
         topic=request.topic,
         summary=request.summary,
         key_findings=request.key_findings,
@@ -58,8 +58,14 @@ async def research_stream(topic: str = Query(None), task: str = Query(None, min_
             await ctx.mcp_client.connect()
             yield yield_msg(type="log", level="success", message="✅ MCP连接成功")
             
-            # 检查登录状态
-            login_status = await ctx.mcp_client.check_login_status()
+            # 检查登录状态（优先使用后台刷新的缓存）
+            if ctx.login_monitor:
+                login_status = await ctx.login_monitor.get_status()
+                if not login_status.get("is_logged_in"):
+                    # 缓存显示未登录时复查一次，避免刚扫码登录后被误拦
+                    login_status = await ctx.login_monitor.get_status(force=True)
+            else:
+                login_status = await ctx.mcp_client.check_login_status()
             if not login_status.get("is_logged_in"):
                 yield yield_msg(type="log", level="error", message="❌ 小红书未登录或登录已过期！")
                 yield yield_msg(type="error", message="需要登录小红书账号才能进行研究")
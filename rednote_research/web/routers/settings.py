@@ -155,7 +155,10 @@ async def test_mcp_connection():
              from ...mcp.http_client import get_mcp_client
              client = get_mcp_client()
 
-        status = await client.check_login_status()
+        if global_context.login_monitor:
+            status = await global_context.login_monitor.get_status(force=True)
+        else:
+            status = await client.check_login_status()
         username = status.get('username', '未知')
         
         if not status.get("is_logged_in"):
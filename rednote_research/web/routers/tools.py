@@ -12,13 +12,9 @@ class ImageValidateRequest(BaseModel):
 
 @router.post("/validate-image")
 async def validate_image(request: ImageValidateRequest):
-    from ...agents.image_validator import ImageValidator
-    validator = ImageValidator()
-    try:
-        result = await validator.validate(request.image_url, request.context, request.topic)
-        return result.model_dump()
-    finally:
-        await validator.close()
+    from ...agents.image_validator import get_image_validator
+    result = await get_image_validator().validate(request.image_url, request.context, request.topic)
+    return result.model_dump()
 
 class BatchImageValidateRequest(BaseModel):
     images: list[dict]
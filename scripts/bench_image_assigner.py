@@ -0,0 +1,138 @@
+"""
+图片分配基准测试
+
+随机生成数千张图片的分析结果和若干章节，比较：
+- legacy：旧实现，每个章节遍历全部图片，逐张重建关键词集合、对场景类型跑正则分词后全量排序
+- index：ImageIndex 预先分词并建立倒排表，只对命中关键词/场景/分类的图片打分，返回完整候选列表
+- top：同 index，但与 assign 一样只取前 4 张（未命中图片按预排的质量分顺序惰性归并）
+
+index 的候选列表（URL、顺序、分数）与 legacy 完全一致，top 与 legacy 的前 4 张一致。
+
+示例：
+    PYTHONPATH=. python scripts/bench_image_assigner.py --images 5000 --sections 40
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from rednote_research.output.image_assigner import ImageAssigner, ImageIndex
+from rednote_research.state import ImageAnalysisResult
+
+SCENE_TYPES = ["风格展示", "数据展示", "教程步骤", "产品展示", "真实场景", "美食探店", "路线地图"]
+CATEGORIES = ["实景", "攻略", "装饰", "广告"]
+
+
+def make_vocabulary(size: int, rng: random.Random) -> list[str]:
+    chars = "的一是在不了有和人这中大为上个国我以要他时来用们生到作地于出就分对成会可主发年动同工也能下过子说产种面而方后多定行学法所民得经"
+    return list({"".join(rng.choices(chars, k=rng.randint(2, 4))) for _ in range(size * 2)})[:size]
+
+
+def make_analyses(count: int, vocabulary: list[str], rng: random.Random) -> dict[str, ImageAnalysisResult]:
+    analyses = {}
+    for i in range(count):
+        url = f"https://sns-img.example.com/{i}.jpg"
+        analyses[url] = ImageAnalysisResult(
+            image_url=url,
+            content_keywords=rng.sample(vocabulary, rng.randint(2, 6)),
+            scene_type=rng.choice(SCENE_TYPES),
+            category=rng.choice(CATEGORIES),
+            quality_score=rng.randint(1, 10),
+            should_use=rng.random() > 0.15
+        )
+    return analyses
+
+
+def make_sections(count: int, vocabulary: list[str], rng: random.Random) -> list[dict]:
+    sections = []
+    for i in range(count):
+        words = rng.sample(vocabulary, 8)
+        sections.append({
+            "title": f"{words[0]}{rng.choice(['风格', '数据', '教程', '场景'])} {words[1]}",
+            "content": " ".join(words[2:]),
+            "required_image_keywords": words[:3] if i % 2 else [],
+            "preferred_scene_types": [rng.choice(SCENE_TYPES)] if i % 3 == 0 else [],
+            "preferred_image_types": ["实景"] if i % 4 == 0 else [],
+        })
+    return sections
+
+
+def legacy_find_candidates(assigner: ImageAssigner, analyses, section_title, section_content,
+                           required_keywords, preferred_scene_types, preferred_types):
+    """旧实现（逐张打分）"""
+    candidates = []
+    if required_keywords:
+        target_keywords = set(required_keywords)
+    else:
+        target_keywords = assigner._extract_keywords(section_title + " " + section_content)
+    for url, result in analyses.items():
+        if url in assigner.used_images or not result.should_use:
+            continue
+        score = result.quality_score
+        score += len(target_keywords & set(result.content_keywords or [])) * (5 if required_keywords else 3)
+        if preferred_scene_types and result.scene_type in preferred_scene_types:
+            score += 5
+        else:
+            score += assigner._match_scene_type(section_title, result.scene_type) * 4
+        if section_title in result.matched_sections:
+            score += 5
+        elif any(section_title in s or s in section_title for s in result.matched_sections):
+            score += 3
+        if result.category in preferred_types:
+            score += 2
+        candidates.append((url, result, score))
+    candidates.sort(key=lambda x: x[2], reverse=True)
+    return candidates
+
+
+def run(mode: str, analyses, sections) -> tuple[float, list[list[tuple[str, int]]]]:
+    """按 assign 的流程逐章节查找候选并标记前 4 张为已使用"""
+    assigner = ImageAssigner()
+    outputs = []
+    began = time.perf_counter()
+    index = ImageIndex(analyses) if mode != "legacy" else None
+    for section in sections:
+        args = (
+            analyses, section["title"], section["content"], section["required_image_keywords"],
+            section["preferred_scene_types"], section["preferred_image_types"]
+        )
+        if mode == "legacy":
+            candidates = legacy_find_candidates(assigner, *args)
+        else:
+            candidates = assigner._find_candidates(*args, {}, index, limit=4 if mode == "top" else None)
+        for url, _, _ in candidates[:4]:
+            assigner._mark_used(url, {})
+        outputs.append([(url, score) for url, _, score in candidates])
+    return time.perf_counter() - began, outputs
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="图片分配基准测试")
+    parser.add_argument("--images", type=int, default=5000, help="图片数量")
+    parser.add_argument("--sections", type=int, default=40, help="章节数量")
+    parser.add_argument("--vocabulary", type=int, default=2000, help="关键词词表大小")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    vocabulary = make_vocabulary(args.vocabulary, rng)
+    analyses = make_analyses(args.images, vocabulary, rng)
+    sections = make_sections(args.sections, vocabulary, rng)
+
+    print(f"图片: {args.images} 张，章节: {args.sections} 个，词表: {len(vocabulary)} 词")
+    results = {mode: run(mode, analyses, sections) for mode in ("legacy", "index", "top")}
+    legacy_time, legacy_out = results["legacy"]
+    print(f"{'模式':>8}{'耗时':>12}{'单章节':>12}{'加速':>8}  结果一致")
+    for mode, (elapsed, out) in results.items():
+        same = out == (legacy_out if mode != "top" else [c[:4] for c in legacy_out])
+        print(
+            f"{mode:>8}{elapsed * 1000:>10.1f}ms{elapsed * 1000 / args.sections:>10.2f}ms"
+            f"{legacy_time / elapsed:>7.1f}x  {same}"
+        )
+
+
+if __name__ == "__main__":
+    main()
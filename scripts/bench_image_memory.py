@@ -0,0 +1,159 @@
+"""
+图片分析内存基准测试
+
+本地 HTTP 服务提供 500+ 张大图（约 2-3MB/张），VLM 用固定延迟的假客户端代替，比较：
+- legacy：旧流程，全部下载、全部预处理、全部编码为 base64 后再分批调用 VLM
+- memory：流水线，预处理结果保留在内存（vlm.spill_to_disk=false）
+- spill：流水线，预处理结果落盘到图片缓存，只在调用 VLM 时读回（默认配置）
+
+每种模式在独立子进程中运行，统计 Python 分配峰值（tracemalloc）和进程 RSS 峰值。
+
+示例：
+    PYTHONPATH=. python scripts/bench_image_memory.py --count 520
+"""
+import argparse
+import asyncio
+import io
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+from aiohttp import web
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from rednote_research.services.image_cache import ImageCache
+from rednote_research.services.image_downloader import ImageDownloader
+from rednote_research.services.image_preprocess import ImagePreprocessor
+from rednote_research.services.rate_limit import TokenBucket
+
+MODES = ("legacy", "memory", "spill")
+BASE_IMAGES = 16
+
+
+def make_images(count: int) -> list[bytes]:
+    """生成若干张 2400×3200 的带噪声 JPEG"""
+    images = []
+    for seed in range(count):
+        rng = np.random.default_rng(seed)
+        low = rng.integers(0, 255, (80, 60, 3), dtype=np.uint8)
+        img = Image.fromarray(low).resize((2400, 3200), Image.Resampling.BICUBIC)
+        noise = rng.integers(-12, 12, (3200, 2400, 3))
+        img = Image.fromarray(np.clip(np.asarray(img, dtype=np.int16) + noise, 0, 255).astype(np.uint8))
+        out = io.BytesIO()
+        img.save(out, format="JPEG", quality=90)
+        images.append(out.getvalue())
+    return images
+
+
+class FakeVLM:
+    """固定延迟的 VLM，返回每张图片的分析结果"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, messages, **kwargs):
+        await asyncio.sleep(self.latency)
+        count = len(messages[0]["content"]) - 1
+        items = [{"image_index": i, "description": "图"} for i in range(count)]
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=json.dumps({"analyses": items})))])
+
+
+async def run_legacy(urls, downloader, preprocessor, vlm) -> None:
+    downloaded, _ = await downloader.fetch_many(urls)
+    prepared, _ = await preprocessor.process_many(downloaded)
+    data_uris = {img.url: img.to_data_uri() for img in prepared if img}
+    for start in range(0, len(urls), 10):
+        content = [{"type": "text", "text": "prompt"}]
+        content.extend({"type": "image_url", "image_url": {"url": data_uris.get(u, u)}} for u in urls[start:start + 10])
+        await vlm.chat.completions.create(messages=[{"role": "user", "content": content}])
+
+
+async def child(mode: str, count: int, latency: float) -> dict:
+    images = make_images(BASE_IMAGES)
+
+    async def serve(request):
+        return web.Response(body=images[int(request.match_info["i"]) % BASE_IMAGES], content_type="image/jpeg")
+
+    app = web.Application()
+    app.router.add_get("/img/{i}.jpg", serve)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    urls = [f"http://127.0.0.1:{port}/img/{i}.jpg" for i in range(count)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ImageCache(root=Path(tmp), max_bytes=10 * 1024 ** 3)
+        downloader = ImageDownloader(cache=cache)
+        preprocessor = ImagePreprocessor(max_side=1024)
+        vlm = FakeVLM(latency)
+
+        tracemalloc.start()
+        began = time.perf_counter()
+        if mode == "legacy":
+            await run_legacy(urls, downloader, preprocessor, vlm)
+        else:
+            from rednote_research.output.image_analyzer import ImageAnalyzer
+            analyzer = ImageAnalyzer()
+            analyzer.settings = analyzer.settings.model_copy(deep=True)
+            analyzer.settings.vlm.image_dedup = False
+            analyzer.settings.vlm.prescreen = False
+            analyzer.vlm_client = vlm
+            analyzer.downloader = downloader
+            analyzer.preprocessor = preprocessor
+            analyzer.analysis_cache = None
+            analyzer.spill_cache = cache if mode == "spill" else None
+            analyzer.rate_limiter = TokenBucket(rate=0, burst=1)
+            await analyzer._analyze_images_batch(urls, "基准测试")
+        elapsed = time.perf_counter() - began
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        await downloader.close()
+    await runner.cleanup()
+    return {
+        "mode": mode,
+        "elapsed": elapsed,
+        "traced_peak_mb": peak / 1024 / 1024,
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="图片分析内存基准测试")
+    parser.add_argument("--count", type=int, default=520, help="图片数量")
+    parser.add_argument("--latency", type=float, default=0.3, help="假 VLM 单批延迟（秒）")
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(child(args.child, args.count, args.latency))))
+        return
+
+    print(f"图片: {args.count} 张（{BASE_IMAGES} 张 2400×3200 原图轮流提供），假 VLM 延迟 {args.latency}s/批")
+    print(f"{'模式':>8}{'耗时':>10}{'Python峰值':>14}{'RSS峰值':>12}")
+    for mode in args.modes.split(","):
+        output = subprocess.run(
+            [sys.executable, __file__, "--child", mode, "--count", str(args.count), "--latency", str(args.latency)],
+            capture_output=True, text=True, check=True
+        ).stdout.strip().splitlines()[-1]
+        result = json.loads(output)
+        print(
+            f"{mode:>8}{result['elapsed']:>9.1f}s"
+            f"{result['traced_peak_mb']:>12.1f}MB{result['max_rss_mb']:>10.0f}MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+MCP 搜索吞吐基准测试
+
+默认在进程内直连替身服务（无网络），也可通过 --url 指向独立运行的替身服务：
+    python -m rednote_research.mcp.fake_server --port 18061 --error-rate 0.05
+    python scripts/bench_mcp_search.py --url http://localhost:18061
+
+示例：
+    python scripts/bench_mcp_search.py --keywords 12 --concurrency 4 --error-rate 0.1
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import httpx
+
+from rednote_research.mcp.http_client import XiaohongshuHTTPClient
+from rednote_research.mcp.fake_server import FakeServerConfig, create_fake_app
+
+
+async def run_keyword(client: XiaohongshuHTTPClient, keyword: str, limit: int, semaphore: asyncio.Semaphore, results: dict):
+    async with semaphore:
+        start = time.perf_counter()
+        try:
+            previews = await client.search_notes(keyword, limit=limit)
+        except Exception:
+            results["search_failed"] += 1
+            return
+        results["search_latency"].append(time.perf_counter() - start)
+
+        for preview in previews:
+            start = time.perf_counter()
+            note = await client.get_note_with_detail(preview, delay=0)
+            results["detail_latency"].append(time.perf_counter() - start)
+            if note.detail.content:
+                results["details_ok"] += 1
+            else:
+                results["details_empty"] += 1
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="MCP 搜索吞吐基准测试")
+    parser.add_argument("--url", default=None, help="替身服务地址（默认进程内直连）")
+    parser.add_argument("--keywords", type=int, default=8)
+    parser.add_argument("--limit", type=int, default=5, help="每个关键词获取详情的数量")
+    parser.add_argument("--concurrency", type=int, default=3)
+    parser.add_argument("--search-latency", default="lognormal:0.4:0.3")
+    parser.add_argument("--detail-latency", default="lognormal:0.25:0.3")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--burst-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-qps", type=float, default=0.0)
+    args = parser.parse_args()
+
+    app = None
+    if args.url:
+        client = XiaohongshuHTTPClient(base_url=args.url)
+    else:
+        app = create_fake_app(FakeServerConfig(
+            search_latency=args.search_latency,
+            detail_latency=args.detail_latency,
+            error_rate=args.error_rate,
+            burst_rate=args.burst_rate,
+            rate_limit_qps=args.rate_limit_qps,
+        ))
+        client = XiaohongshuHTTPClient(base_url="http://fake-mcp", transport=httpx.ASGITransport(app=app))
+
+    results = {"search_latency": [], "detail_latency": [], "search_failed": 0, "details_ok": 0, "details_empty": 0}
+    semaphore = asyncio.Semaphore(args.concurrency)
+    keywords = [f"关键词{i}" for i in range(args.keywords)]
+
+    start = time.perf_counter()
+    async with client:
+        await asyncio.gather(*[
+            run_keyword(client, kw, args.limit, semaphore, results) for kw in keywords
+        ])
+    elapsed = time.perf_counter() - start
+
+    total_details = results["details_ok"] + results["details_empty"]
+    print(f"关键词: {args.keywords} | 并发: {args.concurrency} | 总耗时: {elapsed:.2f}s")
+    print(f"搜索: 成功 {len(results['search_latency'])} / 失败 {results['search_failed']} | "
+          f"p50 {percentile(results['search_latency'], 0.5):.3f}s | p95 {percentile(results['search_latency'], 0.95):.3f}s")
+    print(f"详情: {total_details} 篇 (空 {results['details_empty']}) | "
+          f"p50 {percentile(results['detail_latency'], 0.5):.3f}s | p95 {percentile(results['detail_latency'], 0.95):.3f}s")
+    print(f"吞吐: {total_details / elapsed:.2f} 篇/秒")
+    if app is not None:
+        print(f"服务端统计: {app.state.stats}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,143 @@
+"""
+笔记 prompt 序列化格式基准测试
+
+在录制数据（history.json 中保存的研究笔记）上对比 markdown 与 compact 两种格式，
+统计每篇笔记的 token 数。使用真实的 prompt 构建函数（Analyzer / HTML 生成器），
+并关闭笔记预算，只比较格式本身的开销。html_alias 为 HTML 数据开启 img_N / note_N
+链接别名后的结果。
+
+示例：
+    python scripts/bench_prompt_format.py
+    python scripts/bench_prompt_format.py --path data/history.json --per-record
+"""
+import argparse
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from rednote_research.agents.analyzer import AnalyzerAgent
+from rednote_research.output.html_generator import HTMLReportGenerator
+from rednote_research.services import settings as settings_module
+from rednote_research.services.settings import Settings, SettingsService
+from rednote_research.services.prompt_alias import PromptAliases
+from rednote_research.services.text_utils import estimate_tokens
+from rednote_research.state import NoteData, NoteDetail, NotePreview, ResearchState
+
+try:
+    import tiktoken
+    _ENCODER = tiktoken.get_encoding("cl100k_base")
+except ImportError:
+    _ENCODER = None
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_PATHS = [
+    PROJECT_ROOT / "data" / "history.json",
+    PROJECT_ROOT / "rednote_research" / "services" / "history.json",
+]
+
+
+def count_tokens(text: str) -> int:
+    if _ENCODER is not None:
+        return len(_ENCODER.encode(text))
+    return estimate_tokens(text)
+
+
+def load_datasets(paths: list[Path]) -> list[tuple[str, list[NoteData]]]:
+    """读取历史记录中的笔记，每条研究记录作为一个数据集"""
+    datasets = []
+    for path in paths:
+        if not path.exists():
+            continue
+        for record in json.loads(path.read_text(encoding="utf-8")):
+            notes = [
+                NoteData(
+                    preview=NotePreview(id=n.get("id", ""), title=n.get("title", ""), likes=n.get("likes", 0)),
+                    detail=NoteDetail(
+                        title=n.get("title", ""),
+                        content=n.get("content", ""),
+                        author=n.get("author", ""),
+                        likes=n.get("likes", 0),
+                        images=n.get("images", []),
+                        tags=n.get("tags", []),
+                    ),
+                )
+                for n in record.get("notes") or []
+            ]
+            if notes:
+                datasets.append((record.get("topic", record.get("id", "")), notes))
+    return datasets
+
+
+def use_settings(note_format: str) -> Settings:
+    """切换到临时配置：指定格式，关闭笔记预算"""
+    config_path = Path(tempfile.mkdtemp()) / "settings.json"
+    service = SettingsService(config_path=config_path)
+    settings = service.load()
+    settings.prompt.note_format = note_format
+    settings.prompt.analyzer_note_budget = 0
+    service.save(settings)
+    settings_module._settings_service = service
+    return settings
+
+
+def measure(notes: list[NoteData], note_format: str) -> dict[str, int]:
+    settings = use_settings(note_format)
+    state = ResearchState(task="bench", documents=notes)
+
+    analyzer = AnalyzerAgent(None, model="bench")
+    html = HTMLReportGenerator(None, model="bench")
+    html.settings = settings
+
+    return {
+        "analyzer": count_tokens(analyzer._prepare_data_summary(state)),
+        "html": count_tokens(html._prepare_data_for_llm(state)),
+        "html_alias": count_tokens(html._prepare_data_for_llm(state, PromptAliases())),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="笔记 prompt 序列化格式基准测试")
+    parser.add_argument("--path", action="append", type=Path, help="历史记录 JSON（可多次指定）")
+    parser.add_argument("--per-record", action="store_true", help="输出每条研究记录的结果")
+    args = parser.parse_args()
+
+    datasets = load_datasets(args.path or DEFAULT_PATHS)
+    if not datasets:
+        print("未找到录制数据")
+        return
+
+    counter = "tiktoken cl100k_base" if _ENCODER is not None else "estimate_tokens 估算"
+    print(f"数据集: {len(datasets)} 条研究记录，{sum(len(n) for _, n in datasets)} 篇笔记（计数: {counter}）")
+
+    stages = ("analyzer", "html", "html_alias")
+    totals = {fmt: dict.fromkeys(stages, 0) for fmt in ("markdown", "compact")}
+    note_count = 0
+    for topic, notes in datasets:
+        note_count += len(notes)
+        row = {}
+        for fmt in totals:
+            result = measure(notes, fmt)
+            row[fmt] = result
+            for stage, tokens in result.items():
+                totals[fmt][stage] += tokens
+        if args.per_record:
+            print(
+                f"  {topic[:20]:<20} {len(notes):>3} 篇  "
+                f"analyzer {row['markdown']['analyzer']:>6} -> {row['compact']['analyzer']:>6}  "
+                f"html {row['markdown']['html']:>6} -> {row['compact']['html']:>6}"
+            )
+
+    print()
+    print(f"{'阶段':<12}{'markdown/篇':>14}{'compact/篇':>14}{'节省':>10}")
+    for stage in stages:
+        before = totals["markdown"][stage] / note_count
+        after = totals["compact"][stage] / note_count
+        saving = 1 - after / before if before else 0
+        print(f"{stage:<12}{before:>14.1f}{after:>14.1f}{saving:>10.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+VLM 图片尺寸基准测试
+
+对同一批图片按不同最长边预处理，统计：
+- 请求体积：base64 data URI 总大小、平均每张大小、预处理耗时
+- VLM 延迟和结果一致性（--vlm）：每个尺寸按 10 张一批调用 VLM，
+  与第一个尺寸（默认原图）的结果比较分类 / 场景类型是否一致、内容关键词的 Jaccard 相似度
+
+图片来源：本地目录（--dir）或历史记录中的笔记图片（默认，经共享下载器和图片缓存）。
+
+示例：
+    python scripts/bench_vlm_image_size.py --dir ~/Pictures/xhs --sizes 0,1536,1024,768
+    python scripts/bench_vlm_image_size.py --limit 30 --vlm --topic 露营装备
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from rednote_research.services.image_downloader import DownloadedImage, ImageDownloader
+from rednote_research.services.image_cache import get_image_cache
+from rednote_research.services.image_preprocess import ImagePreprocessor
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_HISTORY = [
+    PROJECT_ROOT / "data" / "history.json",
+    PROJECT_ROOT / "rednote_research" / "services" / "history.json",
+]
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp", ".gif", ".bmp"}
+BATCH_SIZE = 10
+
+
+async def load_images(args) -> list[DownloadedImage]:
+    if args.dir:
+        paths = sorted(p for p in Path(args.dir).expanduser().iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)
+        return [DownloadedImage(str(p), p.read_bytes()) for p in paths[:args.limit]]
+
+    urls = []
+    for path in DEFAULT_HISTORY:
+        if path.exists():
+            for record in json.loads(path.read_text(encoding="utf-8")):
+                for note in record.get("notes") or []:
+                    urls.extend(note.get("images") or [])
+    urls = list(dict.fromkeys(urls))[:args.limit]
+    downloader = ImageDownloader(cache=get_image_cache())
+    try:
+        images, stats = await downloader.fetch_many(urls)
+    finally:
+        await downloader.close()
+    print(f"下载: {stats.summary()}")
+    return [img for img in images if img]
+
+
+async def analyze(analyzer, images: list[DownloadedImage], topic: str) -> tuple[list[dict], float]:
+    """按批调用 VLM，返回每张图片的结果和总耗时"""
+    from rednote_research.prompts.image_analyzer import build_image_analyzer_prompt
+
+    prompt = build_image_analyzer_prompt(topic)
+    results: list[dict] = [{} for _ in images]
+    elapsed = 0.0
+    for start in range(0, len(images), BATCH_SIZE):
+        batch = images[start:start + BATCH_SIZE]
+        content = [{"type": "text", "text": prompt}]
+        content.extend({"type": "image_url", "image_url": {"url": img.to_data_uri()}} for img in batch)
+        began = time.perf_counter()
+        response = await analyzer.vlm_client.chat.completions.create(
+            model=analyzer.settings.vlm.model,
+            messages=[{"role": "user", "content": content}],
+            max_tokens=analyzer.settings.vlm.max_tokens,
+            temperature=0.1
+        )
+        elapsed += time.perf_counter() - began
+        items = analyzer._parse_json_robust(response.choices[0].message.content or "[]", start // BATCH_SIZE, len(batch))
+        for item in items:
+            idx = item.get("image_index", 0)
+            if isinstance(idx, int) and 0 <= idx < len(batch):
+                results[start + idx] = item
+    return results, elapsed
+
+
+def agreement(reference: list[dict], results: list[dict]) -> tuple[float, float, float]:
+    """(分类一致率, 场景类型一致率, 关键词平均 Jaccard)"""
+    pairs = [(a, b) for a, b in zip(reference, results) if a and b]
+    if not pairs:
+        return 0.0, 0.0, 0.0
+    category = sum(a.get("category") == b.get("category") for a, b in pairs) / len(pairs)
+    scene = sum(a.get("scene_type") == b.get("scene_type") for a, b in pairs) / len(pairs)
+    jaccard = 0.0
+    for a, b in pairs:
+        ka, kb = set(a.get("content_keywords") or []), set(b.get("content_keywords") or [])
+        jaccard += len(ka & kb) / len(ka | kb) if ka | kb else 1.0
+    return category, scene, jaccard / len(pairs)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="VLM 图片尺寸基准测试")
+    parser.add_argument("--dir", help="本地图片目录（默认使用历史记录中的笔记图片）")
+    parser.add_argument("--limit", type=int, default=30, help="图片数量上限")
+    parser.add_argument("--sizes", default="0,1536,1024,768,512", help="最长边列表，0=原图")
+    parser.add_argument("--quality", type=int, default=80)
+    parser.add_argument("--format", default="JPEG", help="JPEG / WEBP")
+    parser.add_argument("--vlm", action="store_true", help="调用 VLM 测量延迟和结果一致性（使用当前 VLM 配置）")
+    parser.add_argument("--topic", default="生活分享", help="VLM 分析使用的研究主题")
+    args = parser.parse_args()
+
+    images = await load_images(args)
+    if not images:
+        print("没有可用的图片")
+        return
+    sizes = [int(s) for s in args.sizes.split(",")]
+    print(f"图片: {len(images)} 张，原始总大小 {sum(len(i.data) for i in images) / 1024 / 1024:.1f}MB")
+
+    analyzer = None
+    if args.vlm:
+        from rednote_research.output.image_analyzer import ImageAnalyzer
+        analyzer = ImageAnalyzer()
+
+    print()
+    header = f"{'最长边':>8}{'请求体积':>12}{'平均/张':>10}{'预处理':>10}"
+    if analyzer:
+        header += f"{'VLM耗时':>10}{'分类一致':>10}{'场景一致':>10}{'关键词':>8}"
+    print(header)
+
+    reference = None
+    for size in sizes:
+        preprocessor = ImagePreprocessor(max_side=size, quality=args.quality, fmt=args.format)
+        began = time.perf_counter()
+        prepared, _ = await preprocessor.process_many(images)
+        prep_time = time.perf_counter() - began
+        payload = sum(len(img.to_data_uri()) for img in prepared)
+
+        row = (
+            f"{size or '原图':>8}{payload / 1024 / 1024:>10.2f}MB"
+            f"{payload / len(prepared) / 1024:>8.0f}KB{prep_time:>9.2f}s"
+        )
+        if analyzer:
+            results, vlm_time = await analyze(analyzer, prepared, args.topic)
+            if reference is None:
+                reference = results
+            category, scene, keywords = agreement(reference, results)
+            row += f"{vlm_time:>9.1f}s{category:>10.0%}{scene:>10.0%}{keywords:>8.2f}"
+        print(row)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
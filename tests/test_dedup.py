@@ -0,0 +1,37 @@
+"""近似重复笔记检测测试"""
+from rednote_research.services.dedup import dedup_notes, hamming_distance, simhash
+from rednote_research.state import NoteData, NoteDetail, NotePreview
+
+CAMPING = "周末去露营一定要带的装备清单，帐篷睡袋防潮垫缺一不可，新手照着买不踩坑，营地选在湖边风景超级好"
+COFFEE = "咖啡豆烘焙程度怎么选？浅烘果酸明亮，深烘醇厚苦甜，手冲推荐中浅烘，意式推荐中深烘"
+
+
+def note(note_id: str, content: str, likes: int) -> NoteData:
+    return NoteData(
+        preview=NotePreview(id=note_id, likes=likes),
+        detail=NoteDetail(title="分享", content=content, likes=likes)
+    )
+
+
+def test_simhash_is_close_for_reposts_and_far_for_unrelated_text():
+    assert hamming_distance(simhash(CAMPING), simhash(CAMPING + "！！#露营")) <= 6
+    assert hamming_distance(simhash(CAMPING), simhash(COFFEE)) > 10
+
+
+def test_dedup_keeps_most_liked_representative_with_aggregated_likes():
+    notes = [
+        note("a", CAMPING, 10),
+        note("b", COFFEE, 5),
+        note("c", CAMPING + "～", 30),
+        note("d", "太短了", 1),
+        note("e", "太短了", 1),
+    ]
+    result = dedup_notes(notes)
+
+    assert [n.preview.id for n in result.notes] == ["c", "b", "d", "e"]
+    assert result.notes[0].preview.likes == 40
+    assert result.notes[0].duplicate_ids == ["a"]
+    assert result.clusters == [["c", "a"]]
+    assert result.removed == 1
+    assert result.tokens_saved > 0
+    assert notes[2].preview.likes == 30  # 输入不被修改
@@ -0,0 +1,109 @@
+"""
+xiaohongshu-mcp 替身服务测试
+
+通过 ASGI 传输层直连替身服务，验证 XiaohongshuHTTPClient 的解析和重试逻辑
+"""
+import httpx
+import pytest
+
+from rednote_research.mcp.http_client import XiaohongshuHTTPClient
+from rednote_research.mcp.fake_server import FakeServerConfig, LatencyModel, create_fake_app
+
+
+def make_client(**overrides) -> tuple[XiaohongshuHTTPClient, object]:
+    options = {
+        "search_latency": "fixed:0",
+        "detail_latency": "fixed:0",
+        "publish_latency": "fixed:0",
+        "login_latency": "fixed:0",
+        **overrides
+    }
+    config = FakeServerConfig(**options)
+    app = create_fake_app(config)
+    client = XiaohongshuHTTPClient(
+        base_url="http://fake-mcp",
+        transport=httpx.ASGITransport(app=app)
+    )
+    return client, app
+
+
+def test_latency_model_parse():
+    model = LatencyModel.parse("uniform:0.1:0.3")
+    assert model.kind == "uniform"
+    assert (model.a, model.b) == (0.1, 0.3)
+    with pytest.raises(ValueError):
+        LatencyModel.parse("gamma:1")
+
+
+@pytest.mark.asyncio
+async def test_search_and_detail_roundtrip():
+    client, _ = make_client(feeds_per_search=8)
+    async with client:
+        status = await client.check_login_status()
+        assert status == {"is_logged_in": True, "username": "fake-user"}
+
+        notes, tokens = await client.search_feeds("咖啡")
+        assert len(notes) == 8
+        assert set(tokens) == {n.id for n in notes}
+
+        # 同一关键词结果稳定
+        again, _ = await client.search_feeds("咖啡")
+        assert [n.id for n in again] == [n.id for n in notes]
+
+        note = await client.get_note_with_detail(notes[0], delay=0)
+        assert note.detail.content
+        assert note.detail.images
+        assert note.detail.tags
+
+
+@pytest.mark.asyncio
+async def test_search_retries_through_burst(monkeypatch):
+    async def no_sleep(_):
+        return None
+
+    monkeypatch.setattr("asyncio.sleep", no_sleep)
+    client, app = make_client(burst_rate=1.0, burst_length=3)
+    async with client:
+        # 突发持续 3 个请求：两次尝试都落在突发期内
+        with pytest.raises(Exception):
+            await client.search_feeds("露营", max_retries=2)
+
+        # 关闭新的突发后，剩余 1 个失败请求被重试吸收
+        app.state.config.burst_rate = 0.0
+        notes, _ = await client.search_feeds("露营", max_retries=3)
+        assert notes
+
+    stats = app.state.stats["search"]
+    assert stats == {"requests": 4, "burst": 3, "ok": 1}
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_returns_429():
+    client, app = make_client(rate_limit_qps=0.001, rate_limit_burst=1)
+    async with client:
+        await client.check_login_status()
+        status = await client.check_login_status()
+    assert status["is_logged_in"] is False
+    assert app.state.stats["login"]["rate_limited"] == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_requests_are_coalesced():
+    import asyncio
+
+    client, app = make_client(search_latency="fixed:0.05", detail_latency="fixed:0.05")
+    async with client:
+        results = await asyncio.gather(*[client.search_feeds("热门话题") for _ in range(5)])
+        notes, tokens = results[0]
+        await asyncio.gather(*[client.get_feed_detail(notes[0].id, tokens[notes[0].id]) for _ in range(3)])
+
+        # 结果是副本，互不影响
+        results[1][0][0].likes = -1
+        assert results[0][0][0].likes != -1
+
+    assert app.state.stats["search"]["requests"] == 1
+    assert app.state.stats["detail"]["requests"] == 1
+    metrics = client.get_metrics()
+    assert metrics["search"] == {"calls": 5, "executed": 1, "coalesced": 4}
+    assert metrics["detail"] == {"calls": 3, "executed": 1, "coalesced": 2}
+    assert metrics["inflight"] == 0
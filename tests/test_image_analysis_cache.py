@@ -0,0 +1,65 @@
+"""VLM 图片分析缓存测试"""
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from rednote_research.output.image_analyzer import ImageAnalyzer
+from rednote_research.services.image_analysis_cache import ImageAnalysisCache
+from rednote_research.services.image_downloader import DownloadedImage, DownloadStats
+
+
+class FakeDownloader:
+    async def fetch_many(self, urls):
+        # 两个不同链接指向同一内容
+        images = [DownloadedImage(url, b"same" if "dup" in url else url.encode()) for url in urls]
+        return images, DownloadStats(total=len(urls), succeeded=len(urls))
+
+
+class FakeVLM:
+    def __init__(self):
+        self.batches = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, messages, **kwargs):
+        images = messages[0]["content"][1:]
+        self.batches.append(len(images))
+        items = [
+            {"image_index": i, "description": f"图{i}", "category": "广告" if i == 0 else "实景",
+             "quality_score": 8, "should_use": False}
+            for i in range(len(images))
+        ]
+        message = SimpleNamespace(content=json.dumps({"analyses": items}, ensure_ascii=False))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def make_analyzer(cache):
+    analyzer = ImageAnalyzer()
+    analyzer.vlm_client = FakeVLM()
+    analyzer.downloader = FakeDownloader()
+    analyzer.analysis_cache = cache
+    analyzer.spill_cache = None
+    return analyzer
+
+
+@pytest.mark.asyncio
+async def test_only_uncached_images_reach_vlm(tmp_path):
+    cache = ImageAnalysisCache(path=tmp_path / "vlm.json")
+    first = make_analyzer(cache)
+    await first._analyze_images_batch(["http://x/ad", "http://x/dup1"], "露营")
+    assert first.vlm_client.batches == [2]
+
+    second = make_analyzer(ImageAnalysisCache(path=tmp_path / "vlm.json"))
+    analyses, calls = await second._analyze_images_batch(["http://x/ad", "http://x/dup2", "http://x/new"], "徒步")
+
+    assert second.vlm_client.batches == [1]  # 只有 new 送入 VLM
+    assert (calls, second.cache_hits) == (1, 2)
+    assert analyses["http://x/dup2"].image_url == "http://x/dup2"
+    assert analyses["http://x/dup2"].description == "图1"
+    # should_use 按主题记录；其他主题按分类和质量分推断
+    assert analyses["http://x/ad"].should_use is False
+    assert analyses["http://x/dup2"].should_use is True
+
+    third = make_analyzer(ImageAnalysisCache(path=tmp_path / "vlm.json"))
+    analyses, _ = await third._analyze_images_batch(["http://x/dup1"], "露营")
+    assert analyses["http://x/dup1"].should_use is False
@@ -0,0 +1,145 @@
+"""图片分析流水线测试：下载与 VLM 调用重叠，并行批次数和在途字节受限"""
+import asyncio
+import io
+import json
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from rednote_research.output.image_analyzer import ImageAnalyzer
+from rednote_research.services.image_cache import ImageCache
+from rednote_research.services.image_downloader import DownloadedImage, DownloadStats
+from rednote_research.services.image_preprocess import ImagePreprocessor
+from rednote_research.services.rate_limit import TokenBucket
+
+DOWNLOAD_DELAY = 0.05
+VLM_DELAY = 0.1
+
+
+class SlowDownloader:
+    async def fetch_many(self, urls):
+        await asyncio.sleep(DOWNLOAD_DELAY)
+        return [DownloadedImage(url, url.encode()) for url in urls], DownloadStats(total=len(urls), succeeded=len(urls))
+
+
+class SlowVLM:
+    def __init__(self):
+        self.inflight = 0
+        self.max_inflight = 0
+        self.payloads = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, messages, **kwargs):
+        self.inflight += 1
+        self.max_inflight = max(self.max_inflight, self.inflight)
+        self.payloads.extend(part["image_url"]["url"] for part in messages[0]["content"][1:])
+        await asyncio.sleep(VLM_DELAY)
+        self.inflight -= 1
+        items = [{"image_index": i, "description": "图"} for i in range(len(messages[0]["content"]) - 1)]
+        message = SimpleNamespace(content=json.dumps({"analyses": items}))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def make_analyzer(vlm, downloader, spill_cache=None, **vlm_settings) -> ImageAnalyzer:
+    analyzer = ImageAnalyzer()
+    analyzer.settings = analyzer.settings.model_copy(deep=True)
+    for key, value in vlm_settings.items():
+        setattr(analyzer.settings.vlm, key, value)
+    analyzer.vlm_client = vlm
+    analyzer.downloader = downloader
+    analyzer.preprocessor = ImagePreprocessor(max_side=0)
+    analyzer.analysis_cache = None
+    analyzer.spill_cache = spill_cache
+    analyzer.rate_limiter = TokenBucket(rate=0, burst=1)
+    return analyzer
+
+
+@pytest.mark.asyncio
+async def test_batches_overlap_downloads_and_respect_inflight_limit():
+    analyzer = make_analyzer(SlowVLM(), SlowDownloader(), max_inflight_batches=2, adaptive_batching=False)
+    images = [f"http://x/{i}" for i in range(40)]
+
+    began = time.perf_counter()
+    analyses, calls = await analyzer._analyze_images_batch(images, "露营")
+    elapsed = time.perf_counter() - began
+
+    assert calls == 4 and len(analyses) == 40
+    assert analyzer.vlm_client.max_inflight == 2
+    # 串行需要 4×(0.05+0.1)=0.6s；流水线约 0.05 + 4×0.1/2 = 0.25s
+    assert elapsed < 0.45
+
+
+class OversizeVLM(SlowVLM):
+    """超过 4 张图片的请求返回 413"""
+
+    def __init__(self):
+        super().__init__()
+        self.sizes = []
+
+    async def create(self, messages, **kwargs):
+        size = len(messages[0]["content"]) - 1
+        self.sizes.append(size)
+        if size > 4:
+            raise RuntimeError("Error code: 413 - Request Entity Too Large")
+        return await super().create(messages, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_oversized_batches_split_and_shrink():
+    analyzer = make_analyzer(OversizeVLM(), SlowDownloader(), max_inflight_batches=1)
+
+    analyses, _ = await analyzer._analyze_images_batch([f"http://x/{i}" for i in range(20)], "露营")
+
+    assert len(analyses) == 20 and all(a.description for a in analyses.values())
+    # 10 → 413 拆成 5+5 → 再拆；之后的批次按缩小后的大小组批
+    assert analyzer.vlm_client.sizes[0] == 10
+    assert max(analyzer.vlm_client.sizes[-3:]) <= 4
+    assert any(r.outcome == "413" for r in analyzer.batch_stats.records)
+
+
+class ImageDownloader:
+    """按 URL 返回真实图片：icon 为小图标，其余为普通图片"""
+
+    async def fetch_many(self, urls):
+        images = []
+        for url in urls:
+            size = (64, 64) if "icon" in url else (600, 800)
+            rng = np.random.default_rng(len(images))
+            pixels = rng.integers(0, 255, (size[1] // 8, size[0] // 8, 3), dtype=np.uint8)
+            out = io.BytesIO()
+            Image.fromarray(pixels).resize(size).save(out, format="JPEG")
+            images.append(DownloadedImage(url, out.getvalue()))
+        return images, DownloadStats(total=len(urls), succeeded=len(urls))
+
+
+@pytest.mark.asyncio
+async def test_prescreened_images_skip_vlm():
+    analyzer = make_analyzer(OversizeVLM(), ImageDownloader())
+
+    analyses, _ = await analyzer._analyze_images_batch(["http://x/a", "http://x/icon", "http://x/b"], "露营")
+
+    assert analyzer.vlm_client.sizes == [2]
+    assert analyses["http://x/icon"].should_use is False
+    assert analyzer.prescreen_rejects == {"尺寸过小": 1}
+
+
+@pytest.mark.asyncio
+async def test_payloads_spill_to_disk_and_respect_byte_budget(tmp_path):
+    cache = ImageCache(root=tmp_path)
+    vlm = SlowVLM()
+    # 预算只够一个批次：即使允许 2 个批次并行，同时也只有 1 个在调用 VLM
+    analyzer = make_analyzer(
+        vlm, SlowDownloader(), spill_cache=cache,
+        max_inflight_batches=2, adaptive_batching=False, inflight_payload_mb=0.0005
+    )
+    images = [f"http://x/{i}" for i in range(30)]
+
+    analyses, calls = await analyzer._analyze_images_batch(images, "露营")
+
+    assert calls == 3 and len(analyses) == 30
+    assert vlm.max_inflight == 1
+    assert len(cache) == 30  # 预处理结果已落盘，调用 VLM 时读回
+    assert all(payload.startswith("data:") for payload in vlm.payloads)
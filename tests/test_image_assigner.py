@@ -0,0 +1,69 @@
+"""图片分配测试：倒排索引只对命中图片打分，结果与逐张打分一致"""
+import random
+
+from rednote_research.output.image_assigner import ImageAssigner, ImageIndex, extract_keywords
+from rednote_research.state import ImageAnalysisResult
+
+SCENE_TYPES = ["风格展示", "数据展示", "教程步骤", "真实场景"]
+WORDS = ["预算", "费用", "北欧", "客厅", "收纳", "灯具", "地毯", "配色", "动线", "餐厅"]
+
+
+def brute_force(assigner: ImageAssigner, analyses, title, content, required, scenes, types):
+    """逐张打分的参考实现"""
+    index = ImageIndex(analyses)
+    target = set(required) if required else extract_keywords(title + " " + content)
+    weight = 5 if required else 3
+    scored = [
+        (image.url, image.result, assigner._score_image(
+            image, title, target, extract_keywords(title), weight, scenes, types
+        ))
+        for image in index.images if image.url not in assigner.used_images
+    ]
+    return sorted(scored, key=lambda c: -c[2])
+
+
+def test_indexed_candidates_match_brute_force():
+    rng = random.Random(7)
+    analyses = {
+        f"img{i}": ImageAnalysisResult(
+            image_url=f"img{i}",
+            content_keywords=rng.sample(WORDS, 2),
+            scene_type=rng.choice(SCENE_TYPES),
+            category=rng.choice(["实景", "攻略"]),
+            quality_score=rng.randint(1, 9),
+            should_use=rng.random() > 0.2,
+            matched_sections=["北欧客厅"] if i % 17 == 0 else []
+        )
+        for i in range(200)
+    }
+    sections = [
+        ("北欧风格 客厅", "预算 收纳", [], [], []),
+        ("费用数据", "", ["预算", "费用"], ["数据展示"], ["攻略"]),
+        ("北欧客厅", "配色", [], [], ["实景"]),
+    ]
+    assigner = ImageAssigner()
+    index = ImageIndex(analyses)
+    for title, content, required, scenes, types in sections:
+        expected = brute_force(assigner, analyses, title, content, required, scenes, types)
+        full = assigner._find_candidates(analyses, title, content, required, scenes, types, {}, index)
+        top = assigner._find_candidates(analyses, title, content, required, scenes, types, {}, index, limit=4)
+        assert [(u, s) for u, _, s in full] == [(u, s) for u, _, s in expected]
+        assert top == full[:4]
+        for url, _, _ in top:
+            assigner._mark_used(url, {})
+
+
+def test_index_only_scores_touched_images():
+    analyses = {
+        "match": ImageAnalysisResult(image_url="match", content_keywords=["预算表"], quality_score=3),
+        "scene": ImageAnalysisResult(image_url="scene", scene_type="数据展示", quality_score=3),
+        "plain": ImageAnalysisResult(image_url="plain", quality_score=9),
+        "unused": ImageAnalysisResult(image_url="unused", content_keywords=["预算表"], should_use=False),
+    }
+    index = ImageIndex(analyses)
+
+    touched = index.touched({"预算表"}, extract_keywords("费用 数据展示"), [], [])
+
+    assert {index.images[i].url for i in touched} == {"match", "scene"}
+    candidates = ImageAssigner()._find_candidates(analyses, "费用 数据展示", "", ["预算表"], [], [], {}, index)
+    assert [(url, score) for url, _, score in candidates] == [("plain", 9), ("match", 8), ("scene", 7)]
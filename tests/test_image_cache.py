@@ -0,0 +1,104 @@
+"""图片字节缓存测试"""
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from rednote_research.services.image_cache import ImageCache, canonical_image_url
+from rednote_research.services.image_downloader import ImageDownloader
+
+
+def test_signed_xhscdn_links_share_one_key():
+    a = "https://sns-webpic-qc.xhscdn.com/202401011200/0123456789abcdef0123456789abcdef/1040g2sg30a!nd_dft_wlteh_webp_3"
+    b = "https://sns-webpic-bd.xhscdn.com/202402021530/fedcba9876543210fedcba9876543210/1040g2sg30a!nd_dft_wlteh_webp_3#x"
+    assert canonical_image_url(a) == canonical_image_url(b) == "xhscdn:1040g2sg30a!nd_dft_wlteh_webp_3"
+    assert canonical_image_url("https://Example.com/a.png?x=1#f") == "https://example.com/a.png?x=1"
+
+
+def test_content_addressing_ttl_lru_and_persistence(tmp_path, monkeypatch):
+    clock = {"now": 1000.0}
+    monkeypatch.setattr("rednote_research.services.image_cache.time.time", lambda: clock["now"])
+
+    cache = ImageCache(root=tmp_path, max_bytes=25, ttl=100)
+    sha = cache.put("https://a.com/1.png", b"x" * 10, "image/png")
+    assert cache.put("https://b.com/same.png", b"x" * 10) == sha  # 相同内容只存一份
+    assert cache.total_bytes == 10
+
+    clock["now"] += 1
+    cache.put("https://a.com/2.png", b"y" * 10)
+    clock["now"] += 1
+    assert cache.get("https://a.com/1.png").data == b"x" * 10  # 访问后 x 比 y 新
+    clock["now"] += 1
+    cache.put("https://a.com/3.png", b"z" * 10)  # 超出 25 字节，淘汰最久未访问的 y
+
+    assert cache.get("https://a.com/2.png") is None
+    assert len([p for p in (tmp_path / "objects").rglob("*") if p.is_file()]) == 2
+    assert cache.total_bytes == 20  # 增量维护的总大小与淘汰后一致
+
+    reloaded = ImageCache(root=tmp_path, max_bytes=25, ttl=100)
+    hit = reloaded.get("https://b.com/same.png")
+    assert (hit.data, hit.sha256) == (b"x" * 10, sha)
+
+    clock["now"] += 200
+    assert reloaded.get("https://a.com/3.png") is None  # 过期
+
+
+@pytest.mark.asyncio
+async def test_downloader_reads_through_cache(tmp_path):
+    requests = []
+
+    async def image(request):
+        requests.append(request.path)
+        return web.Response(body=b"img", content_type="image/jpeg")
+
+    app = web.Application()
+    app.router.add_get("/{name}", image)
+    server = TestServer(app)
+    await server.start_server()
+    downloader = ImageDownloader(cache=ImageCache(root=tmp_path))
+    try:
+        urls = [str(server.make_url("/a")), str(server.make_url("/b"))]
+        await downloader.fetch_many(urls)
+        images, stats = await downloader.fetch_many(urls)
+    finally:
+        await downloader.close()
+        await server.close()
+
+    assert sorted(requests) == ["/a", "/b"]
+    assert [img.data for img in images] == [b"img", b"img"]
+    assert (stats.succeeded, stats.cache_hits, stats.bytes) == (2, 2, 0)
+
+
+@pytest.mark.asyncio
+async def test_publish_draft_reads_images_through_cache(tmp_path, monkeypatch):
+    from rednote_research.services import publisher
+    from rednote_research.services.publisher import PublishService
+
+    requests = []
+
+    async def image(request):
+        requests.append(request.path)
+        return web.Response(body=b"png-bytes", content_type="image/png")
+
+    app = web.Application()
+    app.router.add_get("/{name}", image)
+    server = TestServer(app)
+    await server.start_server()
+    cache = ImageCache(root=tmp_path / "cache")
+    downloader = ImageDownloader(cache=cache)
+    monkeypatch.setattr(publisher, "get_image_downloader", lambda: downloader)
+    try:
+        url = str(server.make_url("/miss"))
+        service = PublishService(output_base_dir=str(tmp_path / "publish"))
+        sections = [{"title": "章节", "content": "内容", "images": [url]}]
+        draft = await service.create_draft("主题", "摘要", ["发现"], sections)
+        again = await service.create_draft("主题", "摘要", ["发现"], sections)
+    finally:
+        await downloader.close()
+        await server.close()
+
+    # 未命中时下载并写入缓存，第二次直接读缓存
+    assert requests == ["/miss"]
+    assert cache.get(url).data == b"png-bytes"
+    assert len(draft.section_images) == len(again.section_images) == 1
+    with open(draft.section_images[0], "rb") as f:
+        assert f.read() == b"png-bytes"
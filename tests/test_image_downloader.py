@@ -0,0 +1,153 @@
+"""共享图片下载器测试"""
+import asyncio
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from rednote_research.services.image_downloader import ImageDownloader
+
+
+@pytest.mark.asyncio
+async def test_fetch_many_bounds_per_host_concurrency_and_reports_failures():
+    active = {"now": 0, "peak": 0}
+
+    async def image(request):
+        active["now"] += 1
+        active["peak"] = max(active["peak"], active["now"])
+        await asyncio.sleep(0.02)
+        active["now"] -= 1
+        return web.Response(body=request.match_info["name"].encode() * 10, content_type="image/png")
+
+    async def missing(request):
+        return web.Response(status=404)
+
+    app = web.Application()
+    app.router.add_get("/img/{name}", image)
+    app.router.add_get("/missing", missing)
+    server = TestServer(app)
+    await server.start_server()
+    downloader = ImageDownloader(concurrency=8, per_host=3)
+    try:
+        urls = [str(server.make_url(f"/img/{i}")) for i in range(10)] + [str(server.make_url("/missing"))]
+        images, stats = await downloader.fetch_many(urls)
+    finally:
+        await downloader.close()
+        await server.close()
+
+    assert [img.data[:1] for img in images[:10]] == [str(i).encode()[:1] for i in range(10)]
+    assert images[0].to_data_uri().startswith("data:image/png;base64,")
+    assert images[10] is None
+    assert active["peak"] <= 3
+    assert (stats.total, stats.succeeded, stats.failed) == (11, 10, 1)
+    assert stats.errors == {"HTTP 404": 1}
+    assert stats.bytes == sum(len(img.data) for img in images[:10])
+
+
+def test_session_from_previous_event_loop_is_closed():
+    async def image(request):
+        return web.Response(body=b"img", content_type="image/png")
+
+    downloader = ImageDownloader()
+
+    async def fetch_once():
+        app = web.Application()
+        app.router.add_get("/img", image)
+        server = TestServer(app)
+        await server.start_server()
+        try:
+            assert await downloader.fetch(str(server.make_url("/img"))) is not None
+        finally:
+            await server.close()
+        return downloader._session
+
+    first = asyncio.run(fetch_once())
+    second = asyncio.run(fetch_once())
+    asyncio.run(downloader.close())
+
+    assert first is not second
+    assert first.closed and second.closed
+
+
+def test_vlm_singletons_follow_settings_changes(monkeypatch):
+    from rednote_research.services import image_downloader, image_preprocess, rate_limit
+    from rednote_research.services.settings import get_settings_service
+
+    service = get_settings_service()
+    settings = service.load().model_copy(deep=True)
+    monkeypatch.setattr(service, "load", lambda: settings)
+    for module, name in ((rate_limit, "_vlm_limiter"), (image_downloader, "_downloader"), (image_preprocess, "_preprocessor")):
+        monkeypatch.setattr(module, name, None)
+    monkeypatch.setattr(image_downloader, "_retired_downloaders", [])
+
+    settings.vlm.rate_limit_mode = True
+    limiter, downloader, preprocessor = (
+        rate_limit.get_vlm_rate_limiter(), image_downloader.get_image_downloader(), image_preprocess.get_image_preprocessor()
+    )
+    assert rate_limit.get_vlm_rate_limiter() is limiter and limiter.rate > 0
+    assert image_downloader.get_image_downloader() is downloader
+    assert image_preprocess.get_image_preprocessor() is preprocessor
+
+    settings.vlm.rate_limit_mode = False
+    settings.vlm.download_concurrency += 1
+    settings.vlm.image_max_side = 512
+    assert rate_limit.get_vlm_rate_limiter().rate == 0
+    assert image_downloader.get_image_downloader().concurrency == downloader.concurrency + 1
+    assert image_downloader._retired_downloaders == [downloader]
+    resized = image_preprocess.get_image_preprocessor()
+    assert resized.max_side == 512 and resized.executor is preprocessor.executor
+
+
+def test_concurrent_calls_on_new_event_loop_rebuild_once():
+    downloader = ImageDownloader()
+    discard = downloader._discard_session
+
+    async def slow_discard(*args):
+        await asyncio.sleep(0.01)  # 关闭旧会话期间让出事件循环
+        await discard(*args)
+
+    downloader._discard_session = slow_discard
+
+    async def open_sessions():
+        async def open_one():
+            session = await downloader._get_session()
+            return session, downloader._slots
+
+        return await asyncio.gather(*[open_one() for _ in range(5)])
+
+    first = asyncio.run(open_sessions())
+    second = asyncio.run(open_sessions())
+    asyncio.run(downloader.close())
+
+    assert len({id(session) for session, _ in second}) == 1
+    assert len({id(slots) for _, slots in second}) == 1
+    assert first[0][0].closed and second[0][0].closed
+
+
+@pytest.mark.asyncio
+async def test_retired_downloader_closes_after_in_flight_fetch():
+    release = asyncio.Event()
+
+    async def image(request):
+        await release.wait()
+        return web.Response(body=b"img", content_type="image/png")
+
+    app = web.Application()
+    app.router.add_get("/img", image)
+    server = TestServer(app)
+    await server.start_server()
+    downloader = ImageDownloader()
+    try:
+        pending = asyncio.create_task(downloader.fetch(str(server.make_url("/img"))))
+        while downloader._session is None:
+            await asyncio.sleep(0.01)
+        session = downloader._session
+
+        downloader.retire()
+        assert not session.closed  # 进行中的下载不受影响
+        release.set()
+        assert await pending is not None
+        assert session.closed
+    finally:
+        await downloader.close()
+        await server.close()
@@ -0,0 +1,123 @@
+"""近似重复图片检测测试"""
+import io
+import json
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+
+from rednote_research.output.image_analyzer import ImageAnalyzer
+from rednote_research.output.image_assigner import ImageAssigner
+from rednote_research.services.image_downloader import DownloadedImage, DownloadStats
+from rednote_research.services.image_hash import NearDuplicateIndex, image_hashes
+from rednote_research.services.image_preprocess import ImagePreprocessor
+from rednote_research.services.rate_limit import TokenBucket
+from rednote_research.state import ImageAnalysisResult
+
+
+def scene(seed: int, size=(800, 1000)) -> Image.Image:
+    rng = np.random.default_rng(seed)
+    img = Image.new("RGB", size, tuple(int(c) for c in rng.integers(0, 255, 3)))
+    draw = ImageDraw.Draw(img)
+    for _ in range(20):
+        x, y = rng.integers(0, size[0]), rng.integers(0, size[1])
+        w, h = rng.integers(40, 400, 2)
+        draw.ellipse([x, y, x + w, y + h], fill=tuple(int(c) for c in rng.integers(0, 255, 3)))
+    return img
+
+
+def encode(img: Image.Image, fmt="JPEG", **kwargs) -> bytes:
+    out = io.BytesIO()
+    img.save(out, format=fmt, **kwargs)
+    return out.getvalue()
+
+
+def variants() -> dict[str, bytes]:
+    base = scene(0)
+    return {
+        "http://x/original": encode(base, quality=95),                    # 原图
+        "http://x/other": encode(scene(1)),                               # 不同图片
+        "http://x/small": encode(base.resize((400, 500)), quality=60),    # 转发的缩小版
+        "http://x/webp": encode(base, "WEBP", quality=50),                # 换格式
+    }
+
+
+def test_reposted_variants_match_first_seen_representative():
+    index = NearDuplicateIndex()
+    matches = {url: index.match(url, image_hashes(data)) for url, data in variants().items()}
+
+    assert matches == {
+        "http://x/original": None,
+        "http://x/other": None,
+        "http://x/small": "http://x/original",
+        "http://x/webp": "http://x/original",
+    }
+    assert index.urls == ["http://x/original", "http://x/other"]
+
+
+class VariantDownloader:
+    def __init__(self, datas: dict[str, bytes]):
+        self.datas = datas
+
+    async def fetch_many(self, urls):
+        return [DownloadedImage(url, self.datas[url]) for url in urls], DownloadStats(total=len(urls), succeeded=len(urls))
+
+
+class CountingVLM:
+    def __init__(self):
+        self.images = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, messages, **kwargs):
+        count = len(messages[0]["content"]) - 1
+        self.images += count
+        items = [{"image_index": i, "description": "图", "quality_score": 8} for i in range(count)]
+        message = SimpleNamespace(content=json.dumps({"analyses": items}))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+@pytest.mark.asyncio
+async def test_analyzer_sends_one_image_per_cluster_and_assigner_uses_it_once():
+    datas = variants()
+    analyzer = ImageAnalyzer()
+    analyzer.settings = analyzer.settings.model_copy(deep=True)
+    analyzer.settings.vlm.image_dedup = True
+    analyzer.settings.vlm.prescreen = False
+    analyzer.vlm_client = CountingVLM()
+    analyzer.downloader = VariantDownloader(datas)
+    analyzer.preprocessor = ImagePreprocessor(max_side=0)
+    analyzer.analysis_cache = None
+    analyzer.spill_cache = None
+    analyzer.rate_limiter = TokenBucket(rate=0, burst=1)
+
+    analyses, _ = await analyzer._analyze_images_batch(list(datas), "露营")
+
+    # 同簇的缩小版和 webp 不送入 VLM，只记录到代表图
+    assert analyzer.vlm_client.images == 2
+    assert set(analyses) == {"http://x/original", "http://x/other"}
+    duplicates = analyzer.image_duplicates
+    assert duplicates == {"http://x/small": "http://x/original", "http://x/webp": "http://x/original"}
+
+    # 代表图分配给一个章节后，整簇都视为已使用
+    assigner = ImageAssigner()
+    first = assigner._find_candidates(analyses, "章节一", "", [], [], [], duplicates, limit=1)
+    assigner._mark_used(first[0][0], duplicates)
+    assert first[0][0] == "http://x/original"
+    assert assigner.used_images >= set(datas) - {"http://x/other"}
+    second = assigner._find_candidates(analyses, "章节二", "", [], [], [], duplicates)
+    assert [url for url, _, _ in second] == ["http://x/other"]
+
+
+def test_assigner_treats_cluster_as_one_image():
+    analyses = {
+        "rep": ImageAnalysisResult(image_url="rep", quality_score=9),
+        "dup": ImageAnalysisResult(image_url="dup", quality_score=9),
+        "other": ImageAnalysisResult(image_url="other", quality_score=5),
+    }
+    assigner = ImageAssigner()
+    assigner._mark_used("rep", {"dup": "rep"})
+
+    candidates = assigner._find_candidates(analyses, "章节", "", [], [], [], {"dup": "rep"})
+
+    assert [url for url, _, _ in candidates] == ["other"]
@@ -0,0 +1,47 @@
+"""VLM 图片预处理测试"""
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from rednote_research.services.image_downloader import DownloadedImage
+from rednote_research.services.image_preprocess import ImagePreprocessor, downscale_image
+
+
+def encode(img: Image.Image, fmt: str, **kwargs) -> bytes:
+    out = io.BytesIO()
+    img.save(out, format=fmt, **kwargs)
+    return out.getvalue()
+
+
+def test_downscale_strips_metadata_and_flattens_alpha():
+    exif = Image.Exif()
+    exif[0x0110] = "Camera"
+    data = encode(Image.new("RGBA", (3000, 1500), (255, 0, 0, 0)), "PNG", exif=exif)
+
+    out, content_type, resized = downscale_image(data, max_side=1024)
+
+    img = Image.open(io.BytesIO(out))
+    assert (content_type, resized, img.format, img.size) == ("image/jpeg", True, "JPEG", (1024, 512))
+    assert not img.getexif()
+    assert img.getpixel((10, 10)) == (255, 255, 255)  # 透明区域铺白
+
+
+def test_small_image_keeps_original_bytes():
+    noise = np.random.default_rng(0).integers(0, 256, (100, 200, 3), dtype=np.uint8)
+    data = encode(Image.fromarray(noise), "JPEG", quality=30)
+    assert downscale_image(data, max_side=1024) == (data, "image/jpeg", False)
+
+
+@pytest.mark.asyncio
+async def test_process_many_keeps_undecodable_images():
+    big = DownloadedImage("a", encode(Image.new("RGB", (2048, 2048), (0, 128, 0)), "PNG"), "image/png")
+    broken = DownloadedImage("b", b"not an image")
+
+    images, stats = await ImagePreprocessor(max_side=512, fmt="webp").process_many([big, broken, None])
+
+    assert images[0].content_type == "image/webp"
+    assert Image.open(io.BytesIO(images[0].data)).size == (512, 512)
+    assert images[1] is broken and images[2] is None
+    assert (stats.count, stats.resized, stats.failed) == (2, 1, 1)
@@ -0,0 +1,60 @@
+"""图片本地预筛测试"""
+import io
+
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw, ImageFilter
+
+from rednote_research.services.image_prescreen import prescreen_image
+
+
+def scene(seed: int, size=(800, 1000)) -> Image.Image:
+    rng = np.random.default_rng(seed)
+    img = Image.new("RGB", size, tuple(int(c) for c in rng.integers(0, 255, 3)))
+    draw = ImageDraw.Draw(img)
+    for _ in range(20):
+        x, y = rng.integers(0, size[0]), rng.integers(0, size[1])
+        w, h = rng.integers(40, 400, 2)
+        draw.ellipse([x, y, x + w, y + h], fill=tuple(int(c) for c in rng.integers(0, 255, 3)))
+    return img
+
+
+def encode(img: Image.Image) -> bytes:
+    out = io.BytesIO()
+    img.convert("RGB").save(out, format="JPEG", quality=90)
+    return out.getvalue()
+
+
+def with_qr(img: Image.Image, box=(500, 600), modules=25, module_px=8) -> Image.Image:
+    """在图片上贴一个带三个定位图案的二维码"""
+    rng = np.random.default_rng(0)
+    grid = rng.integers(0, 2, (modules, modules)).astype(bool)
+    for r, c in ((0, 0), (0, modules - 7), (modules - 7, 0)):
+        grid[max(r - 1, 0):r + 8, max(c - 1, 0):c + 8] = False
+        grid[r:r + 7, c:c + 7] = True
+        grid[r + 1:r + 6, c + 1:c + 6] = False
+        grid[r + 2:r + 5, c + 2:c + 5] = True
+    code = np.pad(~grid, 4, constant_values=True).repeat(module_px, 0).repeat(module_px, 1)
+    img = img.copy()
+    img.paste(Image.fromarray(code.astype(np.uint8) * 255).convert("RGB"), box)
+    return img
+
+
+@pytest.mark.parametrize("img, reason", [
+    (scene(0).resize((96, 96)), "尺寸过小"),
+    (scene(0).resize((1200, 200)), "长宽比异常"),
+    (Image.new("RGB", (800, 1000), (245, 245, 245)), "近似纯色"),
+    (scene(0).filter(ImageFilter.GaussianBlur(6)), "严重模糊"),
+    (with_qr(scene(3, (1080, 1440))), "二维码"),
+])
+def test_obvious_rejects(img, reason):
+    result = prescreen_image(encode(img))
+    assert result.reject and reason in result.reason
+
+
+def test_normal_and_undecodable_images_pass():
+    assert not prescreen_image(encode(scene(1, (1080, 1440)))).reject
+    # 随机黑白块与二维码纹理相似，但没有定位图案
+    blocks = (np.random.default_rng(1).integers(0, 2, (60, 60)) * 255).astype(np.uint8)
+    assert not prescreen_image(encode(Image.fromarray(blocks).resize((1080, 1080), Image.NEAREST))).reject
+    assert not prescreen_image(b"not an image").reject
@@ -0,0 +1,148 @@
+"""图片验证测试：多图一次请求、并发请求、按图片哈希 + 上下文哈希缓存"""
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from rednote_research.agents.image_validator import ImageValidator
+from rednote_research.services.image_validation_cache import ImageValidationCache
+from rednote_research.services.rate_limit import TokenBucket
+from rednote_research.services.settings import get_settings_service
+
+
+class FakeVLM:
+    """按图片数返回逐张判断：图片字节以 b"bad" 开头的判为不相关"""
+
+    def __init__(self, drop_last: bool = False):
+        self.requests = []
+        self.inflight = 0
+        self.max_inflight = 0
+        self.drop_last = drop_last
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        self.inflight += 1
+        self.max_inflight = max(self.max_inflight, self.inflight)
+        await asyncio.sleep(0.05)
+        self.inflight -= 1
+        content = json.loads(request.content)["messages"][0]["content"]
+        urls = [part["image_url"]["url"] for part in content if part["type"] == "image_url"]
+        self.requests.append(urls)
+        items = [
+            {
+                "image_index": i,
+                "is_relevant": not url.startswith("data:image/jpeg;base64,YmFk"),
+                "confidence": 0.9,
+                "reason": f"图片{i}",
+                "suggested_action": "keep"
+            }
+            for i, url in enumerate(urls)
+        ]
+        if self.drop_last:
+            items = items[:-1]
+        message = {"content": json.dumps({"results": items}, ensure_ascii=False)}
+        return httpx.Response(200, json={"choices": [{"message": message}]})
+
+
+@pytest.fixture
+def vlm_settings(monkeypatch):
+    """每次 load() 返回同一份可修改的配置（模拟设置页保存）"""
+    service = get_settings_service()
+    settings = service.load().model_copy(deep=True)
+    settings.vlm.enabled = True
+    settings.vlm.api_key = "test"
+    monkeypatch.setattr(service, "load", lambda: settings)
+    return settings.vlm
+
+
+def make_validator(vlm: FakeVLM, tmp_path) -> ImageValidator:
+    validator = ImageValidator(
+        transport=httpx.MockTransport(vlm.handler),
+        cache=ImageValidationCache(path=tmp_path / "validations.json")
+    )
+    validator.rate_limiter = TokenBucket(rate=0, burst=1)
+    return validator
+
+
+@pytest.mark.asyncio
+async def test_validate_many_batches_images_concurrently(tmp_path, vlm_settings):
+    vlm_settings.validate_batch_size = 3
+    vlm_settings.validate_concurrency = 2
+    vlm = FakeVLM()
+    validator = make_validator(vlm, tmp_path)
+    images = [f"good-{i}".encode() for i in range(7)] + [b"bad-image"]
+
+    results = await validator.validate_many(images, "成都美食", "旅行")
+    await validator.close()
+
+    assert [len(urls) for urls in vlm.requests] == [3, 3, 2]
+    assert vlm.max_inflight == 2
+    assert [r.is_relevant for r in results] == [True] * 7 + [False]
+
+
+@pytest.mark.asyncio
+async def test_validate_many_caches_by_image_and_context(tmp_path, vlm_settings):
+    vlm = FakeVLM()
+    validator = make_validator(vlm, tmp_path)
+    images = [b"good-1", b"good-2", b"good-1"]
+
+    first = await validator.validate_many(images, "成都美食")
+    assert len(vlm.requests) == 1 and len(vlm.requests[0]) == 2  # 同一张图只发送一次
+    assert first[0] == first[2]
+
+    await validator.validate_many(images, "成都美食")
+    assert len(vlm.requests) == 1
+    assert validator.cache_hits == 3
+
+    # 上下文变化时重新验证；缓存落盘后新实例可复用
+    await validator.validate_many(images[:1], "重庆火锅")
+    assert len(vlm.requests) == 2
+    reloaded = make_validator(vlm, tmp_path)
+    await reloaded.validate_many(images, "成都美食")
+    assert len(vlm.requests) == 2
+    await validator.close()
+
+
+@pytest.mark.asyncio
+async def test_missing_verdicts_default_to_keep_and_are_not_cached(tmp_path, vlm_settings):
+    vlm = FakeVLM(drop_last=True)
+    validator = make_validator(vlm, tmp_path)
+
+    results = await validator.validate_many([b"good-1", b"bad-2"], "成都美食")
+    await validator.close()
+
+    assert results[0].reason == "图片0"
+    assert results[1].suggested_action == "keep" and results[1].confidence == 0.5
+    assert len(validator.cache) == 1
+
+
+@pytest.mark.asyncio
+async def test_settings_changes_apply_to_shared_validator(tmp_path, vlm_settings):
+    vlm = FakeVLM()
+    validator = make_validator(vlm, tmp_path)
+
+    vlm_settings.enabled = False
+    disabled = await validator.validate(b"good-1", "成都美食")
+    assert disabled.reason == "VLM 验证未启用" and not vlm.requests
+
+    vlm_settings.enabled = True
+    vlm_settings.validate_batch_size = 1
+    await validator.validate_many([b"good-1", b"good-2"], "成都美食")
+    assert [len(urls) for urls in vlm.requests] == [1, 1]
+
+    # 换模型后缓存版本变化，重新验证
+    vlm_settings.model = "another-model"
+    await validator.validate_many([b"good-1"], "成都美食")
+    assert len(vlm.requests) == 3
+    await validator.close()
+
+
+def test_client_from_previous_event_loop_is_closed(tmp_path):
+    validator = make_validator(FakeVLM(), tmp_path)
+
+    first = asyncio.run(validator._get_client())
+    second = asyncio.run(validator._get_client())
+    asyncio.run(validator.close())
+
+    assert first is not second
+    assert first.is_closed and second.is_closed
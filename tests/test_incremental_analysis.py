@@ -0,0 +1,77 @@
+"""增量分析测试"""
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from rednote_research.agents.analyzer import AnalyzerAgent
+from rednote_research.state import NoteData, NoteDetail, NotePreview, ResearchState
+
+
+class StubLLM:
+    def __init__(self):
+        self.prompts: list[str] = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, **params):
+        self.prompts.append(params["messages"][1]["content"])
+        content = json.dumps({"key_findings": [{"statement": "ok", "source_ids": [1]}], "needs_more_data": False})
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+
+
+def note(note_id: str) -> NoteData:
+    return NoteData(preview=NotePreview(id=note_id, title=note_id), detail=NoteDetail(title=note_id, content="短内容"))
+
+
+@pytest.fixture
+def agent():
+    return AnalyzerAgent(StubLLM(), model="stub")
+
+
+@pytest.mark.asyncio
+async def test_only_new_notes_are_sent_with_remapped_previous_insights(agent):
+    state = ResearchState(
+        task="t",
+        documents=[note("c"), note("a"), note("b"), note("new")],
+        insights={"key_findings": [{"statement": "旧观点", "source_ids": [1, 2]}]},
+        analyzed_note_ids=["a", "b", "c"],
+    )
+    await agent._analyze_documents(state)
+
+    prompt = agent.llm.prompts[-1]
+    assert "笔记 4: new" in prompt
+    assert "笔记 1: c" not in prompt
+    assert '"source_ids": [\n        2,\n        3\n      ]' in prompt
+    assert state.analyzed_note_ids == ["c", "a", "b", "new"]
+
+
+@pytest.mark.asyncio
+async def test_large_delta_falls_back_to_full_analysis(agent):
+    state = ResearchState(
+        task="t",
+        documents=[note("a"), note("x"), note("y")],
+        insights={"key_findings": []},
+        analyzed_note_ids=["a"],
+    )
+    await agent._analyze_documents(state)
+    assert "上一轮分析结果" not in agent.llm.prompts[-1]
+    assert "笔记 1: a" in agent.llm.prompts[-1]
+
+
+@pytest.mark.asyncio
+async def test_unparseable_incremental_update_keeps_remapped_insights(agent):
+    async def broken(**params):
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="无法解析"))], usage=None)
+
+    agent.llm.chat.completions.create = broken
+    state = ResearchState(
+        task="t",
+        documents=[note("c"), note("a"), note("b"), note("new")],
+        insights={"key_findings": [{"statement": "旧观点", "source_ids": [1, 2]}], "needs_more_data": True},
+        analyzed_note_ids=["a", "b", "c"],
+    )
+    insights = await agent._analyze_documents(state)
+
+    assert insights["key_findings"][0]["source_ids"] == [2, 3]
+    assert insights["needs_more_data"] is False
+    assert state.analyzed_note_ids == ["c", "a", "b", "new"]
@@ -0,0 +1,52 @@
+"""登录状态监控测试"""
+import asyncio
+
+import pytest
+
+from rednote_research.services.login_monitor import LoginStatusMonitor
+
+
+class StubClient:
+    def __init__(self):
+        self.calls = 0
+        self.logged_in = True
+
+    async def check_login_status(self) -> dict:
+        self.calls += 1
+        return {"is_logged_in": self.logged_in, "username": "tester"}
+
+
+@pytest.mark.asyncio
+async def test_status_is_cached_within_ttl():
+    client = StubClient()
+    monitor = LoginStatusMonitor(client, ttl=60)
+
+    await asyncio.gather(*(monitor.get_status() for _ in range(5)))
+    assert client.calls == 1
+
+    await monitor.get_status(force=True)
+    assert client.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_background_refresh_pushes_expiry_to_subscribers():
+    client = StubClient()
+    monitor = LoginStatusMonitor(client, ttl=60, refresh_interval=0.01)
+    queue = monitor.subscribe()
+
+    monitor.start()
+    assert (await asyncio.wait_for(queue.get(), 1))["is_logged_in"] is True
+
+    client.logged_in = False
+    expired = await asyncio.wait_for(queue.get(), 1)
+    await monitor.stop()
+
+    assert expired["is_logged_in"] is False
+    assert monitor.status["is_logged_in"] is False
+
+
+def test_refresh_interval_must_be_shorter_than_ttl():
+    assert LoginStatusMonitor(StubClient()).refresh_interval < LoginStatusMonitor(StubClient()).ttl
+
+    monitor = LoginStatusMonitor(StubClient(), ttl=30, refresh_interval=60)
+    assert monitor.refresh_interval == 10
@@ -0,0 +1,77 @@
+"""多账号 MCP 服务池测试"""
+import asyncio
+
+import httpx
+import pytest
+
+from rednote_research.mcp.fake_server import FakeServerConfig, create_fake_app
+from rednote_research.mcp.pool import MCPEndpointPool, TokenBucket
+
+
+def make_pool(*configs: dict, **pool_options) -> tuple[MCPEndpointPool, dict]:
+    apps = {}
+    for index, overrides in enumerate(configs):
+        options = {"search_latency": "fixed:0.02", "detail_latency": "fixed:0", "login_latency": "fixed:0", "seed": index}
+        options.update(overrides)
+        apps[f"http://mcp-{index}"] = create_fake_app(FakeServerConfig(**options))
+    pool = MCPEndpointPool(
+        list(apps),
+        transport_factory=lambda url: httpx.ASGITransport(app=apps[url]),
+        **pool_options
+    )
+    return pool, apps
+
+
+@pytest.mark.asyncio
+async def test_searches_are_spread_and_details_follow_token_owner():
+    pool, apps = make_pool({}, {}, qps_per_account=0)
+    async with pool:
+        results = await asyncio.gather(*(pool.search_feeds(f"关键词{i}") for i in range(6)))
+        notes, tokens = results[0]
+        detail = await pool.get_feed_detail(notes[0].id, tokens[notes[0].id])
+
+    searches = [app.state.stats["search"]["ok"] for app in apps.values()]
+    assert searches == [3, 3]
+    assert detail.title
+    owner = pool._token_owner[notes[0].id]
+    assert apps[owner.name].state.stats["detail"]["ok"] == 1
+
+
+@pytest.mark.asyncio
+async def test_expired_account_is_removed_from_rotation():
+    pool, apps = make_pool({}, {"logged_in": False}, qps_per_account=0)
+    async with pool:
+        status = await pool.check_login_status()
+        assert status["is_logged_in"] is True
+        assert pool.healthy_count == 1
+
+        await asyncio.gather(*(pool.search_feeds(f"关键词{i}") for i in range(4)))
+
+    assert apps["http://mcp-0"].state.stats["search"]["ok"] == 4
+    assert "search" not in apps["http://mcp-1"].state.stats
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_enforces_account_quota():
+    bucket = TokenBucket(rate=20, burst=1)
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    for _ in range(3):
+        await bucket.acquire()
+    assert loop.time() - started >= 0.09
+
+
+@pytest.mark.asyncio
+async def test_detail_fails_fast_when_token_owner_is_unavailable():
+    pool, apps = make_pool({}, {}, qps_per_account=0)
+    async with pool:
+        notes, tokens = await pool.search_feeds("关键词")
+        owner = pool._token_owner[notes[0].id]
+        owner.healthy = False
+
+        with pytest.raises(Exception, match="签发 xsec_token 的账号不可用"):
+            await pool.get_feed_detail(notes[0].id, tokens[notes[0].id])
+
+    other = next(account for account in pool.accounts if account is not owner)
+    assert "detail" not in apps[other.name].state.stats
+    assert other.consecutive_failures == 0
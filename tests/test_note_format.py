@@ -0,0 +1,27 @@
+"""紧凑笔记格式测试"""
+from rednote_research.services.note_format import clean_text, format_count, format_notes_compact
+from rednote_research.state import NoteData, NoteDetail, NotePreview
+
+
+def test_clean_text_strips_tags_emoji_and_whitespace():
+    raw = "﻿#家居[话题]#﻿ 好看😍[笑哭R]！\n\n ✨真的✨  绝了"
+    assert clean_text(raw) == "好看！ 真的 绝了"
+
+
+def test_compact_format_has_single_header_and_one_line_per_note():
+    notes = [
+        NoteData(
+            preview=NotePreview(id="a"),
+            detail=NoteDetail(title="露营|清单", author="小王", likes=12345, tags=["露营", "装备"],
+                              images=["u1", "u2"], content="帐篷\n睡袋 #露营[话题]#")
+        ),
+        NoteData(preview=NotePreview(id="b", title="咖啡", likes=8)),
+    ]
+    text = format_notes_compact(notes, numbers=[3, 7], include_images=True)
+
+    assert text.splitlines() == [
+        "序号|标题|作者|赞|标签|图|内容|图片链接",
+        "3|露营｜清单|小王|1.2w|露营,装备|2|帐篷 睡袋|u1 u2",
+        "7|咖啡||8||0||",
+    ]
+    assert format_count(20000) == "2w"
@@ -0,0 +1,121 @@
+"""笔记摘要缓存测试"""
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from rednote_research.agents.summarizer import SummarizerAgent
+from rednote_research.services.note_summary import NoteSummaryCache, notes_to_summarize, select_note_texts
+from rednote_research.state import NoteData, NoteDetail, NotePreview, ResearchState
+
+
+def note(note_id: str, content: str) -> NoteData:
+    return NoteData(preview=NotePreview(id=note_id), detail=NoteDetail(title=note_id, content=content))
+
+
+class StubLLM:
+    """按请求中的笔记数返回摘要，并记录调用次数"""
+
+    def __init__(self):
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, **params):
+        self.calls += 1
+        count = params["messages"][1]["content"].count("### 笔记")
+        content = json.dumps({str(i + 1): f"摘要{i + 1}" for i in range(count)}, ensure_ascii=False)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+
+
+def test_select_note_texts_replaces_longest_notes_first():
+    notes = [note("short", "短" * 50), note("long", "长" * 500), note("mid", "中" * 200)]
+    summaries = {"long": "长笔记摘要", "mid": "中笔记摘要"}
+
+    assert select_note_texts(notes, summaries, 1000)[1] == "长" * 500
+    texts = select_note_texts(notes, summaries, 300)
+    assert texts == ["短" * 50, "长笔记摘要", "中" * 200]
+
+
+@pytest.mark.asyncio
+async def test_summaries_are_batched_and_reused_across_runs(tmp_path):
+    cache = NoteSummaryCache(tmp_path / "summaries.json")
+    llm = StubLLM()
+    agent = SummarizerAgent(llm, model="stub", cache=cache)
+    documents = [note(f"n{i}", "内容" * 200) for i in range(10)] + [note("tiny", "短")]
+
+    state = await agent.run(ResearchState(task="t", documents=documents))
+    assert llm.calls == 2  # 10 篇长笔记分两批
+    assert len(state.note_summaries) == 10 and "tiny" not in state.note_summaries
+
+    fresh = SummarizerAgent(llm, model="stub", cache=NoteSummaryCache(tmp_path / "summaries.json"))
+    again = await fresh.run(ResearchState(task="t2", documents=documents))
+    assert llm.calls == 2
+    assert again.note_summaries == state.note_summaries
+
+
+def test_only_notes_replaced_under_budget_are_summarized():
+    notes = [note("short", "短" * 50), note("long", "长" * 500), note("mid", "中" * 200)]
+
+    assert notes_to_summarize(notes, {}, 1000) == []
+    assert [n.preview.id for n in notes_to_summarize(notes, {}, 400)] == ["long"]
+    assert [n.preview.id for n in notes_to_summarize(notes, {}, 250)] == ["long", "mid"]
+    assert [n.preview.id for n in notes_to_summarize(notes, {"long": "摘要"}, 250)] == ["mid"]
+    assert notes_to_summarize(notes, {}, 250, min_chars=600) == []
+
+
+@pytest.mark.asyncio
+async def test_analyzer_skips_summaries_when_notes_fit_budget(tmp_path, monkeypatch):
+    from rednote_research.agents.analyzer import AnalyzerAgent
+    from rednote_research.services import settings as settings_module
+
+    prompt = settings_module.get_settings_service().load().prompt.model_copy(update={"analyzer_note_budget": 2000})
+    loaded = settings_module.get_settings_service().load().model_copy(update={"prompt": prompt})
+    monkeypatch.setattr(settings_module.get_settings_service(), "load", lambda: loaded)
+    llm = StubLLM()
+    agent = AnalyzerAgent(llm, model="stub")
+    agent.summarizer = SummarizerAgent(llm, model="stub", cache=NoteSummaryCache(tmp_path / "summaries.json"))
+
+    fits = ResearchState(task="t", documents=[note(f"n{i}", "内容" * 200) for i in range(4)])
+    await agent._summarize_for_budget(fits, fits.documents)
+    assert llm.calls == 0
+
+    over = ResearchState(task="t", documents=[note(f"n{i}", "内容" * 200) for i in range(8)])
+    await agent._summarize_for_budget(over, over.documents)
+    assert llm.calls == 1
+    assert 0 < len(over.note_summaries) < 8
+
+
+@pytest.mark.asyncio
+async def test_analyzer_summarizes_for_smaller_section_budget(tmp_path, monkeypatch):
+    from rednote_research.agents.analyzer import AnalyzerAgent
+    from rednote_research.services import settings as settings_module
+
+    prompt = settings_module.get_settings_service().load().prompt.model_copy(
+        update={"analyzer_note_budget": 24000, "outline_note_budget": 24000, "section_note_budget": 1000}
+    )
+    loaded = settings_module.get_settings_service().load().model_copy(update={"prompt": prompt})
+    monkeypatch.setattr(settings_module.get_settings_service(), "load", lambda: loaded)
+    llm = StubLLM()
+    agent = AnalyzerAgent(llm, model="stub")
+    agent.summarizer = SummarizerAgent(llm, model="stub", cache=NoteSummaryCache(tmp_path / "summaries.json"))
+
+    # 分析预算放得下，但章节预算放不下：仍生成摘要
+    state = ResearchState(task="t", documents=[note(f"n{i}", "内容" * 200) for i in range(4)])
+    await agent._summarize_for_budget(state, state.documents)
+    assert llm.calls == 1
+    texts = select_note_texts(state.documents, state.note_summaries, 1000)
+    assert any(text.startswith("摘要") for text in texts)
+
+
+def test_summary_cache_evicts_least_recently_used(tmp_path):
+    cache = NoteSummaryCache(tmp_path / "summaries.json", max_entries=2)
+    a, b, c = note("a", "甲"), note("b", "乙"), note("c", "丙")
+    cache.put(a, "A")
+    cache.put(b, "B")
+    assert cache.get(a) == "A"  # a 变为最近使用
+    cache.put(c, "C")
+    cache.save()
+
+    reloaded = NoteSummaryCache(tmp_path / "summaries.json", max_entries=2)
+    assert len(reloaded) == 2
+    assert reloaded.get(b) is None and reloaded.get(a) == "A" and reloaded.get(c) == "C"
@@ -0,0 +1,40 @@
+"""Prompt 链接别名测试"""
+from rednote_research.services.prompt_alias import PromptAliases, parse_note_ref
+from rednote_research.state import NoteData, NotePreview
+
+IMG_A = "https://sns-webpic-qc.xhscdn.com/202401011200/abcdef/1040g2sg30a?imageView2/2/w/1080/format/webp"
+IMG_B = "https://sns-webpic-qc.xhscdn.com/202401011200/123456/1040g2sg31b!nd_dft_wlteh_webp_3"
+
+
+def test_aliases_are_stable_and_restored():
+    aliases = PromptAliases()
+    assert aliases.images([IMG_A, IMG_B, IMG_A]) == ["img_1", "img_2", "img_1"]
+    note_ref = aliases.note(NoteData(preview=NotePreview(id="n1", url="https://www.xiaohongshu.com/explore/n1")))
+    assert note_ref == "note_1"
+    assert aliases.note(NoteData(preview=NotePreview(id="n2"))) is None
+
+    html = (
+        '<img src="img_2" alt="img_1 以外"><img src="{img_1}">'
+        "<a href='note_1'>来源</a><img src=img_1><img src=\"img_12\"><span class=\"my_img_1\">"
+        "<p>正文提到 img_2 和 note_1</p>"
+    )
+    assert aliases.restore(html) == (
+        f'<img src="{IMG_B}" alt="img_1 以外"><img src="{IMG_A}">'
+        f"<a href='https://www.xiaohongshu.com/explore/n1'>来源</a><img src=\"{IMG_A}\">"
+        '<img src="img_12"><span class="my_img_1">'
+        "<p>正文提到 img_2 和 note_1</p>"
+    )
+
+
+def test_section_prompt_example_follows_alias_mode():
+    from rednote_research.prompts.section_writer import build_section_writer_prompt
+
+    assert 'src="img_1"' in build_section_writer_prompt(True)
+    plain = build_section_writer_prompt(False)
+    assert "img_" not in plain and "note_" not in plain
+    assert 'src="{图片链接}"' in plain
+
+
+def test_parse_note_ref():
+    # note_N 别名从 1 开始编号，不能当作从 0 开始的笔记下标
+    assert [parse_note_ref(v) for v in (3, "4", " 0 ", "note_5", "笔记6", True)] == [3, 4, 0, None, None, None]
@@ -0,0 +1,33 @@
+"""BM25 相关性排序测试"""
+from rednote_research.services.relevance import rank_notes, split_by_relevance
+from rednote_research.state import NoteData, NoteDetail, NotePreview
+
+
+def note(note_id: str, title: str, content: str = "", tags: list[str] = None) -> NoteData:
+    return NoteData(
+        preview=NotePreview(id=note_id, title=title),
+        detail=NoteDetail(title=title, content=content, tags=tags or [])
+    )
+
+
+def test_rank_notes_orders_by_topic_overlap_and_splits_borderline():
+    notes = [
+        note("unrelated", "今日份晚餐", "番茄炒蛋做法简单又下饭"),
+        note("strong", "新手露营装备清单", "帐篷睡袋防潮垫，露营装备一次买齐", tags=["露营"]),
+        note("weak", "周末去郊外", "天气很好，顺便看了看装备店"),
+    ]
+    ranked = rank_notes(notes, ["露营装备推荐", "预算"])
+
+    assert [item.note.preview.id for item in ranked] == ["strong", "weak", "unrelated"]
+    assert ranked[0].relevance == 1.0
+    assert ranked[-1].score == 0
+
+    relevant, borderline, irrelevant = split_by_relevance(ranked)
+    assert [item.note.preview.id for item in relevant] == ["strong"]
+    assert [item.note.preview.id for item in borderline] == ["weak"]
+    assert [item.note.preview.id for item in irrelevant] == ["unrelated"]
+
+
+def test_rank_notes_keeps_everything_when_nothing_matches():
+    ranked = rank_notes([note("a", "hello"), note("b", "world")], ["露营"])
+    assert all(item.relevance == 1.0 for item in ranked)
@@ -0,0 +1,63 @@
+"""搜索预算分配与全局排序测试"""
+import pytest
+from pydantic import ValidationError
+
+from rednote_research.services.search_budget import AdaptiveBudgetAllocator, rank_previews_globally
+from rednote_research.services.settings import SearchSettings, SettingsService
+from rednote_research.state import NoteData, NoteDetail, NotePreview
+
+
+def preview(note_id: str, likes: int = 0) -> NotePreview:
+    return NotePreview(id=note_id, title=note_id, likes=likes)
+
+
+def note(note_id: str, content: str) -> NoteData:
+    return NoteData(preview=preview(note_id), detail=NoteDetail(title=note_id, content=content))
+
+
+def test_allocator_respects_budget_and_skips_claimed_ids():
+    allocator = AdaptiveBudgetAllocator(total_budget=4, tranche=1, known_notes=[note("a", "旧笔记")])
+    allocator.add_keyword("k1", [preview("a", 100), preview("b", 50), preview("c", 10)])
+    allocator.add_keyword("k2", [preview("b", 50), preview("d", 5)])
+
+    first = allocator.first_tranche()
+    assert [(kw, p.id) for kw, p in first] == [("k1", "b"), ("k2", "d")]
+
+    rest = allocator.next_round(10)
+    assert [p.id for _, p in rest] == ["c"]
+    assert allocator.spent == 3
+
+
+def test_allocator_prefers_keyword_with_novel_content():
+    known = [note("old", "露营装备清单帐篷睡袋防潮垫")]
+    allocator = AdaptiveBudgetAllocator(total_budget=4, tranche=1, known_notes=known)
+    allocator.add_keyword("rich", [preview(f"r{i}") for i in range(5)])
+    allocator.add_keyword("stale", [preview(f"s{i}") for i in range(5)])
+
+    contents = {"rich": "咖啡豆烘焙手冲器具推荐", "stale": "露营装备清单帐篷睡袋防潮垫"}
+    for kw, p in allocator.first_tranche():
+        allocator.record(kw, note(p.id, contents[kw]))
+
+    assert allocator.marginal_yield("rich") > allocator.marginal_yield("stale")
+    assert [kw for kw, _ in allocator.next_round(1)] == ["rich"]
+
+
+def test_rank_previews_globally_dedups_and_rewards_coverage():
+    ranked = rank_previews_globally({
+        "k1": [preview("x", 100), preview("y", 100)],
+        "k2": [preview("y", 100), preview("z", 1000)],
+    }, known_ids={"z"})
+
+    assert [item.preview.id for item in ranked] == ["y", "x"]
+    assert ranked[0].keywords == ["k1", "k2"]
+
+
+def test_search_mode_typo_is_rejected(tmp_path, monkeypatch):
+    with pytest.raises(ValidationError):
+        SearchSettings(mode="adaptve")
+
+    service = SettingsService(config_path=tmp_path / "settings.json")
+    monkeypatch.setenv("SEARCH_MODE", "global-topk")
+    assert service.load().search.mode == "per_keyword"
+    monkeypatch.setenv("SEARCH_MODE", "global_topk")
+    assert service.load().search.mode == "global_topk"
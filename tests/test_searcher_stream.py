@@ -0,0 +1,66 @@
+"""流式搜索模式测试"""
+import asyncio
+
+import pytest
+
+from rednote_research.agents import searcher as searcher_module
+from rednote_research.agents.searcher import SearcherAgent
+from rednote_research.state import NoteData, NoteDetail, NotePreview, ResearchState
+
+
+class StubMCP:
+    """fast 关键词立即返回，slow 关键词需要等待"""
+
+    def __init__(self):
+        self.events: list[str] = []
+
+    async def search_notes(self, keyword: str, limit: int = 10) -> list[NotePreview]:
+        await asyncio.sleep(0.1 if keyword == "slow" else 0)
+        self.events.append(f"search:{keyword}")
+        return [NotePreview(id="shared", likes=100)] + [
+            NotePreview(id=f"{keyword}-{i}", likes=10 - i) for i in range(limit)
+        ]
+
+    async def get_note_with_detail(self, preview: NotePreview, delay: float = 1.0) -> NoteData:
+        self.events.append(f"detail:{preview.id}")
+        # fast-0 与 slow-0 是搬运笔记（正文相同）
+        content = REPOST if preview.id in ("fast-0", "slow-0") else f"{preview.id} 的独立内容"
+        return NoteData(
+            preview=preview,
+            detail=NoteDetail(title=preview.id, content=content, images=[f"https://img/{preview.id}.jpg"])
+        )
+
+
+REPOST = "周末去露营一定要带的装备清单，帐篷睡袋防潮垫缺一不可，新手照着买不踩坑，营地选在湖边风景超级好"
+
+
+class StubDownloader:
+    def __init__(self, events: list[str]):
+        self.events = events
+
+    async def fetch_many(self, urls: list[str]):
+        self.events.extend(f"image:{url}" for url in urls)
+        return [None] * len(urls), None
+
+
+@pytest.mark.asyncio
+async def test_stream_mode_overlaps_detail_fetch_with_slow_searches(monkeypatch):
+    monkeypatch.setenv("SEARCH_MODE", "stream")
+    monkeypatch.setenv("SEARCH_NOTES_PER_KEYWORD", "2")
+    monkeypatch.setenv("VLM_ENABLED", "true")
+    mcp = StubMCP()
+    monkeypatch.setattr(searcher_module, "get_image_downloader", lambda: StubDownloader(mcp.events))
+    searcher = SearcherAgent(None, mcp, model="stub")
+
+    state = await searcher.run(ResearchState(task="t", search_keywords=["slow", "fast"]))
+
+    # 详情和图片预取不等待慢关键词的搜索
+    assert mcp.events.index("detail:fast-0") < mcp.events.index("search:slow")
+    assert mcp.events.index("image:https://img/fast-0.jpg") < mcp.events.index("search:slow")
+    # slow-0 与 fast-0 重复：在流中识别并合并，不预取其图片
+    ids = [note.preview.id for note in state.documents]
+    assert sorted(ids) == ["fast-0", "shared", "slow-1"]
+    merged = next(note for note in state.documents if note.preview.id == "fast-0")
+    assert merged.duplicate_ids == ["slow-0"]
+    assert "image:https://img/slow-0.jpg" not in mcp.events
+    assert "image:https://img/slow-1.jpg" in mcp.events
@@ -0,0 +1,48 @@
+"""笔记向量索引测试"""
+import numpy as np
+
+from rednote_research.output.outline_generator import OutlineGenerator
+from rednote_research.services.vector_index import NoteVectorIndex, get_note_index
+from rednote_research.state import NoteData, NoteDetail, NotePreview, ResearchState
+
+
+def note(note_id: str, title: str, content: str) -> NoteData:
+    return NoteData(
+        preview=NotePreview(id=note_id, title=title),
+        detail=NoteDetail(title=title, content=content, images=[f"http://img/{note_id}.jpg"])
+    )
+
+
+NOTES = [
+    note("camp", "露营装备清单", "帐篷睡袋防潮垫，新手露营必备"),
+    note("coffee", "手冲咖啡入门", "咖啡豆研磨度和水温决定风味"),
+    note("budget", "露营预算表", "一次露营花费多少钱，帐篷和营地费用明细"),
+]
+
+
+def test_batched_search_returns_nearest_notes():
+    index = NoteVectorIndex.build(NOTES)
+    hits = index.search(["露营帐篷怎么选", "咖啡风味"], k=2)
+
+    assert {i for i, _ in hits[0]} == {0, 2}
+    assert hits[1][0][0] == 1
+    assert index.search(["露营帐篷怎么选"], k=2, exclude={0})[0][0][0] == 2
+    assert np.allclose(np.diag(index.pairwise()), 1.0, atol=1e-5)
+
+
+def test_index_cache_roundtrip(tmp_path, monkeypatch):
+    monkeypatch.setenv("CACHE_DIR", str(tmp_path))
+    built = NoteVectorIndex.build(NOTES, use_cache=True)
+    loaded = NoteVectorIndex.build(NOTES, use_cache=True)
+
+    assert len(list((tmp_path / "vectors").glob("*.npz"))) == 1
+    assert np.allclose(built.similarity(["露营"]), loaded.similarity(["露营"]))
+
+
+def test_state_index_is_built_once_and_fills_outline_sources():
+    state = ResearchState(task="露营", documents=NOTES)
+    assert get_note_index(state) is get_note_index(state)
+
+    outline = [{"type": "content", "title": "咖啡", "content": "咖啡豆风味", "source_notes": [], "images": []}]
+    OutlineGenerator(None, model="stub")._fill_source_notes(state, outline)
+    assert outline[0]["source_notes"][0] == 1
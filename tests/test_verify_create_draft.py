@@ -18,7 +18,7 @@ async def verify_create_draft():
     notes = []
     
     try:
-        draft = service.create_draft(
+        draft = await service.create_draft(
             topic=topic,
             summary=summary,
             key_findings=key_findings,
@@ -0,0 +1,39 @@
+"""VLM 自适应批次测试"""
+from rednote_research.services.vlm_batching import AdaptiveBatcher, classify_vlm_error
+
+
+def cost(item):
+    return item, 100
+
+
+def test_take_respects_count_and_payload_limits():
+    batcher = AdaptiveBatcher(initial_size=4, max_payload_bytes=250)
+
+    assert batcher.take([100, 100, 100, 100], cost) == ([100, 100], [100, 100])
+    # 单张超限也单独成批
+    assert batcher.take([500, 100], cost) == ([500], [100])
+    assert batcher.take([10] * 6, cost) == ([10] * 4, [10, 10])
+
+
+def test_shrinks_on_failure_and_grows_when_healthy():
+    batcher = AdaptiveBatcher(initial_size=8, max_size=10, target_latency=10)
+
+    batcher.failed(batcher.start([1] * 8, cost), "413")
+    assert batcher.size == 4
+
+    for _ in range(3):
+        batcher.succeeded(batcher.start([1] * batcher.size, cost), latency=2.0)
+    assert batcher.size == 7
+
+    batcher.succeeded(batcher.start([1] * 7, cost), latency=30.0)
+    assert batcher.size == 6
+    assert batcher.stats.throughput_curve()[4] == (1, 2.0, 2.0)
+    assert (batcher.stats.grown, batcher.stats.shrunk) == (3, 2)
+
+
+def test_classify_vlm_error():
+    assert classify_vlm_error(Exception("Error code: 429 - rate limit")) == "429"
+    assert classify_vlm_error(Exception("Error code: 413 - Request Entity Too Large")) == "413"
+    assert classify_vlm_error(TimeoutError()) == "timeout"
+    assert classify_vlm_error(Exception("Request timed out.")) == "timeout"
+    assert classify_vlm_error(ValueError("bad")) is None